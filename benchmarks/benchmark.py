@@ -0,0 +1,259 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks the CPM algorithm on synthetic project networks.
+
+Every case, that is, a generator, a number of activities and a set of options,
+runs in a fresh process, which validates the generated project file, creates a
+CriticalPathMethod object, runs the CPM algorithm and gathers its results. The
+time of every one of these phases is measured separately, along with how much
+it raised the peak memory of the process, and the peak memory of the whole
+process is reported once for the case. The results of all the cases are written
+in JSON, so they can be compared with the results of another version.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import itertools
+import threading
+import time
+
+REPOSITORY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_DIR)
+
+from cpm import cpm  # noqa: E402
+from cpm import generators  # noqa: E402
+
+PHASES = ('validate', 'init', 'run_cpm', 'get_results')
+DEFAULT_SIZES = (10, 100, 1000)
+
+
+def _peak_memory():
+    # ru_maxrss is in kilobytes on Linux and in bytes on OS X
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_case(project_file, crashing, engine, images_dir):
+    """Runs the phases of the CPM algorithm on a project file, in the current process.
+
+    Returns:
+        A dictionary with the time in seconds of every phase and the bytes by which
+        it raised the peak memory of the process, the peak memory in bytes of the
+        whole process and the number of iterations. A phase that needs less memory
+        than an earlier peak does not raise it, so its growth is zero.
+    """
+    measurements = {}
+
+    def measure(phase, function, *args, **kwargs):
+        peak_before = _peak_memory()
+        start = time.time()
+        result = function(*args, **kwargs)
+        measurements[phase] = {'seconds': time.time() - start, 'peak_memory_growth': _peak_memory() - peak_before}
+        return result
+
+    project = measure('validate', cpm.validate, project_file)
+    cpmnet = measure('init', cpm.CriticalPathMethod, project, engine=engine)
+    measure('run_cpm', cpmnet.run_cpm, crashing=crashing)
+    results, _, _ = measure('get_results', cpmnet.get_results, images_dir)
+    return {'phases': measurements, 'process_peak_memory': _peak_memory(), 'iterations': len(results)}
+
+
+def _process_peak_memory(case):
+    # Older reports kept the peak memory of the process after every phase
+    return case['process_peak_memory'] if 'process_peak_memory' in case else case['phases'][PHASES[-1]]['peak_memory']
+
+
+def _run_in_process(project_file, crashing, arguments, images_dir):
+    command = [sys.executable, os.path.abspath(__file__), '--run-case', project_file,
+               '--crashing', crashing, '--engine', arguments.engine]
+    if images_dir is not None:
+        command += ['--images-dir', images_dir]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    timer = threading.Timer(arguments.timeout, process.kill) if arguments.timeout else None
+    if timer is not None:
+        timer.start()
+    try:
+        output, errors = process.communicate()
+    finally:
+        if timer is not None:
+            timer.cancel()
+    if process.returncode == 0:
+        return json.loads(output)
+    if process.returncode < 0 and arguments.timeout:
+        return {'error': 'timed out after {} seconds'.format(arguments.timeout)}
+    return {'error': errors.strip().splitlines()[-1] if errors.strip() else 'exit code {}'.format(process.returncode)}
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], cwd=REPOSITORY_DIR,
+                                       stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(arguments):
+    report = {
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'options': {'crashing': arguments.crashing, 'engine': arguments.engine, 'images': arguments.images,
+                    'seed': arguments.seed},
+        'cases': []
+    }
+    work_dir = tempfile.mkdtemp(prefix='cpm-benchmark-')
+    try:
+        for generator in arguments.generators:
+            for size in arguments.sizes:
+                project_file = os.path.join(work_dir, '{}-{}.json'.format(generator, size))
+                with open(project_file, 'w') as output_file:
+                    json.dump(generators.GENERATORS[generator](size, seed=arguments.seed), output_file)
+                for crashing, repetition in itertools.product(arguments.crashing, range(arguments.repeat)):
+                    images_dir = None
+                    if arguments.images:
+                        images_dir = os.path.join(work_dir, 'images-{}-{}-{}-{}'.format(generator, size, crashing,
+                                                                                       repetition))
+                        os.mkdir(images_dir)
+                        images_dir += '/'
+                    case = {'generator': generator, 'activities': size, 'crashing': crashing,
+                            'repetition': repetition}
+                    case.update(_run_in_process(project_file, crashing, arguments, images_dir))
+                    report['cases'].append(case)
+                    sys.stderr.write(_describe_case(case) + '\n')
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+
+def _describe_case(case):
+    description = '{generator} {activities} {crashing}: '.format(**case)
+    if 'error' in case:
+        return description + case['error']
+    phases = ', '.join('{} {:.3f}s +{:.1f} MB'.format(phase, case['phases'][phase]['seconds'],
+                                                     case['phases'][phase]['peak_memory_growth'] / 1048576.0)
+                       for phase in PHASES)
+    return description + phases + ', process peak {:.1f} MB, {} iterations'.format(
+        case['process_peak_memory'] / 1048576.0, case['iterations'])
+
+
+def compare(report, baseline):
+    """Compares the times of the cases of two reports.
+
+    Returns:
+        A list of strings, one for every case of the report that is also in the
+        baseline, with the ratio of its times to the times of the baseline.
+    """
+    def key(case, options):
+        # Older reports ran every case with a single crashing method
+        return case['generator'], case['activities'], case.get('crashing', options['crashing']), case['repetition']
+
+    baseline_cases = dict((key(case, baseline['options']), case) for case in baseline['cases'] if 'phases' in case)
+    lines = []
+    for case in report['cases']:
+        other = baseline_cases.get(key(case, report['options']))
+        if 'phases' not in case or other is None:
+            continue
+        ratios = ', '.join('{} x{:.2f}'.format(phase, case['phases'][phase]['seconds'] /
+                                               max(other['phases'][phase]['seconds'], 1e-6)) for phase in PHASES)
+        memory = _process_peak_memory(case) / float(_process_peak_memory(other))
+        lines.append('{} {} {}: {}, process peak memory x{:.2f}'.format(case['generator'], case['activities'],
+                                                               case['crashing'], ratios, memory))
+    return lines
+
+
+def compare_crashing(report):
+    """Compares the crashing methods of the cases of a report.
+
+    Returns:
+        A list of strings, one for every case that ran with both the greedy and
+        the mincut crashing method, with the ratio of the time of the CPM algorithm
+        with mincut to its time with greedy, and the iterations of both.
+    """
+    cases = dict(((case['generator'], case['activities'], case['repetition'], case['crashing']), case)
+                 for case in report['cases'] if 'phases' in case)
+    lines = []
+    for (generator, activities, repetition, crashing), greedy in sorted(cases.items()):
+        mincut = cases.get((generator, activities, repetition, 'mincut'))
+        if crashing != 'greedy' or mincut is None:
+            continue
+        ratio = mincut['phases']['run_cpm']['seconds'] / max(greedy['phases']['run_cpm']['seconds'], 1e-6)
+        lines.append('{} {}: run_cpm with mincut x{:.2f} of greedy, {} instead of {} iterations'.format(
+            generator, activities, ratio, mincut['iterations'], greedy['iterations']))
+    return lines
+
+
+def process_arguments():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_help = 'the numbers of activities of the generated projects (default: {})'.format(
+        ' '.join(str(size) for size in DEFAULT_SIZES))
+    parser.add_argument('-s', '--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help=arg_help)
+    arg_help = 'the generators of the projects (default: all of them)'
+    parser.add_argument('-g', '--generators', nargs='+', choices=sorted(generators.GENERATORS),
+                        default=sorted(generators.GENERATORS), help=arg_help)
+    arg_help = ('the methods that reduce the duration of the projects, every case runs with each one of them, '
+                'and the times of the methods are compared (default: greedy)')
+    parser.add_argument('-c', '--crashing', nargs='+', choices=cpm.CRASHING_METHODS, default=['greedy'],
+                        help=arg_help)
+    arg_help = 'the engine that solves the networks (default: networkx)'
+    parser.add_argument('-e', '--engine', choices=cpm.ENGINES, default='networkx', help=arg_help)
+    arg_help = 'draw the images of the networks too'
+    parser.add_argument('-i', '--images', action='store_true', help=arg_help)
+    arg_help = 'the number of times that every case runs (default: 1)'
+    parser.add_argument('-r', '--repeat', type=int, default=1, help=arg_help)
+    arg_help = 'the seed of the generators (default: 1)'
+    parser.add_argument('--seed', type=int, default=1, help=arg_help)
+    arg_help = 'the seconds after which a case is stopped (default: no limit)'
+    parser.add_argument('-t', '--timeout', type=float, help=arg_help)
+    arg_help = 'a file that the results are written in, in JSON (default: the standard output)'
+    parser.add_argument('-o', '--output', help=arg_help)
+    arg_help = 'a file with the results of a previous run, that the new results are compared with'
+    parser.add_argument('-b', '--baseline', help=arg_help)
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    parser.add_argument('--images-dir', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    arguments = process_arguments()
+    if arguments.run_case:
+        json.dump(run_case(arguments.run_case, arguments.crashing[0], arguments.engine, arguments.images_dir),
+                  sys.stdout)
+        return
+
+    report = run_benchmarks(arguments)
+    if arguments.output:
+        with open(arguments.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    for line in compare_crashing(report):
+        sys.stderr.write(line + '\n')
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline_file:
+            for line in compare(report, json.load(baseline_file)):
+                sys.stderr.write(line + '\n')
+
+
+if __name__ == '__main__':
+    main()
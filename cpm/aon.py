@@ -0,0 +1,305 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Projects in the activity-on-node form.
+
+In the activity-on-node form, every activity of a project has an id and lists
+its predecessors, that is, the activities that must finish before it starts,
+each one optionally with a lag, the time units that must pass between the finish
+of the predecessor and the start of the activity.
+
+An AONNetwork solves such a project directly, without the dummy activities that
+the activity-on-arrow form needs. The activities are sorted by topological level
+and their dependencies are kept in CSR arrays, as the nodes and the activities of
+a compact network, so the forward and the backward pass run vectorized over one
+level at a time. The to_aoa() function converts such a project to the
+activity-on-arrow form that the CPM algorithm crashes, with a dummy activity
+only where the dependencies cannot be expressed otherwise.
+"""
+
+import numpy
+
+import compact
+
+
+def is_aon_project(project):
+    """Checks if a project, as returned by the validate() function, is in the activity-on-node form."""
+    return (isinstance(project, dict) and isinstance(project.get('activities'), list) and
+            bool(project['activities']) and isinstance(project['activities'][0], dict))
+
+
+def _predecessor(entry):
+    """Returns a tuple (id, lag) of an entry of the predecessors of an activity."""
+    if isinstance(entry, dict):
+        return entry['id'], entry['lag']
+    return entry, 0
+
+
+def _as_number(value):
+    return int(value) if value.is_integer() else value
+
+
+class AONNetwork(object):
+    """Array-backed representation of a project in the activity-on-node form.
+
+    Attributes:
+        ids: a list with the id of every activity, in the order of the project.
+        order: an int array, the index of the activity at every position of the
+            topological order.
+        level_offsets: an int array. The activities of level i are the positions
+            level_offsets[i] to level_offsets[i+1] - 1 of the topological order.
+        tails: an int array, the position of the predecessor of every dependency.
+        heads: an int array, the position of the activity of every dependency.
+        lag: a float64 array, the lag of every dependency.
+        predecessor_offsets, predecessor_dependencies: int CSR arrays of the
+            dependencies of every position on its predecessors.
+        successor_offsets, successor_dependencies: int CSR arrays of the
+            dependencies of the successors on every position.
+        normal_duration: a float64 array, the normal duration of every activity,
+            in the order of the project.
+    """
+
+    def __init__(self, project):
+        """Builds the network of a project.
+
+        Args:
+            project: a dictionary in the activity-on-node form, as returned by the
+                validate() function
+        """
+        activities = project['activities']
+        self.ids = [activity['id'] for activity in activities]
+        index = dict((identifier, position) for position, identifier in enumerate(self.ids))
+        predecessors, dependents, lags = [], [], []
+        for position, activity in enumerate(activities):
+            for entry in activity.get('predecessors', ()):
+                identifier, lag = _predecessor(entry)
+                predecessors.append(index[identifier])
+                dependents.append(position)
+                lags.append(lag)
+        predecessors = numpy.array(predecessors, dtype=numpy.int64)
+        dependents = numpy.array(dependents, dtype=numpy.int64)
+
+        self.order, self.level_offsets = compact.topological_levels(len(activities), predecessors, dependents)
+        position = numpy.empty(len(activities), dtype=numpy.int64)
+        position[self.order] = numpy.arange(len(activities))
+        self.tails = position[predecessors]
+        self.heads = position[dependents]
+        self.lag = numpy.array(lags, dtype=numpy.float64)
+        self.predecessor_offsets, self.predecessor_dependencies = compact.csr(self.heads, len(activities))
+        self.successor_offsets, self.successor_dependencies = compact.csr(self.tails, len(activities))
+        self.normal_duration = numpy.array([activity['normal_duration'] for activity in activities],
+                                           dtype=numpy.float64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _forward_pass(self, duration):
+        early_start = numpy.zeros(duration.shape)
+        for level in range(1, self.level_offsets.size - 1):
+            first, last = self.level_offsets[level], self.level_offsets[level + 1]
+            start, end = self.predecessor_offsets[first], self.predecessor_offsets[last]
+            dependencies = self.predecessor_dependencies[start:end]
+            candidates = (early_start[..., self.tails[dependencies]] + duration[..., self.tails[dependencies]] +
+                          self.lag[dependencies])
+            early_start[..., first:last] = numpy.maximum.reduceat(
+                candidates, self.predecessor_offsets[first:last] - start, axis=-1)
+        return early_start
+
+    def _backward_pass(self, duration, early_start):
+        # An activity without successors may finish as late as the project
+        project_duration = (early_start + duration).max(axis=-1)
+        late_start = numpy.expand_dims(project_duration, -1) - duration
+        for level in reversed(range(self.level_offsets.size - 1)):
+            first, last = self.level_offsets[level], self.level_offsets[level + 1]
+            start, end = self.successor_offsets[first], self.successor_offsets[last]
+            if start == end:
+                continue
+            dependencies = self.successor_dependencies[start:end]
+            candidates = late_start[..., self.heads[dependencies]] - self.lag[dependencies]
+            starts = self.successor_offsets[first:last]
+            has_successors = starts < self.successor_offsets[first + 1:last + 1]
+            late_start[..., first:last][..., has_successors] = numpy.minimum.reduceat(
+                candidates, starts[has_successors] - start, axis=-1) - duration[..., first:last][..., has_successors]
+        return late_start
+
+    def solve(self, duration=None):
+        """Calculates the earliest and the latest start time of every activity.
+
+        Args:
+            duration: an array with the duration of every activity, in the order of
+                the project. The normal duration of the activities is used if it is
+                not given. A two-dimensional array, with one row of durations for
+                every scenario, solves all the scenarios at once.
+
+        Returns:
+            A tuple of three float64 arrays, in the order of the project. The
+            earliest and the latest start time of every activity, and its total
+            float, with one row for every scenario if more than one is given.
+        """
+        if duration is None:
+            duration = self.normal_duration
+        duration = numpy.asarray(duration, dtype=numpy.float64)
+        # The passes run over the activities in topological order
+        sorted_duration = duration[..., self.order]
+        sorted_early_start = self._forward_pass(sorted_duration)
+        early_start = numpy.empty(duration.shape)
+        late_start = numpy.empty(duration.shape)
+        early_start[..., self.order] = sorted_early_start
+        late_start[..., self.order] = self._backward_pass(sorted_duration, sorted_early_start)
+        return early_start, late_start, late_start - early_start
+
+    def schedule(self, duration=None):
+        """Solves the network and describes the schedule of every activity.
+
+        Args:
+            duration: as in solve(), a one-dimensional array
+
+        Returns:
+            A dictionary with the project duration and a list with a dictionary for
+            every activity, in the order of the project, with its id, its earliest
+            and latest start and finish time, its total float, and whether it is
+            critical.
+        """
+        if duration is None:
+            duration = self.normal_duration
+        duration = numpy.asarray(duration, dtype=numpy.float64)
+        early_start, late_start, total_float = self.solve(duration)
+        early_finish = early_start + duration
+        project_duration = float(early_finish.max())
+        # Allow for the rounding errors of the floating point sums
+        critical = total_float <= 1e-9 * max(project_duration, 1)
+        activities = []
+        for identifier, values in zip(self.ids, zip(early_start.tolist(), early_finish.tolist(),
+                                                    late_start.tolist(), (late_start + duration).tolist(),
+                                                    total_float.tolist(), critical.tolist())):
+            activity = dict(zip(('early_start', 'early_finish', 'late_start', 'late_finish', 'total_float'),
+                                [_as_number(value) for value in values[:5]]))
+            activity['id'] = identifier
+            activity['critical'] = values[5]
+            activities.append(activity)
+        return {'project_duration': _as_number(project_duration), 'activities': activities}
+
+
+def to_aoa(project):
+    """Converts a project in the activity-on-node form to the activity-on-arrow form.
+
+    The activities that have the same predecessors, with the same lags, start at
+    the same node. An activity whose successors all start at the same node, and
+    without a lag, ends at that node, and so does an activity without successors
+    at the sink, unless another activity with the same start node already ends
+    there. Every other dependency is a dummy activity, with the lag as its
+    duration, from the end node of the predecessor to the start node of its
+    successors. The source is the node 1 and the sink is the last node.
+
+    Args:
+        project: a dictionary in the activity-on-node form, as returned by the
+            validate() function
+
+    Returns:
+        A tuple of two objects. A dictionary of the project in the
+        activity-on-arrow form, as returned by the validate() function, and a
+        dictionary that maps the id of every activity to its tuple (node1, node2).
+    """
+    activities = project['activities']
+    network = AONNetwork(project)
+    has_successors = numpy.zeros(len(activities), dtype=bool)
+    has_successors[network.order[network.tails]] = True
+    dependencies = [frozenset(_predecessor(entry) for entry in activity.get('predecessors', ()))
+                    for activity in activities]
+    # The dependencies of the successors of every activity
+    successor_dependencies = {}
+    for activity_dependencies in dependencies:
+        for predecessor, _ in activity_dependencies:
+            successor_dependencies.setdefault(predecessor, set()).add(activity_dependencies)
+    merged = {}
+    for predecessor, groups in successor_dependencies.items():
+        if len(groups) == 1:
+            group, = groups
+            if (predecessor, 0) in group:
+                merged[predecessor] = group
+
+    nodes = [1]
+    # The sink is numbered last, once the number of nodes is known
+    sink = object()
+    end_nodes = {}
+    group_nodes = {frozenset(): 1}
+    connected = set([frozenset()])
+    arcs = []
+    arc_set = set()
+    activity_arcs = {}
+
+    def new_node():
+        nodes.append(len(nodes) + 1)
+        return nodes[-1]
+
+    def add_arc(node1, node2, data):
+        arcs.append([node1, node2, data])
+        arc_set.add((node1, node2))
+
+    def dummy(node1, node2, lag):
+        if (node1, node2) in arc_set:
+            # An activity between the same nodes already implies a dependency
+            # without a lag, and a lag needs a node in between
+            if not lag:
+                return
+            middle = new_node()
+            dummy(node1, middle, lag)
+            node1, lag = middle, 0
+        add_arc(node1, node2, {'normal_duration': lag, 'normal_cost': 0, 'crash_duration': lag, 'crash_cost': 0})
+
+    def group_node(group):
+        if group not in group_nodes:
+            predecessor, lag = next(iter(group))
+            if len(group) == 1 and lag == 0 and predecessor not in merged:
+                group_nodes[group] = end_nodes[predecessor]
+            else:
+                group_nodes[group] = new_node()
+        return group_nodes[group]
+
+    for index in network.order.tolist():
+        activity = activities[index]
+        group = dependencies[index]
+        node1 = group_node(group)
+        if group not in connected:
+            for predecessor, lag in sorted(group):
+                if merged.get(predecessor) != group and end_nodes[predecessor] != node1:
+                    dummy(end_nodes[predecessor], node1, lag)
+            connected.add(group)
+        if activity['id'] in merged:
+            target = group_node(merged[activity['id']])
+        elif not has_successors[index]:
+            target = sink
+        else:
+            target = None
+        if target is None:
+            node2 = new_node()
+        elif (node1, target) in arc_set:
+            # The activity would duplicate another one
+            node2 = new_node()
+            dummy(node2, target, 0)
+        else:
+            node2 = target
+        end_nodes[activity['id']] = node2
+        add_arc(node1, node2, dict((key, value) for key, value in activity.items()
+                                   if key not in ('id', 'predecessors')))
+        activity_arcs[activity['id']] = (node1, node2)
+
+    sink_node = len(nodes) + 1
+    for arc in arcs:
+        if arc[1] is sink:
+            arc[1] = sink_node
+    for identifier, (node1, node2) in activity_arcs.items():
+        if node2 is sink:
+            activity_arcs[identifier] = (node1, sink_node)
+    return {'info': dict(project['info']), 'activities': arcs}, activity_arcs
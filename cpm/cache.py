@@ -0,0 +1,269 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A content-addressed cache of the results of the CPM algorithm.
+
+The results of a project are identified by the SHA-1 hash of the canonical JSON
+form of the validated project and of the options that affect them, so the same
+project, uploaded again or read from another file, is found in the cache. The
+most recently used results are kept in memory, and, if a directory is given,
+every result is also kept on disk with its images, so the cache outlives the
+process. Both tiers are bounded in bytes, and the least recently used results
+are evicted first.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+
+import columnar
+
+MEMORY_BYTES = 64 * 1024 * 1024
+DISK_BYTES = 1024 * 1024 * 1024
+RESULTS_FILE = 'results.pickle'
+# Changes whenever the result rows change shape, so older entries are never found
+RESULTS_VERSION = 3
+
+
+def get_key(project, **options):
+    """Computes the key of the results of a project.
+
+    Args:
+        project: a dictionary or a ProjectColumns object, as returned by the
+            validate() function
+        options: the options that affect the results, for example the crashing
+            method and the format of the images
+
+    Returns:
+        A string, the hexadecimal SHA-1 digest of the project and the options.
+    """
+    if isinstance(project, columnar.ProjectColumns):
+        # The columns are hashed as they are, instead of converted to JSON
+        project = {'columns': project.digest()}
+    canonical = json.dumps({'project': project, 'options': options, 'version': RESULTS_VERSION},
+                           sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical).hexdigest()
+
+
+def _link_or_copy(source, destination):
+    # The images are named after their iteration, so an image of another project
+    # may already exist under the same name, and it is replaced
+    temporary = destination + '.' + str(os.getpid()) + '.tmp'
+    try:
+        os.link(source, temporary)
+    except OSError:
+        shutil.copyfile(source, temporary)
+    os.rename(temporary, destination)
+    if os.path.lexists(temporary):
+        # The destination was already a link to the source, and rename() leaves
+        # both names in place when they refer to the same file
+        os.remove(temporary)
+
+
+def _directory_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+class ResultCache(object):
+    """Two-tier cache of the results, images and optimum solution of projects.
+
+    Attributes:
+        directory: a string, the directory of the disk tier, or None to keep the
+            results only in memory.
+        memory_bytes: the maximum size of the pickled results kept in memory.
+        disk_bytes: the maximum size of the results and images kept on disk.
+        hits: the number of lookups that found the results.
+        misses: the number of lookups that did not find the results.
+    """
+
+    def __init__(self, directory=None, memory_bytes=MEMORY_BYTES, disk_bytes=DISK_BYTES):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        # key -> (pickled size, (results, images, optimum_solution), images directory)
+        self.__memory = collections.OrderedDict()
+        self.__memory_size = 0
+        # key -> size on disk, from the least to the most recently used
+        self.__disk = collections.OrderedDict()
+        if directory is not None:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            self.__load_disk_index()
+
+    def __load_disk_index(self):
+        entries = []
+        for key in os.listdir(self.directory):
+            results_path = os.path.join(self.directory, key, RESULTS_FILE)
+            if os.path.isfile(results_path):
+                entries.append((os.path.getmtime(results_path), key))
+        for _, key in sorted(entries):
+            self.__disk[key] = _directory_size(os.path.join(self.directory, key))
+
+    @property
+    def disk_size(self):
+        """The number of bytes that the disk tier occupies."""
+        return sum(self.__disk.values())
+
+    def stats(self):
+        """Returns a dictionary with the counters and the size of the cache."""
+        with self.__lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'memory_entries': len(self.__memory),
+                'memory_bytes': self.__memory_size,
+                'disk_entries': len(self.__disk),
+                'disk_bytes': self.disk_size
+            }
+
+    def __remember(self, key, size, value, images_dir):
+        if key in self.__memory:
+            self.__memory_size -= self.__memory.pop(key)[0]
+        if size > self.memory_bytes:
+            return
+        self.__memory[key] = (size, value, images_dir)
+        self.__memory_size += size
+        while self.__memory_size > self.memory_bytes:
+            self.__memory_size -= self.__memory.popitem(last=False)[1][0]
+
+    def __forget_disk_entry(self, key):
+        del self.__disk[key]
+        shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+
+    def __read_disk_entry(self, key):
+        entry_dir = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(entry_dir, RESULTS_FILE), 'rb') as results_file:
+                data = results_file.read()
+        except IOError:
+            self.__forget_disk_entry(key)
+            return None
+        self.__disk[key] = self.__disk.pop(key)
+        os.utime(os.path.join(entry_dir, RESULTS_FILE), None)
+        value = pickle.loads(data)
+        self.__remember(key, len(data), value, entry_dir)
+        return value, entry_dir
+
+    def get(self, key, images_dir=None):
+        """Looks up the results of a project.
+
+        Args:
+            key: a string, as returned by the get_key() function
+            images_dir: a string, the directory that the cached images are placed in,
+                or None if the images are not needed
+
+        Returns:
+            A tuple (results, images, optimum_solution), as returned by the
+            get_results() method, or None if the results are not cached.
+        """
+        with self.__lock:
+            if key in self.__memory:
+                size, value, cached_images_dir = self.__memory.pop(key)
+                self.__memory[key] = (size, value, cached_images_dir)
+                if self.directory is not None and key in self.__disk:
+                    self.__disk[key] = self.__disk.pop(key)
+            elif key in self.__disk:
+                entry = self.__read_disk_entry(key)
+                if entry is None:
+                    self.misses += 1
+                    return None
+                value, cached_images_dir = entry
+            else:
+                self.misses += 1
+                return None
+
+            images = value[1]
+            if images_dir is not None and images:
+                sources = [os.path.join(cached_images_dir, image) for image in images]
+                if not all(os.path.isfile(source) for source in sources):
+                    # The images were removed after the results were cached. An entry
+                    # that is larger than the memory tier is only on disk.
+                    entry = self.__memory.pop(key, None)
+                    if entry is not None:
+                        self.__memory_size -= entry[0]
+                    if key in self.__disk:
+                        self.__forget_disk_entry(key)
+                    self.misses += 1
+                    return None
+                for source, image in zip(sources, images):
+                    _link_or_copy(source, os.path.join(images_dir, image))
+            self.hits += 1
+            return value
+
+    def put(self, key, results, images, optimum_solution, images_dir=None):
+        """Stores the results of a project.
+
+        Args:
+            key: a string, as returned by the get_key() function
+            results, images, optimum_solution: the results of the project, as
+                returned by the get_results() method
+            images_dir: a string, the directory that holds the images, or None if
+                there are no images
+        """
+        value = (results, images, optimum_solution)
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.__lock:
+            if self.directory is None:
+                self.__remember(key, len(data), value, images_dir)
+                return
+            if key not in self.__disk:
+                entry_dir = self.__write_disk_entry(key, data, images, images_dir)
+                if entry_dir is None:
+                    self.__remember(key, len(data), value, images_dir)
+                    return
+            self.__remember(key, len(data), value, os.path.join(self.directory, key))
+            self.__evict_disk_entries()
+
+    def __write_disk_entry(self, key, data, images, images_dir):
+        entry_dir = os.path.join(self.directory, key)
+        # Fill a temporary directory and rename it, so that a half-written entry
+        # is never read, even by another process.
+        temporary_dir = entry_dir + '.' + str(os.getpid()) + '.tmp'
+        try:
+            os.mkdir(temporary_dir)
+            for image in images:
+                _link_or_copy(os.path.join(images_dir, image), os.path.join(temporary_dir, image))
+            with open(os.path.join(temporary_dir, RESULTS_FILE), 'wb') as results_file:
+                results_file.write(data)
+            os.rename(temporary_dir, entry_dir)
+        except (IOError, OSError):
+            shutil.rmtree(temporary_dir, ignore_errors=True)
+            if not os.path.isfile(os.path.join(entry_dir, RESULTS_FILE)):
+                return None
+        self.__disk[key] = _directory_size(entry_dir)
+        return entry_dir
+
+    def __evict_disk_entries(self):
+        size = self.disk_size
+        while size > self.disk_bytes and len(self.__disk) > 1:
+            key = next(iter(self.__disk))
+            size -= self.__disk[key]
+            self.__forget_disk_entry(key)
+            if key in self.__memory:
+                self.__memory_size -= self.__memory.pop(key)[0]
+
+    def clear(self):
+        """Removes every result from the cache."""
+        with self.__lock:
+            self.__memory.clear()
+            self.__memory_size = 0
+            for key in list(self.__disk):
+                self.__forget_disk_entry(key)
@@ -13,25 +13,114 @@
 # limitations under the License.
 
 import argparse
+import csv
+import glob
+import json
+import multiprocessing
 import os.path
 import sys
 
 import prettytable
 
+import aon
+import cache
+import columnar
 import cpm
+import curve
+import portfolio
+import profiling
+import resources
+import simulation
 
 
-def process_arguments():
+COMMANDS = ('run', 'batch', 'convert', 'portfolio')
+
+
+def positive_int(value):
+    """Converts an argument to an integer, and rejects the integers below 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError('{} is not a positive integer'.format(value))
+    return number
+
+
+def process_arguments(argv=None):
     description = ('A program that implements the Critical Path Method '
                    'algorithm in order to schedule a set of project activities '
                    'at the minimum total cost with the optimum duration.')
-    parser = argparse.ArgumentParser(description=description)
-    arg_help = 'a file that describes the project in JSON format'
+    epilog = ('Without a command, the run command is assumed, so "cpm project.json" is "cpm run project.json". '
+              'A project file that is named after a command is solved with "cpm run".')
+    parser = argparse.ArgumentParser(prog='cpm', description=description, epilog=epilog)
+    subparsers = parser.add_subparsers(dest='command', title='commands', metavar='COMMAND')
+    add_run_parser(subparsers)
+    add_batch_parser(subparsers)
+    add_convert_parser(subparsers)
+    add_portfolio_parser(subparsers)
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in COMMANDS + ('-h', '--help'):
+        argv.insert(0, 'run')
+    arguments = parser.parse_args(argv)
+    arguments.check(arguments)
+    return arguments
+
+
+def add_run_parser(subparsers):
+    description = ('Runs the Critical Path Method algorithm on a project file, and prints the results '
+                   'of every iteration.')
+    parser = subparsers.add_parser('run', help='solve a project file (the default command)', description=description)
+    parser.set_defaults(check=check_run_arguments, main=run_main)
+    arg_help = 'a file that describes the project in JSON format, or in the columnar format (.npz)'
     parser.add_argument('project_file', help=arg_help)
     arg_help = 'a directory that the generated images will be placed in'
     parser.add_argument('-o', '--images-dir', help=arg_help)
+    arg_help = 'do not generate any images, and do not load the plotting libraries at all'
+    parser.add_argument('-n', '--no-images', action='store_true', help=arg_help)
+    arg_help = 'the format of the generated images (default: png)'
+    parser.add_argument('-f', '--image-format', choices=('png', 'svg'), default='png', help=arg_help)
+    arg_help = 'the number of processes that generate the images, or the starts of --resources (default: 1)'
+    parser.add_argument('-j', '--processes', type=int, default=1, help=arg_help)
+    arg_help = ('the method that reduces the duration of the project: greedy, one time unit at a time, '
+                'or mincut, the exact time-cost tradeoff (default: greedy)')
+    parser.add_argument('-c', '--crashing', choices=cpm.CRASHING_METHODS, default='greedy', help=arg_help)
+    arg_help = ('the engine that solves the network: networkx, or compact, which keeps the network '
+                'in arrays for large projects (default: networkx)')
+    parser.add_argument('-e', '--engine', choices=cpm.ENGINES, default='networkx', help=arg_help)
+    arg_help = ('run a Monte Carlo simulation of the schedule with the given number of scenarios, '
+                'using the three-point duration estimates of the activities, instead of the CPM algorithm')
+    parser.add_argument('-s', '--simulate', type=positive_int, metavar='SAMPLES', help=arg_help)
+    arg_help = 'the seed of the random number generator of the simulation, or of the starts of --resources'
+    parser.add_argument('--seed', type=int, help=arg_help)
+    arg_help = ('schedule the activities within the capacities of the resources of the project, '
+                'instead of running the CPM algorithm')
+    parser.add_argument('-r', '--resources', action='store_true', help=arg_help)
+    arg_help = ('the priority rule of the resource-constrained schedule: the earliest latest finish (lft) '
+                'or latest start (lst), the least total float, or the earliest start (est) first (default: lft)')
+    parser.add_argument('--priority-rule', choices=resources.PRIORITY_RULES, default='lft', help=arg_help)
+    arg_help = ('the number of resource-constrained schedules, with randomly perturbed priorities, '
+                'of which the shortest one is kept (default: 1)')
+    parser.add_argument('--starts', type=positive_int, default=1, help=arg_help)
+    arg_help = ('print the earliest and latest start and finish time of every activity of a project in the '
+                'activity-on-node form, solved without dummy activities, instead of running the CPM algorithm')
+    parser.add_argument('--schedule', action='store_true', help=arg_help)
+    arg_help = 'a directory that the results of the solved projects are cached in (default: ~/.cache/cpm)'
+    parser.add_argument('--cache-dir', default=os.path.join('~', '.cache', 'cpm'), help=arg_help)
+    arg_help = 'solve the project even if its results are cached, and do not cache them'
+    parser.add_argument('--no-cache', action='store_true', help=arg_help)
+    arg_help = ('write the time of every phase of the algorithm, and the timings and counters of every '
+                'iteration, in a file in JSON (the project is solved even if its results are cached)')
+    parser.add_argument('-p', '--profile', metavar='PROFILE_FILE', help=arg_help)
+    arg_help = 'print the results of every iteration as soon as it is complete, instead of a table at the end'
+    parser.add_argument('--stream', action='store_true', help=arg_help)
+    arg_help = ('stop as soon as the total cost of the project starts rising, which finds the optimum '
+                'solution early with the mincut crashing, but may stop at a costlier solution with the greedy one')
+    parser.add_argument('--stop-on-cost-increase', action='store_true', help=arg_help)
+    arg_help = ('write the breakpoints of the time-cost curve of the project in a file in JSON, '
+                'which answers cost and duration queries without solving the project again')
+    parser.add_argument('--curve', metavar='CURVE_FILE', help=arg_help)
 
-    arguments = parser.parse_args()
+
+def check_run_arguments(arguments):
     if not os.path.isfile(arguments.project_file):
         sys.stderr.write('The project_file is not an existing regular file.\n')
         sys.exit(1)
@@ -39,35 +128,331 @@ def process_arguments():
         sys.stderr.write('The images_dir is not an existing directory.\n')
         sys.exit(1)
 
-    return arguments
 
+RESULT_HEADERS = ("Project Duration", "Critical Path(s)", "Direct Cost", "Indirect Cost", "Total Cost")
+
+
+def get_result_row(result):
+    # The critical paths are constructed only for printing them
+    return [result['project_duration'], list(cpm.critical_paths(result)), result['direct_cost'],
+            result['indirect_cost'], result['total_cost']]
+
+
+def print_result_row(result):
+    print ' | '.join(str(value) for value in get_result_row(result))
+    sys.stdout.flush()
+
+
+def print_simulation(simulation_results):
+    percentiles_table = prettytable.PrettyTable(["Percentile", "Project Duration"])
+    for percentile, duration in sorted(simulation_results['percentiles'].items()):
+        percentiles_table.add_row([percentile, round(duration, 2)])
+    print percentiles_table
+
+    print 'The mean project duration is {:.2f} with a standard deviation of {:.2f} over {} scenarios.'\
+        .format(simulation_results['mean'], simulation_results['std'], simulation_results['samples'])
+
+    criticality_table = prettytable.PrettyTable(["Activity", "Criticality Index"])
+    for activity, criticality in simulation_results['criticality']:
+        criticality_table.add_row([activity, round(criticality, 4)])
+    print criticality_table
 
-def main():
-    arguments = process_arguments()
 
+def print_resource_schedule(schedule):
+    schedule_table = prettytable.PrettyTable(["Activity", "Start", "Finish"])
+    for activity in sorted(schedule['starts'], key=lambda activity: (schedule['starts'][activity], activity)):
+        schedule_table.add_row([activity, schedule['starts'][activity], schedule['finishes'][activity]])
+    print schedule_table
+
+    usage_table = prettytable.PrettyTable(["Resource", "Capacity", "Peak Usage"])
+    for name, usage in sorted(schedule['usage'].items()):
+        usage_table.add_row([name, schedule['capacities'][name], usage.max() if usage.size else 0])
+    print usage_table
+
+    print 'The project duration is {} with the resources, and {} without them.'\
+        .format(schedule['project_duration'], schedule['unconstrained_duration'])
+
+
+def print_schedule(schedule):
+    schedule_table = prettytable.PrettyTable(["Activity", "Early Start", "Early Finish", "Late Start",
+                                              "Late Finish", "Total Float", "Critical"])
+    for activity in schedule['activities']:
+        schedule_table.add_row([activity['id'], activity['early_start'], activity['early_finish'],
+                                activity['late_start'], activity['late_finish'], activity['total_float'],
+                                'yes' if activity['critical'] else 'no'])
+    print schedule_table
+
+    print 'The project duration is {}.'.format(schedule['project_duration'])
+
+
+BATCH_FIELDS = ('project_file', 'normal_project_duration', 'crash_project_duration', 'iterations',
+                'optimum_total_cost', 'optimum_project_duration', 'error')
+
+
+def add_batch_parser(subparsers):
+    description = ('Runs the Critical Path Method algorithm on many project files across a pool of '
+                   'processes, and writes one line with the results of every project as soon as it is solved.')
+    parser = subparsers.add_parser('batch', help='solve many project files across a pool of processes',
+                                   description=description)
+    parser.set_defaults(check=check_batch_arguments, main=batch_main)
+    arg_help = ('a directory with project files in JSON or in the columnar format, '
+                'or a glob pattern that matches project files')
+    parser.add_argument('projects', help=arg_help)
+    arg_help = 'the number of processes that solve the projects (default: the number of CPUs)'
+    parser.add_argument('-j', '--processes', type=int, default=multiprocessing.cpu_count(), help=arg_help)
+    arg_help = 'the format of the results: jsonl, one JSON object per line, or csv (default: jsonl)'
+    parser.add_argument('-f', '--format', choices=('jsonl', 'csv'), default='jsonl', help=arg_help)
+    arg_help = 'the method that reduces the duration of the projects (default: greedy)'
+    parser.add_argument('-c', '--crashing', choices=cpm.CRASHING_METHODS, default='greedy', help=arg_help)
+    arg_help = 'the engine that solves the networks (default: networkx)'
+    parser.add_argument('-e', '--engine', choices=cpm.ENGINES, default='networkx', help=arg_help)
+
+
+def check_batch_arguments(arguments):
+    arguments.project_files = find_project_files(arguments.projects)
+    if arguments.processes < 1:
+        sys.stderr.write('The number of processes must be positive.\n')
+        sys.exit(1)
+
+
+def find_project_files(projects):
+    """Finds the project files of a directory or a glob pattern, and exits if there are none."""
+    if os.path.isdir(projects):
+        project_files = sorted(glob.glob(os.path.join(projects, '*.json')) +
+                               glob.glob(os.path.join(projects, '*' + cpm.COLUMNAR_EXTENSION)))
+    else:
+        project_files = sorted(path for path in glob.glob(projects) if os.path.isfile(path))
+    if not project_files:
+        sys.stderr.write('No project files match the given projects.\n')
+        sys.exit(1)
+    return project_files
+
+
+def solve_project_file(job):
+    """Solves a project file, as a task of a pool of processes.
+
+    Args:
+        job: a tuple of the project file, the crashing method and the engine
+
+    Returns:
+        A dictionary with the keys of BATCH_FIELDS. The error is None if the
+        project was solved.
+    """
+    project_file, crashing, engine = job
+    summary = dict((field, None) for field in BATCH_FIELDS)
+    summary['project_file'] = project_file
     try:
-        project = cpm.validate(arguments.project_file)
+        project = cpm.validate(project_file)
+        cpmnet = cpm.CriticalPathMethod(project, engine=engine)
+        cpmnet.run_cpm(crashing=crashing)
+        results, _, optimum_solution = cpmnet.get_results()
+    except cpm.ProjectValidationException as exc:
+        summary['error'] = str(exc)
+        return summary
+    except Exception as exc:
+        # A failure in one project must not stop the rest of the batch
+        summary['error'] = '{}: {}'.format(type(exc).__name__, exc)
+        return summary
+    summary.update({
+        'normal_project_duration': results[0]['project_duration'],
+        'crash_project_duration': results[-1]['project_duration'],
+        'iterations': len(results),
+        'optimum_total_cost': optimum_solution[0],
+        'optimum_project_duration': optimum_solution[1]
+    })
+    return summary
+
+
+def batch_main(arguments):
+    if arguments.format == 'csv':
+        writer = csv.DictWriter(sys.stdout, fieldnames=BATCH_FIELDS)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        write = lambda summary: sys.stdout.write(json.dumps(summary, sort_keys=True) + '\n')
+
+    jobs = [(project_file, arguments.crashing, arguments.engine) for project_file in arguments.project_files]
+    failures = 0
+    pool = multiprocessing.Pool(min(arguments.processes, len(jobs)))
+    try:
+        for summary in pool.imap_unordered(solve_project_file, jobs):
+            write(summary)
+            sys.stdout.flush()
+            if summary['error'] is not None:
+                failures += 1
+    finally:
+        pool.close()
+        pool.join()
+
+    if failures:
+        sys.stderr.write('{} of {} projects could not be solved.\n'.format(failures, len(jobs)))
+        sys.exit(1)
+
+
+def add_portfolio_parser(subparsers):
+    description = ('Solves the time-cost curves of many project files across a pool of processes, and chooses '
+                   'the duration of every project that minimizes the total cost of the portfolio, with a '
+                   'shared budget for crashing the projects.')
+    parser = subparsers.add_parser('portfolio', help='optimize many project files under a shared crash budget',
+                                   description=description)
+    parser.set_defaults(check=check_portfolio_arguments, main=portfolio_main)
+    arg_help = ('a directory with project files in JSON or in the columnar format, '
+                'or a glob pattern that matches project files')
+    parser.add_argument('projects', help=arg_help)
+    arg_help = 'the maximum direct cost over the normal one, of all the projects together (default: no limit)'
+    parser.add_argument('-b', '--budget', type=float, help=arg_help)
+    arg_help = 'the number of processes that solve the projects (default: the number of CPUs)'
+    parser.add_argument('-j', '--processes', type=int, default=multiprocessing.cpu_count(), help=arg_help)
+    arg_help = 'the method that reduces the duration of the projects (default: greedy)'
+    parser.add_argument('-c', '--crashing', choices=cpm.CRASHING_METHODS, default='greedy', help=arg_help)
+    arg_help = 'the engine that solves the networks (default: networkx)'
+    parser.add_argument('-e', '--engine', choices=cpm.ENGINES, default='networkx', help=arg_help)
+    arg_help = 'a directory that the results of the solved projects are cached in (default: ~/.cache/cpm)'
+    parser.add_argument('--cache-dir', default=os.path.join('~', '.cache', 'cpm'), help=arg_help)
+    arg_help = 'solve the projects even if their results are cached, and do not cache them'
+    parser.add_argument('--no-cache', action='store_true', help=arg_help)
+
+
+def check_portfolio_arguments(arguments):
+    check_batch_arguments(arguments)
+    if arguments.budget is not None and arguments.budget < 0:
+        sys.stderr.write('The budget must not be negative.\n')
+        sys.exit(1)
+
+
+def portfolio_main(arguments):
+    cache_dir = None if arguments.no_cache else os.path.expanduser(arguments.cache_dir)
+    projects = portfolio.Portfolio(arguments.project_files, crashing=arguments.crashing, engine=arguments.engine,
+                                   cache_dir=cache_dir)
+    projects.solve(processes=arguments.processes)
+    for project_file, error in sorted(projects.errors.items()):
+        sys.stderr.write('{}: {}\n'.format(project_file, error))
+    if not projects.curves:
+        sys.stderr.write('No project could be solved.\n')
+        sys.exit(1)
+    solution = projects.optimize(arguments.budget)
+
+    portfolio_table = prettytable.PrettyTable(["Project", "Project Duration", "Direct Cost", "Crash Cost",
+                                               "Total Cost"])
+    for project_file, project in sorted(solution['projects'].items()):
+        portfolio_table.add_row([project_file, project['project_duration'], project['direct_cost'],
+                                 project['crash_cost'], project['total_cost']])
+    print portfolio_table
+
+    print 'The total cost of the portfolio is {}, with a crash cost of {}.'\
+        .format(solution['total_cost'], solution['crash_cost'])
+    if projects.errors:
+        sys.exit(1)
+
+
+def add_convert_parser(subparsers):
+    description = ('Converts a project file from JSON to the binary columnar format, which loads much faster, '
+                   'or back to JSON.')
+    parser = subparsers.add_parser('convert', help='convert a project file to or from the columnar format',
+                                   description=description)
+    parser.set_defaults(check=check_convert_arguments, main=convert_main)
+    arg_help = 'a project file in JSON or in the columnar format (' + cpm.COLUMNAR_EXTENSION + ')'
+    parser.add_argument('input_file', help=arg_help)
+    arg_help = ('the converted project file, in the columnar format if its extension is ' +
+                cpm.COLUMNAR_EXTENSION + ', or else in JSON')
+    parser.add_argument('output_file', help=arg_help)
+
+
+def check_convert_arguments(arguments):
+    if not os.path.isfile(arguments.input_file):
+        sys.stderr.write('The input_file is not an existing regular file.\n')
+        sys.exit(1)
+
+
+def convert_main(arguments):
+    try:
+        project = cpm.validate(arguments.input_file)
     except cpm.ProjectValidationException as exc:
         sys.stderr.write(str(exc) + '\n')
         sys.exit(1)
+
+    if arguments.output_file.endswith(cpm.COLUMNAR_EXTENSION):
+        if not isinstance(project, columnar.ProjectColumns):
+            project = columnar.ProjectColumns.from_project(project)
+        project.save(arguments.output_file)
+    else:
+        if isinstance(project, columnar.ProjectColumns):
+            project = project.to_project()
+        with open(arguments.output_file, 'w') as output_file:
+            json.dump(project, output_file, indent=4, sort_keys=True)
+
+
+def run_main(arguments):
+    profiler = profiling.Profiler() if arguments.profile else None
+
+    try:
+        with (profiler or profiling.NULL_PROFILER).phase('validate'):
+            project = cpm.validate(arguments.project_file)
+    except cpm.ProjectValidationException as exc:
+        sys.stderr.write(str(exc) + '\n')
+        sys.exit(1)
+
+    if arguments.schedule:
+        if not aon.is_aon_project(project):
+            sys.stderr.write('The --schedule option needs a project file in the activity-on-node form.\n')
+            sys.exit(1)
+        print_schedule(aon.AONNetwork(project).schedule())
+        return
+    if arguments.simulate:
+        print_simulation(simulation.simulate(project, samples=arguments.simulate, seed=arguments.seed))
+        return
+    if arguments.resources:
+        print_resource_schedule(resources.schedule(project, rule=arguments.priority_rule, starts=arguments.starts,
+                                                   processes=arguments.processes, seed=arguments.seed))
+        return
+
     images_dir = arguments.images_dir + '/' if arguments.images_dir else ''
+    if arguments.no_images:
+        images_dir = None
 
-    cpmnet = cpm.CriticalPathMethod(project)
-    cpmnet.run_cpm()
-    results, images, optimum_solution = cpmnet.get_results(images_dir)
+    result_cache = None if arguments.no_cache else cache.ResultCache(os.path.expanduser(arguments.cache_dir))
+    # The engine does not affect the results, so it is not part of the key
+    options = {'crashing': arguments.crashing,
+               'image_format': None if images_dir is None else arguments.image_format}
+    if arguments.stop_on_cost_increase:
+        options['stop_on_cost_increase'] = True
+    key = cache.get_key(project, **options)
+    cached = result_cache.get(key, images_dir) if result_cache and profiler is None else None
+    if arguments.stream:
+        print ' | '.join(RESULT_HEADERS)
+    if cached:
+        results, images, optimum_solution = cached
+        if arguments.stream:
+            for result in results:
+                print_result_row(result)
+    else:
+        cpmnet = cpm.CriticalPathMethod(project, engine=arguments.engine, profiler=profiler)
+        for result in cpmnet.iterate_cpm(crashing=arguments.crashing,
+                                         stop_on_cost_increase=arguments.stop_on_cost_increase):
+            if arguments.stream:
+                print_result_row(result)
+        results, images, optimum_solution = cpmnet.get_results(images_dir, image_format=arguments.image_format,
+                                                               processes=arguments.processes)
+        if result_cache:
+            result_cache.put(key, results, images, optimum_solution, images_dir)
+    if profiler is not None:
+        profiler.dump(arguments.profile)
+    if arguments.curve:
+        curve.CostCurve.from_results(results).save(arguments.curve)
 
-    results_table = prettytable.PrettyTable([
-        "Project Duration", "Critical Path(s)", "Direct Cost", "Indirect Cost", "Total Cost"
-    ])
-    for result in results:
-        results_table.add_row([
-            result['project_duration'], result['critical_paths'],
-            result['direct_cost'], result['indirect_cost'], result['total_cost']
-        ])
-    print results_table
+    if not arguments.stream:
+        results_table = prettytable.PrettyTable(list(RESULT_HEADERS))
+        for result in results:
+            results_table.add_row(get_result_row(result))
+        print results_table
 
     print 'The optimum solution is {} for total cost and {} for project duration.'\
         .format(optimum_solution[0], optimum_solution[1])
 
+
+def main():
+    arguments = process_arguments()
+    arguments.main(arguments)
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,247 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A binary columnar format of projects.
+
+A project is kept as one array for every property of its activities, instead of
+a list of activities, and it is stored in an uncompressed NumPy .npz file, which
+is loaded with a few reads instead of being parsed. The activities keep their
+order, and their durations and costs keep their integer type, so a project
+converted from and back to JSON is solved exactly as before.
+"""
+
+import hashlib
+
+import numpy
+
+import aon
+import compact
+
+FORMAT_VERSION = 1
+COLUMNS = ('node1', 'node2', 'normal_duration', 'normal_cost', 'crash_duration', 'crash_cost')
+ESTIMATE_COLUMNS = ('optimistic_duration', 'most_likely_duration', 'pessimistic_duration')
+DISTRIBUTIONS = ('pert', 'triangular', 'uniform')
+RESOURCE_COLUMNS = ('resource_names', 'resource_capacity', 'resource_demand')
+
+
+class ProjectColumns(object):
+    """A project, with its activities kept in arrays.
+
+    Attributes:
+        node1, node2: int64 arrays, the first and the last node of every activity.
+        normal_duration, normal_cost, crash_duration, crash_cost: int64 arrays,
+            one value for every activity.
+        indirect_cost: the indirect cost of the project per time unit.
+        optimistic_duration, most_likely_duration, pessimistic_duration: float64
+            arrays with the three-point estimate of every activity, which is NaN
+            for the activities without an estimate, or None if no activity has one.
+        distribution: an int8 array with the index of the distribution of every
+            activity in DISTRIBUTIONS, which is -1 for the activities without an
+            estimate, or None if no activity has one.
+        resource_names: a list with the names of the resources of the project, or
+            None if the project has no resources.
+        resource_capacity: an int64 array with the capacity of every resource, or
+            None if the project has no resources.
+        resource_demand: an int64 array with a row for every activity and a column
+            for every resource, the units of the resource that the activity demands,
+            or None if the project has no resources.
+    """
+
+    def __init__(self, node1, node2, normal_duration, normal_cost, crash_duration, crash_cost, indirect_cost=0,
+                 optimistic_duration=None, most_likely_duration=None, pessimistic_duration=None,
+                 distribution=None, resource_names=None, resource_capacity=None, resource_demand=None):
+        self.node1 = numpy.asarray(node1, dtype=numpy.int64)
+        self.node2 = numpy.asarray(node2, dtype=numpy.int64)
+        self.normal_duration = numpy.asarray(normal_duration, dtype=numpy.int64)
+        self.normal_cost = numpy.asarray(normal_cost, dtype=numpy.int64)
+        self.crash_duration = numpy.asarray(crash_duration, dtype=numpy.int64)
+        self.crash_cost = numpy.asarray(crash_cost, dtype=numpy.int64)
+        self.indirect_cost = indirect_cost
+        if optimistic_duration is None:
+            self.optimistic_duration = self.most_likely_duration = self.pessimistic_duration = None
+            self.distribution = None
+        else:
+            self.optimistic_duration = numpy.asarray(optimistic_duration, dtype=numpy.float64)
+            self.most_likely_duration = numpy.asarray(most_likely_duration, dtype=numpy.float64)
+            self.pessimistic_duration = numpy.asarray(pessimistic_duration, dtype=numpy.float64)
+            self.distribution = numpy.asarray(distribution, dtype=numpy.int8)
+        if resource_names is None:
+            self.resource_names = self.resource_capacity = self.resource_demand = None
+        else:
+            self.resource_names = list(resource_names)
+            self.resource_capacity = numpy.asarray(resource_capacity, dtype=numpy.int64)
+            self.resource_demand = numpy.asarray(resource_demand, dtype=numpy.int64).reshape(
+                self.node1.size, len(self.resource_names))
+
+    def __len__(self):
+        return self.node1.size
+
+    @property
+    def has_estimates(self):
+        """Whether any activity has a three-point estimate of its duration."""
+        return self.optimistic_duration is not None
+
+    @property
+    def has_resources(self):
+        """Whether the project has resources."""
+        return self.resource_names is not None
+
+    @classmethod
+    def from_project(cls, project):
+        """Converts a project, as returned by the validate() function, to columns.
+
+        A project in the activity-on-node form is converted to the
+        activity-on-arrow form first.
+        """
+        if aon.is_aon_project(project):
+            project, _ = aon.to_aoa(project)
+        activities = project['activities']
+        columns = dict((key, [activity[key] for _, _, activity in activities]) for key in COLUMNS[2:])
+        if any('optimistic_duration' in activity for _, _, activity in activities):
+            for key in ESTIMATE_COLUMNS:
+                columns[key] = [activity.get(key, numpy.nan) for _, _, activity in activities]
+            columns['distribution'] = [DISTRIBUTIONS.index(activity.get('distribution', 'pert'))
+                                       if 'optimistic_duration' in activity else -1 for _, _, activity in activities]
+        capacities = project['info'].get('resources')
+        demanded = set(name for _, _, activity in activities for name in activity.get('resources', ()))
+        if capacities is not None or demanded:
+            capacities = capacities or {}
+            names = sorted(set(capacities) | demanded)
+            columns['resource_names'] = names
+            columns['resource_capacity'] = [capacities.get(name, 0) for name in names]
+            columns['resource_demand'] = [[activity.get('resources', {}).get(name, 0) for name in names]
+                                          for _, _, activity in activities]
+        return cls([node1 for node1, _, _ in activities], [node2 for _, node2, _ in activities],
+                   indirect_cost=project['info']['indirect_cost'], **columns)
+
+    def activities(self):
+        """Generates the activities of the project.
+
+        Returns:
+            A generator of lists [node1, node2, properties], as in the activities of
+            a project in JSON, with the properties that the CPM algorithm uses.
+        """
+        for node1, node2, normal_duration, normal_cost, crash_duration, crash_cost in zip(
+                *[getattr(self, key).tolist() for key in COLUMNS]):
+            yield [node1, node2, {
+                'normal_duration': normal_duration,
+                'normal_cost': normal_cost,
+                'crash_duration': crash_duration,
+                'crash_cost': crash_cost
+            }]
+
+    def topological_order(self):
+        """Returns a list of the nodes of the project in topological order."""
+        identifiers, numbered = numpy.unique(numpy.concatenate([self.node1, self.node2]), return_inverse=True)
+        order, _ = compact.topological_levels(identifiers.size, numbered[:len(self)], numbered[len(self):])
+        return identifiers[order].tolist()
+
+    def normal_durations(self):
+        """Returns a dictionary that maps every activity to its normal duration."""
+        return dict(zip(zip(self.node1.tolist(), self.node2.tolist()), self.normal_duration.tolist()))
+
+    def to_project(self):
+        """Converts the columns to a project, as returned by the validate() function."""
+        activities = list(self.activities())
+        if self.has_estimates:
+            estimates = zip(*[getattr(self, key).tolist() for key in ESTIMATE_COLUMNS + ('distribution',)])
+            for (_, _, activity), (optimistic, most_likely, pessimistic, distribution) in zip(activities, estimates):
+                if distribution >= 0:
+                    activity.update(optimistic_duration=optimistic, most_likely_duration=most_likely,
+                                    pessimistic_duration=pessimistic, distribution=DISTRIBUTIONS[distribution])
+        info = {'indirect_cost': self.indirect_cost}
+        if self.has_resources:
+            info['resources'] = dict(zip(self.resource_names, self.resource_capacity.tolist()))
+            for (_, _, activity), demands in zip(activities, self.resource_demand.tolist()):
+                resources = dict((name, demand) for name, demand in zip(self.resource_names, demands) if demand)
+                if resources:
+                    activity['resources'] = resources
+        return {'info': info, 'activities': activities}
+
+    def estimates(self):
+        """Gathers the three-point estimates of the activities.
+
+        Returns:
+            A tuple of four arrays, with one value for every activity. The optimistic,
+            most likely and pessimistic duration, which are the normal duration for the
+            activities without an estimate, and the index of the distribution in
+            DISTRIBUTIONS.
+        """
+        normal_duration = self.normal_duration.astype(numpy.float64)
+        if not self.has_estimates:
+            return normal_duration, normal_duration, normal_duration, numpy.zeros(len(self), dtype=numpy.int8)
+        missing = self.distribution < 0
+        return (numpy.where(missing, normal_duration, self.optimistic_duration),
+                numpy.where(missing, normal_duration, self.most_likely_duration),
+                numpy.where(missing, normal_duration, self.pessimistic_duration),
+                numpy.where(missing, 0, self.distribution))
+
+    def __arrays(self):
+        arrays = dict((key, getattr(self, key)) for key in COLUMNS)
+        if self.has_estimates:
+            arrays.update((key, getattr(self, key)) for key in ESTIMATE_COLUMNS + ('distribution',))
+        if self.has_resources:
+            arrays.update(resource_names=numpy.array(self.resource_names, dtype=numpy.unicode_),
+                          resource_capacity=self.resource_capacity, resource_demand=self.resource_demand)
+        return arrays
+
+    def digest(self):
+        """Returns a string, the hexadecimal SHA-1 digest of the project."""
+        digest = hashlib.sha1(repr(self.indirect_cost))
+        for key, column in sorted(self.__arrays().items()):
+            digest.update(key)
+            digest.update(numpy.ascontiguousarray(column).data)
+        return digest.hexdigest()
+
+    def save(self, project_file):
+        """Saves the project in the columnar format.
+
+        Args:
+            project_file: a filename or File Object. The .npz extension is appended
+                to a filename that does not have it.
+        """
+        numpy.savez(project_file, version=FORMAT_VERSION, indirect_cost=self.indirect_cost, **self.__arrays())
+
+    @classmethod
+    def load(cls, project_file):
+        """Loads a project that was saved in the columnar format.
+
+        Raises:
+            ValueError: if the file is not a project in the columnar format.
+        """
+        try:
+            data = numpy.load(project_file)
+        except IOError as exc:
+            raise ValueError(str(exc))
+        if not isinstance(data, numpy.lib.npyio.NpzFile):
+            raise ValueError('The file is not an .npz file')
+        try:
+            if 'version' not in data or int(data['version']) != FORMAT_VERSION:
+                raise ValueError('Unknown version of the columnar format')
+            columns = dict((key, data[key]) for key in COLUMNS + ESTIMATE_COLUMNS + ('distribution',) +
+                           RESOURCE_COLUMNS if key in data)
+            indirect_cost = data['indirect_cost'].item()
+        except KeyError as exc:
+            raise ValueError(str(exc))
+        finally:
+            data.close()
+        if not set(COLUMNS) <= set(columns):
+            raise ValueError('The columns of the activities are missing')
+        if 'resource_names' in columns:
+            if not set(RESOURCE_COLUMNS) <= set(columns):
+                raise ValueError('The columns of the resources are missing')
+            columns['resource_names'] = columns['resource_names'].tolist()
+            if columns['resource_demand'].size != len(columns['node1']) * len(columns['resource_names']):
+                raise ValueError('The demands of the resources do not match the activities')
+        return cls(indirect_cost=indirect_cost, **columns)
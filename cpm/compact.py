@@ -0,0 +1,206 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""An array-backed representation of a project network.
+
+The nodes of the network are renumbered in topological order and grouped by
+topological level, that is, by the number of activities on the longest path
+that arrives at them. The activities that enter and leave every node are kept
+in compressed sparse row (CSR) arrays, so the forward and backward passes of
+the CPM algorithm run vectorized over one level at a time.
+"""
+
+import numpy
+
+
+def _gather_segments(offsets, rows):
+    """Returns the positions of the CSR entries of the given rows, row after row."""
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    total = lengths.sum()
+    if total == 0:
+        return numpy.zeros(0, dtype=numpy.int64)
+    shifts = numpy.repeat(starts - numpy.cumsum(lengths) + lengths, lengths)
+    return shifts + numpy.arange(total)
+
+
+def csr(rows, count):
+    """Groups the entries of an array by row.
+
+    Args:
+        rows: an int array, the row of every entry
+        count: the number of rows
+
+    Returns:
+        A tuple of two int arrays. The offsets of every row, and the entries
+        sorted by row.
+    """
+    offsets = numpy.zeros(count + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(rows, minlength=count), out=offsets[1:])
+    return offsets, numpy.argsort(rows, kind='mergesort')
+
+
+def topological_levels(count, tails, heads):
+    """Sorts the nodes of a directed acyclic graph by topological level.
+
+    Args:
+        count: the number of nodes, which are numbered from 0 to count - 1
+        tails: an int array, the first node of every arc
+        heads: an int array, the last node of every arc
+
+    Returns:
+        A tuple of two int arrays. The nodes sorted by topological level, and the
+        offsets of every level in the former array.
+
+    Raises:
+        ValueError: if the graph contains a cycle.
+    """
+    indegree = numpy.bincount(heads, minlength=count)
+    offsets, arcs = csr(tails, count)
+    sorted_heads = heads[arcs]
+    frontier = numpy.flatnonzero(indegree == 0)
+    levels = []
+    while frontier.size:
+        levels.append(frontier)
+        reached, reached_count = numpy.unique(sorted_heads[_gather_segments(offsets, frontier)],
+                                              return_counts=True)
+        indegree[reached] -= reached_count
+        frontier = reached[indegree[reached] == 0]
+    order = numpy.concatenate(levels) if levels else numpy.zeros(0, dtype=numpy.int64)
+    if order.size < count:
+        raise ValueError('The network contains a cycle.')
+    level_offsets = numpy.zeros(len(levels) + 1, dtype=numpy.int64)
+    numpy.cumsum([level.size for level in levels], out=level_offsets[1:])
+    return order, level_offsets
+
+
+class CompactNetwork(object):
+    """Array-backed representation of a project network.
+
+    Attributes:
+        nodes: an array with the original identifiers of the nodes, in topological order.
+        level_offsets: an int32 array. The nodes of level i are the nodes
+            level_offsets[i] to level_offsets[i+1] - 1.
+        tails: an int32 array, the first (renumbered) node of every activity.
+        heads: an int32 array, the last (renumbered) node of every activity.
+        predecessor_offsets, predecessor_activities: int32 CSR arrays of the
+            activities that arrive at every node.
+        successor_offsets, successor_activities: int32 CSR arrays of the
+            activities that leave every node.
+        normal_duration, normal_cost, crash_duration, crash_cost, cost_slope:
+            float64 arrays, one value for every activity. The cost slope of
+            imaginary activities is NaN.
+        indirect_cost: the indirect cost of the project per time unit.
+    """
+
+    def __init__(self, node1, node2, normal_duration, normal_cost, crash_duration, crash_cost, indirect_cost=0):
+        node1 = numpy.asarray(node1)
+        node2 = numpy.asarray(node2)
+        identifiers, numbered = numpy.unique(numpy.concatenate([node1, node2]), return_inverse=True)
+        order, level_offsets = topological_levels(identifiers.size, numbered[:node1.size], numbered[node1.size:])
+        position = numpy.empty(identifiers.size, dtype=numpy.int32)
+        position[order] = numpy.arange(identifiers.size, dtype=numpy.int32)
+
+        self.nodes = identifiers[order]
+        self.level_offsets = level_offsets.astype(numpy.int32)
+        self.tails = position[numbered[:node1.size]]
+        self.heads = position[numbered[node1.size:]]
+        offsets, activities = csr(self.heads, self.nodes.size)
+        self.predecessor_offsets = offsets.astype(numpy.int32)
+        self.predecessor_activities = activities.astype(numpy.int32)
+        offsets, activities = csr(self.tails, self.nodes.size)
+        self.successor_offsets = offsets.astype(numpy.int32)
+        self.successor_activities = activities.astype(numpy.int32)
+
+        self.normal_duration = numpy.asarray(normal_duration, dtype=numpy.float64)
+        self.normal_cost = numpy.asarray(normal_cost, dtype=numpy.float64)
+        self.crash_duration = numpy.asarray(crash_duration, dtype=numpy.float64)
+        self.crash_cost = numpy.asarray(crash_cost, dtype=numpy.float64)
+        compression = self.normal_duration - self.crash_duration
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            self.cost_slope = numpy.where(compression != 0, (self.crash_cost - self.normal_cost) / compression,
+                                          numpy.nan)
+        self.indirect_cost = indirect_cost
+
+    @classmethod
+    def from_project(cls, project):
+        """Creates a compact network from a project, as returned by the validate() function."""
+        activities = project['activities']
+        columns = dict((key, [activity[key] for _, _, activity in activities])
+                       for key in ('normal_duration', 'normal_cost', 'crash_duration', 'crash_cost'))
+        return cls([node1 for node1, _, _ in activities], [node2 for _, node2, _ in activities],
+                   indirect_cost=project['info']['indirect_cost'], **columns)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Creates a compact network from a ProjectColumns object, without converting its activities."""
+        return cls(columns.node1, columns.node2, columns.normal_duration, columns.normal_cost,
+                   columns.crash_duration, columns.crash_cost, indirect_cost=columns.indirect_cost)
+
+    def __len__(self):
+        return self.tails.size
+
+    def activities(self):
+        """Returns a list of tuples, the activities of the network in their original order."""
+        return zip(self.nodes[self.tails].tolist(), self.nodes[self.heads].tolist())
+
+    def _forward_pass(self, duration):
+        eet = numpy.zeros(duration.shape[:-1] + (self.nodes.size,))
+        for level in range(1, self.level_offsets.size - 1):
+            first, last = self.level_offsets[level], self.level_offsets[level + 1]
+            start, end = self.predecessor_offsets[first], self.predecessor_offsets[last]
+            activities = self.predecessor_activities[start:end]
+            candidates = eet[..., self.tails[activities]] + duration[..., activities]
+            eet[..., first:last] = numpy.maximum.reduceat(candidates, self.predecessor_offsets[first:last] - start,
+                                                          axis=-1)
+        return eet
+
+    def _backward_pass(self, duration, eet):
+        # Like the networkx implementation, a node without successors keeps its
+        # earliest event time as its latest event time.
+        let = eet.copy()
+        for level in reversed(range(self.level_offsets.size - 1)):
+            first, last = self.level_offsets[level], self.level_offsets[level + 1]
+            start, end = self.successor_offsets[first], self.successor_offsets[last]
+            if start == end:
+                continue
+            activities = self.successor_activities[start:end]
+            candidates = let[..., self.heads[activities]] - duration[..., activities]
+            starts = self.successor_offsets[first:last]
+            has_successors = starts < self.successor_offsets[first + 1:last + 1]
+            let[..., first:last][..., has_successors] = numpy.minimum.reduceat(
+                candidates, starts[has_successors] - start, axis=-1)
+        return let
+
+    def solve(self, duration=None):
+        """Calculates the event times and the total float of the network.
+
+        Args:
+            duration: an array with the duration of every activity. The normal
+                duration of the activities is used if it is not given. A two-dimensional
+                array, with one row of durations for every scenario, solves all the
+                scenarios at once.
+
+        Returns:
+            A tuple of three float64 arrays. The earliest and the latest event time of
+            every node, in the order of the nodes attribute, and the total float of
+            every activity, with one row for every scenario if more than one is given.
+        """
+        if duration is None:
+            duration = self.normal_duration
+        duration = numpy.asarray(duration, dtype=numpy.float64)
+        eet = self._forward_pass(duration)
+        let = self._backward_pass(duration, eet)
+        total_float = let[..., self.heads] - eet[..., self.tails] - duration
+        return eet, let, total_float
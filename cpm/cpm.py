@@ -12,13 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
-import pickle
-import warnings
+import collections
 
-import jsonschema
-import matplotlib.pyplot
 import networkx
+import numpy
+
+import aon
+import columnar
+import compact
+import crashing
+import curve
+import history
+import incremental
+import profiling
+import render
 
 PROJECT_SCHEMA = {
     "title": "Project Activities",
@@ -32,133 +39,376 @@ PROJECT_SCHEMA = {
             "properties": {
                 "indirect_cost": {
                     "type": "integer"
+                },
+                "resources": {
+                    "type": "object",
+                    "additionalProperties": {
+                        "type": "integer",
+                        "minimum": 0
+                    }
                 }
-            }
+            },
+            "required": ["indirect_cost"]
         },
         "activities": {
             "type": "array",
             "minItems": 1,
-            "items": [
-                {
-                    "type": "array",
-                    "minItems": 3,
-                    "maxItems": 3,
-                    "items": [
-                        {
-                            "type": "integer"
-                        },
-                        {
-                            "type": "integer"
+            "items": {
+                "type": "array",
+                "minItems": 3,
+                "maxItems": 3,
+                "items": [
+                    {
+                        "type": "integer"
+                    },
+                    {
+                        "type": "integer"
+                    },
+                    {
+                        "type": "object",
+                        "properties": {
+                            "normal_duration": {
+                                "type": "integer"
+                            },
+                            "normal_cost": {
+                                "type": "integer"
+                            },
+                            "crash_duration": {
+                                "type": "integer"
+                            },
+                            "crash_cost": {
+                                "type": "integer"
+                            },
+                            "optimistic_duration": {
+                                "type": "number",
+                                "minimum": 0
+                            },
+                            "most_likely_duration": {
+                                "type": "number",
+                                "minimum": 0
+                            },
+                            "pessimistic_duration": {
+                                "type": "number",
+                                "minimum": 0
+                            },
+                            "distribution": {
+                                "enum": ["pert", "triangular", "uniform"]
+                            },
+                            "resources": {
+                                "type": "object",
+                                "additionalProperties": {
+                                    "type": "integer",
+                                    "minimum": 0
+                                }
+                            }
                         },
-                        {
-                            "type": "object",
-                            "properties": {
-                                "normal_duration": {
-                                    "type": "integer"
-                                },
-                                "normal_cost": {
-                                    "type": "integer"
-                                },
-                                "crash_duration": {
+                        "required": ["normal_duration", "normal_cost", "crash_duration", "crash_cost"],
+                        "dependencies": {
+                            "optimistic_duration": ["most_likely_duration", "pessimistic_duration"],
+                            "most_likely_duration": ["optimistic_duration", "pessimistic_duration"],
+                            "pessimistic_duration": ["optimistic_duration", "most_likely_duration"],
+                            "distribution": ["optimistic_duration", "most_likely_duration", "pessimistic_duration"]
+                        }
+                    }
+                ],
+                "additionalItems": False
+            }
+        }
+    },
+    "required": ["info", "activities"]
+}
+
+_ACTIVITY_SCHEMA = PROJECT_SCHEMA["properties"]["activities"]["items"]["items"][2]
+
+# In the activity-on-node form, every activity is an object with its own id and
+# the ids of its predecessors, optionally with a finish-to-start lag
+AON_PROJECT_SCHEMA = {
+    "title": "Project Activities on Nodes",
+    "description": "The JSON schema of project activities file, in the activity-on-node form",
+    "$schema": "http://json-schema.org/draft-04/schema",
+    "type": "object",
+    "additionalProperties": False,
+    "properties": {
+        "info": PROJECT_SCHEMA["properties"]["info"],
+        "activities": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "properties": dict(_ACTIVITY_SCHEMA["properties"], **{
+                    "id": {
+                        "type": "integer"
+                    },
+                    "predecessors": {
+                        "type": "array",
+                        "items": {
+                            "anyOf": [
+                                {
                                     "type": "integer"
                                 },
-                                "crash_cost": {
-                                    "type": "integer"
+                                {
+                                    "type": "object",
+                                    "properties": {
+                                        "id": {
+                                            "type": "integer"
+                                        },
+                                        "lag": {
+                                            "type": "integer",
+                                            "minimum": 0
+                                        }
+                                    },
+                                    "required": ["id", "lag"],
+                                    "additionalProperties": False
                                 }
-                            },
-                            "required": ["normal_duration", "normal_cost", "crash_duration", "crash_cost"],
-                            "additionalItems": False
+                            ]
                         }
-                    ]
-                }
-            ]
+                    }
+                }),
+                "required": ["id"] + _ACTIVITY_SCHEMA["required"],
+                "dependencies": _ACTIVITY_SCHEMA["dependencies"]
+            }
         }
-    }
+    },
+    "required": ["info", "activities"]
 }
 
 
+CRASHING_METHODS = ('greedy', 'mincut')
+ENGINES = ('networkx', 'compact')
+COLUMNAR_EXTENSION = '.npz'
+
+
 class ProjectValidationException(Exception):
-    pass
+    """Raised when a project file is not valid.
+
+    Attributes:
+        errors: a list of strings, every problem found in the project file.
+    """
+
+    def __init__(self, message, errors=None):
+        super(ProjectValidationException, self).__init__(message)
+        self.errors = errors if errors is not None else [message]
+
+
+MAX_REPORTED_ERRORS = 20
+
+_validator = None
+
+
+def _as_numbers(values):
+    # The compact engine works with floats, while the project files have integers
+    if numpy.array_equal(values, numpy.floor(values)):
+        return values.astype(numpy.int64).tolist()
+    return [int(value) if value.is_integer() else value for value in values.tolist()]
+
+
+def _walk_critical_paths(successors, source, sink):
+    """Enumerates the walks from the source to the sink of the critical subgraph.
+
+    Args:
+        successors: a dictionary that maps a node to the list of its critical successors
+        source: the first node of the network
+        sink: the last node of the network
+
+    Returns:
+        A generator of lists of tuples.
+    """
+    if source not in successors:
+        return
+    path = []
+    stack = [(source, iter(successors[source]))]
+    while stack:
+        node, remaining = stack[-1]
+        successor = next(remaining, None)
+        if successor is None:
+            stack.pop()
+            if path:
+                path.pop()
+        elif successor == sink:
+            yield path + [(node, successor)]
+        else:
+            path.append((node, successor))
+            stack.append((successor, iter(successors[successor])))
+
+
+def critical_paths(result):
+    """Enumerates the critical paths of an iteration of the CPM algorithm.
+
+    The result rows keep only the critical activities of every iteration, since
+    the number of critical paths may grow exponentially with the size of the
+    network, and the paths are constructed only when they are asked for.
+
+    Args:
+        result: a dictionary, the result row of an iteration
+
+    Returns:
+        A generator of lists of tuples, or of lists of activity ids for a project
+        in the activity-on-node form.
+    """
+    if 'critical_arcs' in result:
+        # A project in the activity-on-node form is solved as its conversion to
+        # the activity-on-arrow form, whose paths are told by the ids of the
+        # activities, without the dummy activities
+        identifiers = dict(((node1, node2), identifier) for node1, node2, identifier in result['critical_arcs'])
+        return ([identifiers[activity] for activity in path if identifiers[activity] is not None]
+                for path in _walk_arcs(identifiers))
+    return _walk_arcs(result['critical_activities'])
+
+
+def _walk_arcs(critical_activities):
+    successors = {}
+    heads = set()
+    for node1, node2 in critical_activities:
+        successors.setdefault(node1, []).append(node2)
+        heads.add(node2)
+    if not successors:
+        return iter(())
+    # Every critical activity lies on a critical path, so the critical subgraph
+    # has a single node without critical predecessors and a single one without
+    # critical successors
+    source = next(node for node in successors if node not in heads)
+    sink = next(node for node in heads if node not in successors)
+    return _walk_critical_paths(successors, source, sink)
 
 
 def validate(project_file):
     """Validates a project file.
 
+    The project file is read in chunks, and every activity is checked as soon as
+    it is read. Besides the JSON schema, the network of the activities is checked
+    for cycles, for more than one start or end node, for duplicate activities, and
+    for crash durations that are greater than the normal ones.
+
+    A project whose activities are objects is validated in the activity-on-node
+    form instead, and its network is checked for duplicate ids, unknown
+    predecessors and cycles.
+
+    A filename with the .npz extension is loaded as a project in the columnar
+    format instead, and the same checks are made on its columns.
+
     Args:
-        project_file: a filename or File Object that describes the project in JSON
+        project_file: a filename or File Object that describes the project in JSON,
+            or the filename of a project in the columnar format
 
     Returns:
-        a dictionary, as converted from the project file with the json.load() function
+        a dictionary, as converted from the project file, or a ProjectColumns
+        object for a project in the columnar format
+
+    Raises:
+        ProjectValidationException: if the project file is not valid. Its errors
+            attribute holds every problem found in the project file.
     """
-    is_filename = False
-    if not hasattr(project_file, 'read'):
-        project_file = open(project_file)
-        is_filename = True
-    try:
-        project = json.load(project_file)
-        jsonschema.validate(project, PROJECT_SCHEMA)
-    except ValueError:
-        raise ProjectValidationException('The project file is not a valid JSON file.')
-    except jsonschema.ValidationError:
-        raise ProjectValidationException('The project file does not comply with the needed JSON schema.')
-    finally:
-        if is_filename:
-            project_file.close()
+    global _validator
+    # jsonschema is imported with the validation module, so that solving a
+    # project that is already validated does not load it
+    import validation
+    if _validator is None:
+        _validator = validation.ProjectValidator(PROJECT_SCHEMA, alternative=validation.ProjectValidator(
+            AON_PROJECT_SCHEMA, checker=validation.TaskChecker))
+
+    if not hasattr(project_file, 'read') and project_file.endswith(COLUMNAR_EXTENSION):
+        try:
+            project = columnar.ProjectColumns.load(project_file)
+        except ValueError:
+            raise ProjectValidationException('The project file is not a valid columnar project file.')
+        errors = validation.check_columns(project)
+    else:
+        is_filename = False
+        if not hasattr(project_file, 'read'):
+            project_file = open(project_file, 'rb')
+            is_filename = True
+        try:
+            project, errors = _validator.validate(project_file)
+        except ValueError:
+            raise ProjectValidationException('The project file is not a valid JSON file.')
+        finally:
+            if is_filename:
+                project_file.close()
+    if errors:
+        message = '\n'.join(['The project file is not valid:'] + errors[:MAX_REPORTED_ERRORS])
+        if len(errors) > MAX_REPORTED_ERRORS:
+            message += '\n... and {} more errors'.format(len(errors) - MAX_REPORTED_ERRORS)
+        raise ProjectValidationException(message, errors)
     return project
 
 
-def draw_network(graph, pos, images_dir, iteration):
-    warnings.filterwarnings('ignore')
-    node_labels = dict((n, str(str(n) + '(' + str(d['eet']) + ',' + str(d['let']) + ')')) for n, d in graph.nodes(data=True))
-    edge_labels = dict([((u, v), graph.edge[u][v]['normal_duration']) for u, v in graph.edges()])
-    networkx.draw_networkx_labels(graph, pos, labels=node_labels)
-    networkx.draw_networkx_edge_labels(graph, pos, edge_labels=edge_labels)
-    networkx.draw_networkx(graph, pos=pos, with_labels=False, node_size=3000, node_color='c', node_shape='o')
-    matplotlib.pyplot.axis('off')
-    image = 'network-' + str(iteration) + '.png'
-    matplotlib.pyplot.savefig(images_dir + image)
-    matplotlib.pyplot.close()
-    return image
-
-
 class CriticalPathMethod(object):
     """Implementation of the Critical Path Method algorithm.
 
     Attributes:
         graph: a DiGraph object of the networkx library. It represents the network
             that the CPM algorithm will run on.
-        snapshots: a list of pickled representations of the graph. As the network
-            is getting solved, every iteration of cpm on the graph is stored here.
-        paths: a list of lists of tuples. A list of the available paths, starting
-            from the first node of the network, and arriving at the last node of it,
-            where each path is composed of activities in the form of tuples.
+        history: an IterationHistory object. As the network is getting solved, the
+            result of every iteration of cpm, and the activities that changed in it,
+            are stored here.
+        source: the node of the network that no activity arrives at.
+        sink: the node of the network that no activity leaves.
+        topological_order: a list of the nodes of the network in topological order.
+        compact: a CompactNetwork object that solves the network with arrays, if
+            the compact engine is used, or None.
+        schedule: an IncrementalSchedule object that keeps the event times of the
+            network as the duration of its activities changes, once run_cpm() or
+            what_if() has been called, or None.
+        profiler: a Profiler object that measures the phases of the algorithm, or
+            None if they are not measured.
+        activity_arcs: for a project in the activity-on-node form, a dictionary
+            that maps the id of every activity to the activity (node1, node2) of
+            the network, and None for a project in the activity-on-arrow form.
+            The rest of the activities of such a network are dummy activities.
     """
 
-    def __init__(self, project):
-        self.graph = networkx.DiGraph(indirect_cost=project['info']['indirect_cost'])
-        self.graph.add_edges_from(project['activities'])
-        self.snapshots = []
-        self.paths = self.__find_all_simple_paths(source=self.graph.nodes()[0], target=self.graph.nodes()[-1])
-
-    def __find_all_simple_paths(self, source, target):
-        """Finds all the paths between two nodes of a graph.
-
-        Args:
-            source (int): the starting node
-            target (int): the finishing node
-
-        Returns:
-            A list of lists of tuples. A list of the available paths, where
-            each path is composed of activities in the form of tuples.
-            For example: [ [(1,2), (2,3), (3,4)], [(1,2), (2,4)] ]
-        """
-        paths = []
-        for i, path in enumerate(networkx.all_simple_paths(self.graph, source, target)):
-            paths.append([])
-            for j, elem in enumerate(path):
-                if j+1 <= len(path)-1:
-                    paths[i].append((path[j], path[j+1]))
-        return paths
+    def __init__(self, project, engine='networkx', history_dir=None, profiler=None):
+        if engine not in ENGINES:
+            raise ValueError('Unknown engine: ' + str(engine))
+        self.profiler = profiler
+        self.__profiler = profiler if profiler is not None else profiling.NULL_PROFILER
+        with self.__profiler.phase('build'):
+            self.__build(project, engine, history_dir)
+
+    def __build(self, project, engine, history_dir):
+        self.activity_arcs = None
+        self.__activity_ids = None
+        if aon.is_aon_project(project):
+            identifiers = [activity['id'] for activity in project['activities']]
+            project, self.activity_arcs = aon.to_aoa(project)
+            # The activities of the network in the order of the project
+            self.__activity_ids = collections.OrderedDict(
+                (self.activity_arcs[identifier], identifier) for identifier in identifiers)
+        if isinstance(project, columnar.ProjectColumns):
+            # The activities are taken straight from the columns, without a
+            # project dictionary in between, and the columns are sorted and
+            # indexed with arrays instead of the graph
+            self.graph = networkx.DiGraph(indirect_cost=project.indirect_cost)
+            self.graph.add_edges_from(project.activities())
+            self.topological_order = project.topological_order()
+            self.__normal_durations = project.normal_durations()
+        else:
+            self.graph = networkx.DiGraph(indirect_cost=project['info']['indirect_cost'])
+            self.graph.add_edges_from(project['activities'])
+            self.topological_order = networkx.topological_sort(self.graph)
+            self.__normal_durations = dict(((node1, node2), activity['normal_duration'])
+                                           for node1, node2, activity in self.graph.edges(data=True))
+            if self.__activity_ids is not None:
+                # The images tell the activities by their ids
+                for node1, node2 in self.graph.edges():
+                    self.graph.edge[node1][node2]['id'] = self.__activity_ids.get((node1, node2))
+        self.history = history.IterationHistory(history_dir)
+        # The validated network has exactly one start and one end node, which
+        # are the first and the last node of any topological order
+        self.source = self.topological_order[0]
+        self.sink = self.topological_order[-1]
+        self.__topological_index = dict((node, index) for index, node in enumerate(self.topological_order))
+        self.compact = None
+        if engine == 'compact':
+            # The arrays are built from the activities of the project, not from the graph
+            if isinstance(project, columnar.ProjectColumns):
+                self.compact = compact.CompactNetwork.from_columns(project)
+            else:
+                self.compact = compact.CompactNetwork.from_project(project)
+            self.__compact_activities = self.compact.activities()
+        self.schedule = None
+        # The maximum flow of the last minimum cost cut, which the next cut starts from
+        self.__cut_flows = {}
 
     def _calculate_cost_slope(self):
         """Calculates the cost slope of every activity in the network."""
@@ -172,12 +422,28 @@ class CriticalPathMethod(object):
                 activity['cost_slope'] = None
 
     def _solve_network(self, kw_duration='normal_duration'):
+        if self.compact is not None:
+            self.__solve_compact_network(kw_duration)
+            return
         self.__calculate_earliest_event_time(kw_duration)
         self.__calculate_latest_event_time(kw_duration)
         self.__calculate_total_float(kw_duration)
 
+    def __solve_compact_network(self, kw_duration):
+        activities = self.__compact_activities
+        duration = numpy.fromiter((self.graph.edge[node1][node2][kw_duration] for node1, node2 in activities),
+                                  dtype=numpy.float64, count=len(activities))
+        eet, let, total_float = self.compact.solve(duration)
+        nodes = self.graph.node
+        for node, node_eet, node_let in zip(self.compact.nodes.tolist(), _as_numbers(eet), _as_numbers(let)):
+            nodes[node]['eet'] = node_eet
+            nodes[node]['let'] = node_let
+        edges = self.graph.edge
+        for (node1, node2), activity_total_float in zip(activities, _as_numbers(total_float)):
+            edges[node1][node2]['total_float'] = activity_total_float
+
     def __calculate_earliest_event_time(self, kw_duration):
-        for node in self.graph.nodes():
+        for node in self.topological_order:
             max_eet = 0
             if self.graph.predecessors(node):
                 for predecessor in self.graph.predecessors(node):
@@ -187,11 +453,11 @@ class CriticalPathMethod(object):
             self.graph.node[node]['eet'] = max_eet
 
     def __calculate_latest_event_time(self, kw_duration):
-        for node in reversed(self.graph.nodes()):
+        for node in reversed(self.topological_order):
             if not self.graph.successors(node):
                 self.graph.node[node]['let'] = self.graph.node[node]['eet']
             else:
-                min_let = self.graph.node[self.graph.nodes()[-1]]['eet']
+                min_let = self.graph.node[self.sink]['eet']
                 for successor in self.graph.successors(node):
                     let = self.graph.node[successor]['let'] - self.graph.edge[node][successor][kw_duration]
                     if min_let > let:
@@ -205,7 +471,9 @@ class CriticalPathMethod(object):
                                        activity[kw_duration])
 
     def __get_network_duration(self):
-        return self.graph.node[self.graph.nodes()[-1]]['let']
+        if self.schedule is not None:
+            return self.schedule.duration
+        return self.graph.node[self.sink]['let']
 
     def __get_direct_cost(self, kw_cost='normal_cost'):
         direct_cost = 0
@@ -226,49 +494,256 @@ class CriticalPathMethod(object):
             A list of tuples. Every tuple represents a critical activity.
             For example: [ (1, 2), (2, 3), (2, 4), (3, 4) ]
         """
+        if self.schedule is not None:
+            return self.schedule.critical_activities()
         critical_activities = []
         for node1, node2 in self.graph.edges():
             if self.graph.edge[node1][node2]['total_float'] == 0:
                 critical_activities.append((node1, node2))
         return critical_activities
 
+    def __report_critical_activities(self, critical_activities):
+        """Describes the critical activities of the network in a result row.
+
+        Args:
+            critical_activities: a list of tuples, where a tuple represents a critical activity.
+
+        Returns:
+            A dictionary with the critical activities. For a project in the
+            activity-on-node form, they are the ids of the critical activities, in
+            the order of the project, and the critical arcs of the network are kept
+            as well, as tuples (node1, node2, id), where the id of a dummy activity
+            is None, so that the critical paths can be constructed.
+        """
+        if self.__activity_ids is None:
+            return {'critical_activities': critical_activities}
+        critical = set(critical_activities)
+        return {
+            'critical_activities': [identifier for activity, identifier in self.__activity_ids.items()
+                                    if activity in critical],
+            'critical_arcs': [(node1, node2, self.__activity_ids.get((node1, node2)))
+                              for node1, node2 in critical_activities]
+        }
+
+    def __sort_topologically(self, nodes, reverse=False):
+        return sorted(nodes, key=self.__topological_index.get, reverse=reverse)
+
+    def __get_critical_successors(self, critical_activities):
+        """Builds the adjacency of the critical subgraph of the network.
+
+        Only the critical activities that lead to the sink are kept, so that
+        every walk from the source along the returned adjacency is a critical path.
+
+        Args:
+            critical_activities: a list of tuples, where a tuple represents a critical activity.
+
+        Returns:
+            A dictionary that maps a node to the list of its critical successors.
+        """
+        successors = {}
+        for node1, node2 in critical_activities:
+            successors.setdefault(node1, []).append(node2)
+        leads_to_sink = set([self.sink])
+        for node in self.__sort_topologically(successors, reverse=True):
+            if any(successor in leads_to_sink for successor in successors.get(node, [])):
+                leads_to_sink.add(node)
+        return dict((node, [successor for successor in node_successors if successor in leads_to_sink])
+                    for node, node_successors in successors.items() if node in leads_to_sink)
+
     def __get_critical_paths(self, critical_activities):
         """Finds all the critical paths of the network.
 
         A network may have more than one critical paths. Based on the critical activities,
-        it constructs the critical path(s) of the network.
+        it constructs the critical path(s) of the network with a depth-first traversal
+        of the critical subgraph, so the rest of the paths of the network are never visited.
 
         Args:
             critical_activities: a list of tuples, where a tuple represents a critical activity.
 
         Returns:
-            A list of lists of tuples.
+            A generator of lists of tuples.
         """
-        critical_paths = []
-        for path in self.paths:
-            if set(path) <= set(critical_activities):
-                critical_paths.append(path)
-        return critical_paths
+        return _walk_critical_paths(self.__get_critical_successors(critical_activities), self.source, self.sink)
 
-    def __remove_crashed_activities(self, critical_path):
-        return filter(lambda critical_activity:
-                      self.graph.edge[critical_activity[0]][critical_activity[1]]['normal_duration'] >
-                      self.graph.edge[critical_activity[0]][critical_activity[1]]['crash_duration'], critical_path)
+    def __count_critical_paths(self, critical_activities):
+        """Counts the critical paths of the network without constructing them.
 
-    def _reduce_network_duration(self):
+        Args:
+            critical_activities: a list of tuples, where a tuple represents a critical activity.
+
+        Returns:
+            An integer.
+        """
+        successors = self.__get_critical_successors(critical_activities)
+        counts = {self.sink: 1}
+        for node in self.__sort_topologically(successors, reverse=True):
+            counts[node] = sum(counts[successor] for successor in successors[node])
+        return counts.get(self.source, 0)
+
+    def get_critical_paths(self):
+        """Returns a generator of the critical paths of the network in its current state.
+
+        The paths of a project in the activity-on-node form are lists of activity
+        ids, as the paths of its result rows.
+        """
         critical_activities = self.__get_critical_activities()
-        critical_paths = self.__get_critical_paths(critical_activities)
-        for critical_path in critical_paths:
-            critical_path = self.__remove_crashed_activities(critical_path)
-            if len(critical_path) > 0:
-                min_critical_activity = critical_path[0]
-                min_cost_slope = self.graph.edge[min_critical_activity[0]][min_critical_activity[1]]['cost_slope']
-                for critical_activity in critical_path[1:]:
-                    if self.graph.edge[critical_activity[0]][critical_activity[1]]['cost_slope'] < min_cost_slope:
-                        min_critical_activity = critical_activity
-                        min_cost_slope = self.graph.edge[critical_activity[0]][critical_activity[1]]['cost_slope']
-                self.graph.edge[min_critical_activity[0]][min_critical_activity[1]]['normal_duration'] -= 1
-                self.graph.edge[min_critical_activity[0]][min_critical_activity[1]]['normal_cost'] += min_cost_slope
+        if self.__activity_ids is not None:
+            return critical_paths(self.__report_critical_activities(critical_activities))
+        return self.__get_critical_paths(critical_activities)
+
+    def count_critical_paths(self):
+        """Returns the number of critical paths of the network in its current state."""
+        return self.__count_critical_paths(self.__get_critical_activities())
+
+    def __crashable_cost_slope(self, node1, node2):
+        activity = self.graph.edge[node1][node2]
+        if activity['normal_duration'] > activity['crash_duration']:
+            return activity['cost_slope']
+        return crashing.INFINITY
+
+    def _reduce_network_duration(self):
+        """Reduces the duration of the network by shortening the cheapest activity of every critical path.
+
+        The cheapest activity of a critical path is the first one with the lowest
+        cost slope among its activities that are not crashed yet. The critical paths
+        are not constructed, since there may be exponentially many of them. Instead,
+        for every node of the critical subgraph, the highest cost slope that the
+        cheapest activity of a critical path can have is found from the source to
+        the node and from the node to the sink, and an activity is the cheapest one
+        of some critical path if the paths to its first node can do without a
+        cheaper or equally cheap activity, and the paths from its last node without
+        a cheaper one. Every such activity is shortened by one time unit.
+
+        Returns:
+            A list of tuples with the activities that changed.
+        """
+        successors = self.__get_critical_successors(self.__get_critical_activities())
+        nodes = self.__sort_topologically(set(successors) | set([self.sink]))
+        slopes = dict(((node1, node2), self.__crashable_cost_slope(node1, node2))
+                      for node1, node2_list in successors.items() for node2 in node2_list)
+        before = {self.source: crashing.INFINITY}
+        for node in nodes:
+            for successor in successors.get(node, ()):
+                value = min(before[node], slopes[(node, successor)])
+                if value > before.get(successor, -crashing.INFINITY):
+                    before[successor] = value
+        after = {self.sink: crashing.INFINITY}
+        for node in reversed(nodes):
+            if node in successors:
+                after[node] = max(min(slopes[(node, successor)], after[successor]) for successor in successors[node])
+
+        reduced_activities = []
+        for node in nodes:
+            for successor in successors.get(node, ()):
+                cost_slope = slopes[(node, successor)]
+                if cost_slope != crashing.INFINITY and before[node] > cost_slope <= after[successor]:
+                    reduced_activities.append((node, successor))
+        for node1, node2 in reduced_activities:
+            activity = self.graph.edge[node1][node2]
+            activity['normal_duration'] -= 1
+            activity['normal_cost'] += activity['cost_slope']
+        return reduced_activities
+
+    def __get_longest_path(self, changes, delta):
+        """Finds the longest path of the network after changing the duration of some activities.
+
+        Args:
+            changes: a dictionary that maps an activity to the time units its duration
+                decreases for every time unit of delta (1 for a shortened activity and
+                -1 for a lengthened one)
+            delta: the number of time units of the change
+
+        Returns:
+            A tuple of two numbers. The length of the path before the change, and the
+            time units the path shortens for every time unit of delta.
+        """
+        paths = {}
+        for node in self.topological_order:
+            length, gain = 0, 0
+            for predecessor in self.graph.predecessors(node):
+                predecessor_length, predecessor_gain = paths[predecessor]
+                candidate_length = predecessor_length + self.graph.edge[predecessor][node]['normal_duration']
+                candidate_gain = predecessor_gain + changes.get((predecessor, node), 0)
+                if candidate_length - delta * candidate_gain > length - delta * gain:
+                    length, gain = candidate_length, candidate_gain
+            paths[node] = (length, gain)
+        return paths[self.sink]
+
+    def __get_cut_step(self, changes):
+        """Finds how many time units the network can be reduced by with the same cut.
+
+        The step is limited by the crash and normal durations of the activities of the
+        cut, and by the non-critical paths of the network, which must not become longer
+        than the critical ones. The latter limit is found by repeatedly intersecting the
+        longest path of the network with the critical paths.
+
+        Args:
+            changes: a dictionary as in __get_longest_path
+
+        Returns:
+            An integer, which is zero if the network cannot be reduced by a whole time unit.
+        """
+        step = None
+        for (node1, node2), change in changes.items():
+            activity = self.graph.edge[node1][node2]
+            if change > 0:
+                limit = activity['normal_duration'] - activity['crash_duration']
+            else:
+                limit = self.__normal_durations[(node1, node2)] - activity['normal_duration']
+            if step is None or limit < step:
+                step = limit
+        network_duration = self.__get_network_duration()
+        while step > 0:
+            length, gain = self.__get_longest_path(changes, step)
+            if length - step * gain <= network_duration - step:
+                break
+            step = (network_duration - length) // (1 - gain)
+        return step
+
+    def _reduce_network_duration_by_cut(self):
+        """Reduces the duration of the network at the minimum cost.
+
+        The critical activities to shorten, and the previously shortened ones to lengthen
+        back, are found with a minimum cost cut of the critical subgraph, and the network
+        is reduced by as many time units as the cut remains the cheapest one.
+
+        Returns:
+            A list of tuples with the activities that changed, which is empty if the
+            network cannot be reduced any further.
+        """
+        arcs = []
+        for node1, node2 in self.__get_critical_activities():
+            activity = self.graph.edge[node1][node2]
+            upper = crashing.INFINITY
+            if activity['normal_duration'] > activity['crash_duration']:
+                upper = activity['cost_slope']
+            lower = 0
+            if activity['normal_duration'] < self.__normal_durations[(node1, node2)]:
+                lower = activity['cost_slope']
+            arcs.append((node1, node2, upper, lower))
+
+        attempts = [arcs]
+        if any(lower for _, _, _, lower in arcs):
+            # Lengthening activities back may only allow a fraction of a time unit,
+            # in which case the activities of the cut are just shortened.
+            attempts.append([(node1, node2, upper, 0) for node1, node2, upper, _ in arcs])
+        for attempt in attempts:
+            cut = crashing.minimum_cost_cut(attempt, self.source, self.sink, self.__cut_flows)
+            if cut is None:
+                continue
+            forward, backward = cut
+            lengthened = set((node1, node2) for node1, node2, _, lower in attempt if lower)
+            changes = dict((critical_activity, 1) for critical_activity in forward)
+            changes.update((critical_activity, -1) for critical_activity in backward
+                           if critical_activity in lengthened)
+            step = self.__get_cut_step(changes)
+            if step > 0:
+                for (node1, node2), change in changes.items():
+                    activity = self.graph.edge[node1][node2]
+                    activity['normal_duration'] -= change * step
+                    activity['normal_cost'] += change * step * activity['cost_slope']
+                return list(changes)
+        return []
 
     def __print_graph(self):
         # A method that helps with debugging the algorithm.
@@ -286,55 +761,213 @@ class CriticalPathMethod(object):
                 critical_activities.append((node1, node2))
         print critical_activities
 
-    def run_cpm(self):
-        """The high-level actions of the CPM algorithm."""
-        self._calculate_cost_slope()
+    def run_cpm(self, crashing='greedy', progress=None, stop_on_cost_increase=False):
+        """The high-level actions of the CPM algorithm.
 
-        self._solve_network(kw_duration='crash_duration')
-        crash_network_duration = self.__get_network_duration()
+        Args:
+            crashing: a string, the method that reduces the duration of the network.
+                It is 'greedy' for shortening the cheapest activity of every critical
+                path by one time unit at a time, or 'mincut' for the exact time-cost
+                tradeoff, which moves from one breakpoint of the cost curve to the next.
+            progress: a function that is called with the index and the result of
+                every iteration, as soon as the iteration is complete, or None.
+            stop_on_cost_increase: as in iterate_cpm()
+        """
+        for index, result in enumerate(self.iterate_cpm(crashing, stop_on_cost_increase)):
+            if progress is not None:
+                progress(index, result)
+
+    def iterate_cpm(self, crashing='greedy', stop_on_cost_increase=False):
+        """Runs the CPM algorithm one iteration at a time.
+
+        Every iteration is recorded in the history before its result is yielded, so
+        get_results() gathers the iterations that have been consumed, even if the
+        generator is closed before it is exhausted.
+
+        Args:
+            crashing: a string, as in run_cpm()
+            stop_on_cost_increase: a boolean, whether to stop after the first iteration
+                whose total cost is greater than the total cost of the previous one.
+                With the mincut crashing, the direct cost is a convex function of the
+                project duration, and so is the total cost when the indirect cost is
+                linear, so the optimum solution has been found by then. With the greedy
+                crashing, the direct cost is not convex, since the cheapest activity of
+                every critical path is not always the cheapest way to shorten the
+                project, and the iterations may stop before the optimum solution.
+
+        Returns:
+            A generator of dictionaries, the result of every iteration.
+        """
+        if crashing not in CRASHING_METHODS:
+            raise ValueError('Unknown crashing method: ' + str(crashing))
+        # The crashing method is checked before the first iteration is asked for
+        return self.__iterate_cpm(crashing, stop_on_cost_increase)
+
+    def __iterate_cpm(self, crashing, stop_on_cost_increase):
+        profiler = self.__profiler
+        with profiler.phase('cost_slope'):
+            self._calculate_cost_slope()
+
+        with profiler.phase('solve'):
+            self.schedule = None
+            self.__cut_flows = {}
+            self._solve_network(kw_duration='crash_duration')
+            crash_network_duration = self.__get_network_duration()
 
-        while True:
             self._solve_network()
+            self.schedule = incremental.IncrementalSchedule(self.graph, self.topological_order, self.sink,
+                                                            solved=True)
+        activity_state = self.__get_activity_state(self.graph.edges())
+        changes = activity_state
+        direct_cost = self.__get_direct_cost()
+        previous_total_cost = None
+        try:
+            while True:
+                profiler.start_iteration()
+                network_duration = self.__get_network_duration()
+                indirect_cost = network_duration * self.graph.graph['indirect_cost']
+                with profiler.phase('critical_paths'):
+                    critical_activities = self.__get_critical_activities()
+                    critical_path_count = self.__count_critical_paths(critical_activities)
+                result = {
+                    'project_duration': network_duration,
+                    'critical_path_count': critical_path_count,
+                    'direct_cost': direct_cost,
+                    'indirect_cost': indirect_cost,
+                    'total_cost': direct_cost + indirect_cost
+                }
+                result.update(self.__report_critical_activities(critical_activities))
+                with profiler.phase('record'):
+                    self.history.record(result, changes)
+                profiler.count(project_duration=network_duration, critical_activities=len(critical_activities),
+                               critical_paths=critical_path_count, history_bytes=self.history.nbytes)
+                yield result
+
+                if not network_duration > crash_network_duration:
+                    break
+                if stop_on_cost_increase and previous_total_cost is not None and \
+                        result['total_cost'] > previous_total_cost:
+                    break
+                previous_total_cost = result['total_cost']
+                with profiler.phase('reduce'):
+                    if crashing == 'mincut':
+                        changed_activities = self._reduce_network_duration_by_cut()
+                    else:
+                        changed_activities = self._reduce_network_duration()
+                if not changed_activities:
+                    break
+
+                changes = self.__get_activity_state(changed_activities)
+                for activity, (normal_duration, normal_cost) in changes.items():
+                    direct_cost += normal_cost - activity_state[activity][1]
+                    activity_state[activity] = (normal_duration, normal_cost)
+                with profiler.phase('update'):
+                    self.schedule.update(changed_activities)
+                profiler.count(changed_activities=len(changed_activities),
+                               nodes_visited=self.schedule.nodes_visited)
+                profiler.end_iteration()
+        finally:
+            profiler.end_iteration()
+            # Bring the event times and total floats in the graph up to date.
+            with profiler.phase('solve'):
+                self._solve_network()
+
+    def what_if(self, durations):
+        """Finds the effect of changing the duration of some activities.
+
+        The network is left as it was, and only the part of it that is affected by
+        the changed activities is solved again.
+
+        Args:
+            durations: a dictionary that maps an activity to its new duration
 
-            self.graph.results = {
+        Returns:
+            A dictionary with the project duration and the critical activities of the
+            network with the changed durations.
+        """
+        if self.schedule is None:
+            self.schedule = incremental.IncrementalSchedule(self.graph, self.topological_order, self.sink)
+        previous_durations = dict((activity, self.graph.edge[activity[0]][activity[1]]['normal_duration'])
+                                  for activity in durations)
+        try:
+            for (node1, node2), normal_duration in durations.items():
+                self.graph.edge[node1][node2]['normal_duration'] = normal_duration
+            self.schedule.update(list(durations))
+            return {
                 'project_duration': self.__get_network_duration(),
-                'critical_paths': self.__get_critical_paths(self.__get_critical_activities()),
-                'direct_cost': self.__get_direct_cost(),
-                'indirect_cost': self.__get_indirect_cost(),
-                'total_cost': self.__get_total_cost()
+                'critical_activities': self.__get_critical_activities()
             }
-            self.snapshots.append(pickle.dumps(self.graph))
+        finally:
+            for (node1, node2), normal_duration in previous_durations.items():
+                self.graph.edge[node1][node2]['normal_duration'] = normal_duration
+            self.schedule.update(list(durations))
 
-            network_duration = self.__get_network_duration()
-            self._reduce_network_duration()
+    def __get_activity_state(self, activities):
+        return dict(((node1, node2), (self.graph.edge[node1][node2]['normal_duration'],
+                                      self.graph.edge[node1][node2]['normal_cost']))
+                    for node1, node2 in activities)
 
-            if not network_duration > crash_network_duration:
-                break
+    def __restore_activity_state(self, changes):
+        for node1, node2, normal_duration, normal_cost in changes:
+            self.graph.edge[node1][node2]['normal_duration'] = normal_duration
+            self.graph.edge[node1][node2]['normal_cost'] = normal_cost
+
+    def __describe_iterations(self):
+        """Rebuilds the network of every iteration and describes its image.
+
+        Returns:
+            A generator of dictionaries, as returned by render.describe_network().
+        """
+        pos = None
+        final_state = self.__get_activity_state(self.graph.edges())
+        try:
+            for iteration in range(len(self.history)):
+                self.__restore_activity_state(self.history.changes(iteration))
+                self._solve_network()
+                if iteration == 0:
+                    pos = render.get_layout(self.graph)
+                yield render.describe_network(self.graph, pos)
+        finally:
+            self.__restore_activity_state((node1, node2, normal_duration, normal_cost)
+                                          for (node1, node2), (normal_duration, normal_cost) in final_state.items())
+            self._solve_network()
 
-    def get_results(self, images_dir):
+    def get_results(self, images_dir=None, image_format='png', processes=None):
         """Gathers the results of the CPM algorithm.
 
         It gathers the results, images, and optimum solution as founded by the
-        CPM algorithm that run on the given project.
+        CPM algorithm that run on the given project. The results are read from the
+        history, and the network of every iteration is rebuilt from the changes of
+        its activities only in order to be drawn.
 
         Args:
-            images_dir: a string, that represents the path that the images will be stored
+            images_dir: a string, that represents the path that the images will be stored,
+                or None for gathering the results without drawing any images
+            image_format: a string, one of render.IMAGE_FORMATS
+            processes: the number of processes that draw the images in parallel,
+                or None for drawing them in the current process
 
         Returns:
             A tuple of three objects. The first object is a list of dictionaries,
             the second object is a list of strings, and the third object is a tuple
             of two numbers.
         """
-        pos = None
+        with self.__profiler.phase('results'):
+            results = list(self.history.results())
+            optimum_solution = min((result['total_cost'], result['project_duration']) for result in results)
+
         images = []
-        results = []
-        solutions = []
-        for iteration, snapshot in enumerate(self.snapshots):
-            graph = pickle.loads(snapshot)
-            results.append(graph.results)
-            solutions.append((graph.results['total_cost'], graph.results['project_duration']))
-            if iteration == 0:
-                pos = networkx.fruchterman_reingold_layout(graph)
-            images.append(draw_network(graph, pos, images_dir, iteration))
-        optimum_solution = min(solutions)
+        if images_dir is not None:
+            with self.__profiler.phase('render'):
+                renderer = render.NetworkRenderer(images_dir, image_format=image_format, processes=processes)
+                images = renderer.render(self.__describe_iterations())
         return results, images, optimum_solution
+
+    def cost_curve(self):
+        """Indexes the time-cost curve of the project, once run_cpm() has been called.
+
+        Returns:
+            A CostCurve object, with a breakpoint for every iteration of the CPM
+            algorithm.
+        """
+        return curve.CostCurve.from_results(self.history.results())
@@ -0,0 +1,173 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Minimum cost cuts for the exact time-cost tradeoff of a project network.
+
+The cuts follow the method of Phillips and Dessouky. Every critical activity
+is an arc with an upper capacity, the cost of shortening it by one time unit
+(infinite if it is already crashed), and a lower capacity, the saving of
+lengthening it by one time unit (zero if it is at its normal duration). The
+cost of a cut is the sum of the upper capacities of its forward arcs minus
+the sum of the lower capacities of its backward arcs, and a minimum cut is
+found through a maximum flow with lower bounds.
+"""
+
+import collections
+
+INFINITY = float('inf')
+
+
+def _add_arc(residual, node1, node2, capacity, reverse_capacity=0):
+    residual[node1][node2] = residual[node1].get(node2, 0) + capacity
+    residual[node2][node1] = residual[node2].get(node1, 0) + reverse_capacity
+
+
+def _augment(residual, source, sink):
+    """Pushes the maximum flow from source to sink with Dinic's algorithm.
+
+    Every phase finds the distance of every node from the source in the residual
+    network, and then saturates the shortest paths with a depth-first search that
+    drops the arcs that lead to dead ends, so a single breadth-first search serves
+    many augmenting paths.
+
+    Args:
+        residual: a dictionary of dictionaries with the residual capacities,
+            that is updated in place
+        source: the node that the flow starts from
+        sink: the node that the flow arrives at
+
+    Returns:
+        The value of the flow, which is infinite if an infinite path exists.
+    """
+    value = 0
+    while True:
+        levels = {source: 0}
+        queue = collections.deque([source])
+        while queue:
+            node = queue.popleft()
+            if sink in levels and levels[node] >= levels[sink]:
+                # The nodes that are as far as the sink are on no shortest path
+                break
+            for successor, capacity in residual[node].items():
+                if capacity > 0 and successor not in levels:
+                    levels[successor] = levels[node] + 1
+                    queue.append(successor)
+        if sink not in levels:
+            return value
+        arcs = {}
+        path = [source]
+        while True:
+            node = path[-1]
+            if node == sink:
+                pairs = zip(path, path[1:])
+                bottleneck = min(residual[node1][node2] for node1, node2 in pairs)
+                if bottleneck == INFINITY:
+                    return INFINITY
+                for node1, node2 in pairs:
+                    residual[node1][node2] -= bottleneck
+                    residual[node2][node1] += bottleneck
+                value += bottleneck
+                for index, (node1, node2) in enumerate(pairs):
+                    if residual[node1][node2] <= 0:
+                        del path[index + 1:]
+                        break
+                continue
+            if node not in arcs:
+                level = levels[node] + 1
+                arcs[node] = [successor for successor, capacity in residual[node].items()
+                              if capacity > 0 and levels.get(successor) == level]
+            successors = arcs[node]
+            while successors and residual[node][successors[-1]] <= 0:
+                successors.pop()
+            if successors:
+                path.append(successors[-1])
+            elif node == source:
+                break
+            else:
+                path.pop()
+                arcs[path[-1]].pop()
+
+
+def minimum_cost_cut(arcs, source, sink, flows=None):
+    """Finds a minimum cost cut of a network whose arcs have lower and upper capacities.
+
+    The nodes that the source reaches in the residual network of a maximum flow
+    are the same for every maximum flow, so the flow of a similar network, for
+    example the network of the previous step of the time-cost tradeoff, can be
+    the starting point of the search without changing the cut that is found. Only
+    the difference between the two networks has to be pushed then.
+
+    Args:
+        arcs: a list of tuples (node1, node2, upper, lower), one for every arc
+        source: the first node of the network
+        sink: the last node of the network
+        flows: a dictionary that maps an arc (node1, node2) to the flow that the
+            search starts from, or None to start from the lower capacities. It is
+            updated in place with the maximum flow of the network.
+
+    Returns:
+        A tuple of two lists of tuples (node1, node2), the forward and the backward
+        arcs of the cut, or None if every cut of the network has infinite cost or
+        the lower capacities cannot be satisfied.
+    """
+    residual = collections.defaultdict(dict)
+    excess = collections.defaultdict(int)
+    for node1, node2, upper, lower in arcs:
+        flow = lower
+        if flows is not None:
+            flow = min(max(flows.get((node1, node2), 0), lower), upper)
+        _add_arc(residual, node1, node2, upper - flow, flow - lower)
+        excess[node1] -= flow
+        excess[node2] += flow
+    if flows is not None:
+        # The flows are only valid once a maximum flow is found
+        flows.clear()
+
+    demand = sum(amount for amount in excess.values() if amount > 0)
+    if demand > 0:
+        # Find a flow that respects the lower capacities by circulating it
+        # from the sink back to the source through an auxiliary node.
+        circulation = demand + sum(upper for _, _, upper, _ in arcs if upper != INFINITY)
+        returning, supply, drain = object(), object(), object()
+        _add_arc(residual, sink, returning, circulation)
+        _add_arc(residual, returning, source, circulation)
+        for node, amount in excess.items():
+            if amount > 0:
+                _add_arc(residual, supply, node, amount)
+            elif amount < 0:
+                _add_arc(residual, node, drain, -amount)
+        if _augment(residual, supply, drain) < demand:
+            return None
+        for node in (returning, supply, drain):
+            for neighbor in residual.pop(node):
+                residual[neighbor].pop(node, None)
+
+    if _augment(residual, source, sink) == INFINITY:
+        return None
+    if flows is not None:
+        flows.update(((node1, node2), lower + residual[node2][node1]) for node1, node2, _, lower in arcs)
+
+    reachable = set([source])
+    queue = collections.deque([source])
+    while queue:
+        node = queue.popleft()
+        for successor, capacity in residual[node].items():
+            if capacity > 0 and successor not in reachable:
+                reachable.add(successor)
+                queue.append(successor)
+    forward = [(node1, node2) for node1, node2, _, _ in arcs
+               if node1 in reachable and node2 not in reachable]
+    backward = [(node1, node2) for node1, node2, _, _ in arcs
+                if node1 not in reachable and node2 in reachable]
+    return forward, backward
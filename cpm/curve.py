@@ -0,0 +1,153 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""An index of the time-cost curve of a project.
+
+Every iteration of the CPM algorithm is a breakpoint of the time-cost curve of
+the project, with its project duration and its costs. The breakpoints are kept
+in arrays sorted by project duration, along with the cheapest breakpoint up to
+every one of them, and sorted by cost, along with the shortest breakpoint up to
+every one of them, so the cheapest cost within a duration and the shortest
+duration within a budget are both found with a binary search.
+"""
+
+import json
+
+import numpy
+
+COSTS = ('direct_cost', 'total_cost')
+FIELDS = ('project_duration', 'direct_cost', 'indirect_cost', 'total_cost')
+
+
+def _as_number(value):
+    return int(value) if value.is_integer() else value
+
+
+def _running_argmin(values):
+    """Returns an int array with the index of the first minimum of every prefix of an array."""
+    lowest_before = numpy.minimum.accumulate(values)[:-1]
+    is_lower = numpy.concatenate([[True], values[1:] < lowest_before])
+    return numpy.maximum.accumulate(numpy.where(is_lower, numpy.arange(values.size), 0))
+
+
+class CostCurve(object):
+    """The breakpoints of the time-cost curve of a project, indexed for queries.
+
+    Attributes:
+        project_duration, direct_cost, indirect_cost, total_cost: float64 arrays,
+            one value for every breakpoint, by increasing project duration.
+    """
+
+    def __init__(self, project_duration, direct_cost, indirect_cost, total_cost):
+        order = numpy.argsort(numpy.asarray(project_duration, dtype=numpy.float64), kind='mergesort')
+        for field, values in zip(FIELDS, (project_duration, direct_cost, indirect_cost, total_cost)):
+            setattr(self, field, numpy.asarray(values, dtype=numpy.float64)[order])
+        # For every cost, the cheapest breakpoint up to every project duration, and
+        # the costs in increasing order with the shortest breakpoint up to every one
+        self.__cheapest = {}
+        self.__by_cost = {}
+        for cost in COSTS:
+            values = getattr(self, cost)
+            self.__cheapest[cost] = _running_argmin(values)
+            order = numpy.lexsort((self.project_duration, values))
+            self.__by_cost[cost] = (values[order], order[_running_argmin(self.project_duration[order])])
+
+    @classmethod
+    def from_results(cls, results):
+        """Creates a curve from the results of the CPM algorithm, as returned by get_results()."""
+        results = list(results)
+        return cls(*[[result[field] for result in results] for field in FIELDS])
+
+    def __len__(self):
+        return self.project_duration.size
+
+    def breakpoint(self, index):
+        """Returns a dictionary with the project duration and the costs of a breakpoint."""
+        return dict((field, _as_number(float(getattr(self, field)[index]))) for field in FIELDS)
+
+    def __check_cost(self, cost):
+        if cost not in COSTS:
+            raise ValueError('Unknown cost: ' + str(cost))
+
+    def cost_for_duration(self, duration, cost='total_cost'):
+        """Finds the cheapest breakpoint that finishes the project within a duration.
+
+        Args:
+            duration: the maximum project duration
+            cost: a string, one of COSTS, the cost that is minimized
+
+        Returns:
+            A dictionary, as returned by breakpoint(), or None if the project
+            cannot finish within the duration.
+
+        Raises:
+            ValueError: if the cost is unknown.
+        """
+        self.__check_cost(cost)
+        position = numpy.searchsorted(self.project_duration, duration, side='right') - 1
+        if position < 0:
+            return None
+        return self.breakpoint(self.__cheapest[cost][position])
+
+    def duration_for_budget(self, budget, cost='total_cost'):
+        """Finds the shortest breakpoint whose cost is within a budget.
+
+        Args:
+            budget: the maximum cost
+            cost: a string, one of COSTS, the cost that the budget limits
+
+        Returns:
+            A dictionary, as returned by breakpoint(), or None if no breakpoint is
+            within the budget.
+
+        Raises:
+            ValueError: if the cost is unknown.
+        """
+        self.__check_cost(cost)
+        costs, shortest = self.__by_cost[cost]
+        position = numpy.searchsorted(costs, budget, side='right') - 1
+        if position < 0:
+            return None
+        return self.breakpoint(shortest[position])
+
+    def to_dict(self):
+        """Returns a dictionary with the breakpoints, that can be dumped in JSON."""
+        return {'breakpoints': [self.breakpoint(index) for index in range(len(self))]}
+
+    def save(self, curve_file):
+        """Writes the breakpoints in a file, in JSON.
+
+        Args:
+            curve_file: a filename or File Object
+        """
+        if hasattr(curve_file, 'write'):
+            json.dump(self.to_dict(), curve_file, indent=2, sort_keys=True)
+            return
+        with open(curve_file, 'w') as output_file:
+            json.dump(self.to_dict(), output_file, indent=2, sort_keys=True)
+
+    @classmethod
+    def load(cls, curve_file):
+        """Reads the breakpoints that save() wrote.
+
+        Args:
+            curve_file: a filename or File Object
+
+        Returns:
+            A CostCurve object.
+        """
+        if hasattr(curve_file, 'read'):
+            return cls.from_results(json.load(curve_file)['breakpoints'])
+        with open(curve_file) as input_file:
+            return cls.from_results(json.load(input_file)['breakpoints'])
@@ -0,0 +1,212 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Generators of synthetic project networks.
+
+Every generator returns a project with exactly the requested number of
+activities, as returned by the validate() function. The network has a single
+start and a single end node, and its nodes are numbered in topological order
+from 1. The durations and costs of the activities are drawn so that every
+activity can be crashed at an integer cost slope, and the same seed always
+generates the same project.
+"""
+
+import math
+import random
+
+MAX_ATTEMPTS = 100
+
+
+def _activity(random_state):
+    normal_duration = random_state.randint(2, 30)
+    crash_duration = random_state.randint(max(1, normal_duration // 2), normal_duration)
+    normal_cost = random_state.randint(10, 100) * normal_duration * 10
+    cost_slope = random_state.randint(1, 50) * 10
+    return {
+        'normal_duration': normal_duration,
+        'normal_cost': normal_cost,
+        'crash_duration': crash_duration,
+        'crash_cost': normal_cost + cost_slope * (normal_duration - crash_duration)
+    }
+
+
+def _project(arcs, random_state):
+    """Numbers the nodes of a network in topological order and draws its activities."""
+    successors = {}
+    indegree = {}
+    for node1, node2 in arcs:
+        successors.setdefault(node1, []).append(node2)
+        indegree[node2] = indegree.get(node2, 0) + 1
+        indegree.setdefault(node1, 0)
+    frontier = [node for node, degree in indegree.items() if degree == 0]
+    numbers = {}
+    while frontier:
+        node = frontier.pop()
+        numbers[node] = len(numbers) + 1
+        for successor in successors.get(node, ()):
+            indegree[successor] -= 1
+            if not indegree[successor]:
+                frontier.append(successor)
+    activities = [[numbers[node1], numbers[node2], _activity(random_state)] for node1, node2 in sorted(
+        arcs, key=lambda arc: (numbers[arc[0]], numbers[arc[1]]))]
+    return {'info': {'indirect_cost': random_state.randint(20, 200) * 10}, 'activities': activities}
+
+
+def _capacity(width, depth):
+    """Returns the number of activities that a layered network can have at most."""
+    return 2 * depth * width + 1 + width * width * depth * (depth - 1) // 2
+
+
+def layered(activities, seed=None):
+    """Generates a random layered network.
+
+    The nodes are arranged in layers of the same width, between the start and
+    the end node. Every node is connected to a node of the next layer, and the
+    rest of the activities connect random nodes of mostly consecutive, but
+    sometimes distant, layers.
+
+    Args:
+        activities: the number of activities
+        seed: the seed of the random number generator
+
+    Returns:
+        A dictionary, as returned by the validate() function.
+    """
+    random_state = random.Random(seed)
+    if activities < 2:
+        return _project([(0, 1)] * activities, random_state)
+    width = max(1, int(math.sqrt(activities) / 2))
+    depth = max(1, activities // (2 * width) - 1)
+    while _capacity(width, depth) < activities:
+        depth += 1
+    layers = [[0]] + [range(1 + layer * width, 1 + (layer + 1) * width) for layer in range(depth)]
+    layers.append([depth * width + 1])
+    layer_of = dict((node, index) for index, layer in enumerate(layers) for node in layer)
+
+    arcs = set((0, node) for node in layers[1])
+    for layer, next_layer in zip(layers[1:-2], layers[2:-1]):
+        arcs.update(zip(layer, next_layer))
+    arcs.update((node, layers[-1][0]) for node in layers[-2])
+
+    nodes = range(len(layer_of) - 1)
+    attempts = 0
+    while len(arcs) < activities and attempts < MAX_ATTEMPTS * activities:
+        node1 = random_state.choice(nodes)
+        layer = layer_of[node1] + 1
+        if random_state.random() < 0.2:
+            layer = random_state.randint(layer, len(layers) - 1)
+        arc = (node1, random_state.choice(layers[layer]))
+        if arc in arcs:
+            attempts += 1
+        else:
+            arcs.add(arc)
+    if len(arcs) < activities:
+        # A small network that is almost complete
+        candidates = sorted((node1, node2) for node1 in nodes for node2 in layer_of
+                            if layer_of[node2] > layer_of[node1] and (node1, node2) not in arcs)
+        arcs.update(random_state.sample(candidates, activities - len(arcs)))
+    return _project(list(arcs), random_state)
+
+
+def series_parallel(activities, seed=None):
+    """Generates a random series-parallel network.
+
+    Starting from a single activity, a random activity is repeatedly either split
+    in two activities in series, or given a path of two activities in parallel.
+
+    Args:
+        activities: the number of activities
+        seed: the seed of the random number generator
+
+    Returns:
+        A dictionary, as returned by the validate() function.
+    """
+    random_state = random.Random(seed)
+    arcs = [(0, 1)] if activities else []
+    next_node = 2
+    while len(arcs) < activities:
+        index = random_state.randrange(len(arcs))
+        node1, node2 = arcs[index]
+        if activities - len(arcs) == 1 or random_state.random() < 0.5:
+            arcs[index] = (node1, next_node)
+            arcs.append((next_node, node2))
+        else:
+            arcs.extend([(node1, next_node), (next_node, node2)])
+        next_node += 1
+    return _project(arcs, random_state)
+
+
+def fan(activities, seed=None):
+    """Generates a wide fan network.
+
+    The start node fans out to many short parallel chains of activities, that
+    all end at the end node, so the network has many critical paths at once.
+
+    Args:
+        activities: the number of activities
+        seed: the seed of the random number generator
+
+    Returns:
+        A dictionary, as returned by the validate() function.
+    """
+    random_state = random.Random(seed)
+    arcs = []
+    next_node = 2
+    while len(arcs) < activities:
+        remaining = activities - len(arcs)
+        if remaining == 1:
+            arcs.append((0, 1))
+            break
+        length = min(remaining, random_state.randint(2, 3))
+        if remaining - length == 1 and length == 3:
+            length = 2
+        chain = [0] + range(next_node, next_node + length - 1) + [1]
+        next_node += length - 1
+        arcs.extend(zip(chain, chain[1:]))
+    return _project(arcs, random_state)
+
+
+def add_resources(project, resources, seed=None):
+    """Adds resources to a project, and random demands of them to its activities.
+
+    Every activity demands one to three of the resources, and every resource has
+    a capacity that is a few times the largest demand of it, so the resources
+    constrain the schedule without making it serial.
+
+    Args:
+        project: a dictionary, as returned by a generator
+        resources: the number of resources
+        seed: the seed of the random number generator
+
+    Returns:
+        The project, with the resources added.
+    """
+    random_state = random.Random(seed)
+    names = ['resource{}'.format(index) for index in range(resources)]
+    largest = dict((name, 0) for name in names)
+    for _, _, activity in project['activities']:
+        demands = {}
+        for name in random_state.sample(names, min(resources, random_state.randint(1, 3))):
+            demands[name] = random_state.randint(1, 10)
+            largest[name] = max(largest[name], demands[name])
+        activity['resources'] = demands
+    project['info']['resources'] = dict((name, largest[name] * random_state.randint(2, 4) or 1) for name in names)
+    return project
+
+
+GENERATORS = {
+    'layered': layered,
+    'series_parallel': series_parallel,
+    'fan': fan
+}
@@ -0,0 +1,144 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os.path
+import pickle
+
+import numpy
+
+CHANGE_DTYPE = numpy.dtype([
+    ('node1', 'i8'), ('node2', 'i8'), ('normal_duration', 'f8'), ('normal_cost', 'f8')
+])
+
+
+def _as_number(value):
+    return int(value) if value.is_integer() else value
+
+
+class IterationHistory(object):
+    """Delta-encoded record of the iterations of the CPM algorithm.
+
+    Every iteration keeps its result row, and the duration and cost of only the
+    activities that changed since the previous iteration, so the state of the
+    network in any iteration can be rebuilt by replaying the changes. The changes
+    are kept in a numpy structured array, either in memory or in a file that is
+    memory-mapped when it is read.
+
+    Attributes:
+        directory: a string, the directory that holds the history on disk, or None
+            if the history is kept in memory.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.__offsets = [0]
+        self.__view = None
+        if directory is None:
+            self.__chunks = []
+            self.__results = []
+        else:
+            self.__changes_file = open(os.path.join(directory, 'changes.bin'), 'w+b')
+            self.__results_file = open(os.path.join(directory, 'results.pickle'), 'w+b')
+            self.__result_offsets = []
+
+    def __len__(self):
+        return len(self.__offsets) - 1
+
+    @property
+    def nbytes(self):
+        """The number of bytes that the changes of the activities occupy."""
+        return self.__offsets[-1] * CHANGE_DTYPE.itemsize
+
+    def record(self, result, activities):
+        """Records an iteration of the CPM algorithm.
+
+        Args:
+            result: a dictionary, the result row of the iteration
+            activities: a dictionary that maps every activity that changed since the
+                previous iteration to a tuple (normal_duration, normal_cost). For the
+                first iteration, it must contain every activity of the network.
+        """
+        changes = numpy.array([(node1, node2, normal_duration, normal_cost)
+                               for (node1, node2), (normal_duration, normal_cost) in activities.items()],
+                              dtype=CHANGE_DTYPE)
+        if self.directory is None:
+            self.__chunks.append(changes)
+            self.__results.append(result)
+        else:
+            self.__changes_file.write(changes.tostring())
+            self.__result_offsets.append(self.__results_file.tell())
+            pickle.dump(result, self.__results_file, pickle.HIGHEST_PROTOCOL)
+        self.__offsets.append(self.__offsets[-1] + changes.size)
+        self.__view = None
+
+    def __get_changes(self):
+        if self.__view is None:
+            if self.__offsets[-1] == 0:
+                self.__view = numpy.zeros(0, dtype=CHANGE_DTYPE)
+            elif self.directory is None:
+                self.__view = numpy.concatenate(self.__chunks)
+            else:
+                self.__changes_file.flush()
+                self.__view = numpy.memmap(self.__changes_file.name, dtype=CHANGE_DTYPE, mode='r')
+        return self.__view
+
+    def changes(self, iteration):
+        """Returns the activities that changed in an iteration.
+
+        Args:
+            iteration: an integer, the index of the iteration
+
+        Returns:
+            A list of tuples (node1, node2, normal_duration, normal_cost).
+        """
+        changes = self.__get_changes()[self.__offsets[iteration]:self.__offsets[iteration + 1]]
+        return [(int(node1), int(node2), _as_number(float(normal_duration)), _as_number(float(normal_cost)))
+                for node1, node2, normal_duration, normal_cost in changes.tolist()]
+
+    def state(self, iteration):
+        """Rebuilds the state of the activities in an iteration.
+
+        Args:
+            iteration: an integer, the index of the iteration
+
+        Returns:
+            A dictionary that maps every activity to a tuple (normal_duration, normal_cost).
+        """
+        state = {}
+        for previous in range(iteration + 1):
+            for node1, node2, normal_duration, normal_cost in self.changes(previous):
+                state[(node1, node2)] = (normal_duration, normal_cost)
+        return state
+
+    def result(self, iteration):
+        """Returns the result row of an iteration."""
+        if self.directory is None:
+            return self.__results[iteration]
+        self.__results_file.flush()
+        self.__results_file.seek(self.__result_offsets[iteration])
+        result = pickle.load(self.__results_file)
+        self.__results_file.seek(0, os.SEEK_END)
+        return result
+
+    def results(self):
+        """Returns a generator of the result rows of all the iterations."""
+        for iteration in range(len(self)):
+            yield self.result(iteration)
+
+    def close(self):
+        """Closes the files of a history that is kept on disk."""
+        if self.directory is not None:
+            self.__view = None
+            self.__changes_file.close()
+            self.__results_file.close()
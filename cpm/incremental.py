@@ -0,0 +1,167 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import heapq
+
+
+class IncrementalSchedule(object):
+    """The event times of a network, updated incrementally when activity durations change.
+
+    Besides the earliest event time of every node, the length of the longest path
+    from every node to the sink (its tail) is kept. The latest event time of a node
+    is the project duration minus its tail, so a change of the project duration does
+    not touch every node. An activity is critical when the earliest event time of its
+    first node, its duration and the tail of its last node add up to the project
+    duration, and the activities are grouped by that sum so the critical ones are
+    found without scanning the network.
+
+    When the duration of some activities changes, only the nodes after them are
+    visited for the earliest event times, and only the nodes before them for the
+    tails, and the visit stops at the nodes whose times do not change.
+
+    Attributes:
+        graph: the DiGraph object of the networkx library that holds the durations.
+        sink: the last node of the network.
+        kw_duration: the attribute of the activities that holds their duration.
+        nodes_visited: the number of nodes visited by the last update.
+    """
+
+    def __init__(self, graph, topological_order, sink, kw_duration='normal_duration', solved=False):
+        """Calculates the event times of a network.
+
+        Args:
+            graph, topological_order, sink, kw_duration: as the attributes
+            solved: whether the nodes of the graph already hold their earliest
+                ('eet') and latest ('let') event times for the current durations,
+                which are then taken instead of being calculated again
+        """
+        self.graph = graph
+        self.sink = sink
+        self.kw_duration = kw_duration
+        self.nodes_visited = 0
+        self.__index = dict((node, index) for index, node in enumerate(topological_order))
+        self.__activity_index = dict((activity, index) for index, activity in enumerate(graph.edges()))
+        self.__eet = {}
+        self.__tail = {}
+        self.__lengths = {}
+        self.__activities_by_length = {}
+        if solved:
+            duration = graph.node[sink]['eet']
+            for node, data in graph.nodes_iter(data=True):
+                self.__eet[node] = data['eet']
+                self.__tail[node] = duration - data['let']
+        else:
+            for node in topological_order:
+                self.__eet[node] = self.__calculate_eet(node)
+            for node in reversed(topological_order):
+                self.__tail[node] = self.__calculate_tail(node)
+        for activity in graph.edges():
+            self.__place_activity(activity)
+
+    def __duration(self, node1, node2):
+        return self.graph.edge[node1][node2][self.kw_duration]
+
+    def __calculate_eet(self, node):
+        return max([self.__eet[predecessor] + self.__duration(predecessor, node)
+                    for predecessor in self.graph.predecessors(node)] or [0])
+
+    def __calculate_tail(self, node):
+        return max([self.__duration(node, successor) + self.__tail[successor]
+                    for successor in self.graph.successors(node)] or [0])
+
+    def __place_activity(self, activity):
+        node1, node2 = activity
+        if activity in self.__lengths:
+            activities = self.__activities_by_length[self.__lengths[activity]]
+            activities.discard(activity)
+            if not activities:
+                del self.__activities_by_length[self.__lengths[activity]]
+        length = self.__eet[node1] + self.__duration(node1, node2) + self.__tail[node2]
+        self.__lengths[activity] = length
+        self.__activities_by_length.setdefault(length, set()).add(activity)
+
+    @property
+    def duration(self):
+        """The duration of the network."""
+        return self.__eet[self.sink]
+
+    def earliest_event_time(self, node):
+        return self.__eet[node]
+
+    def latest_event_time(self, node):
+        return self.duration - self.__tail[node]
+
+    def total_float(self, activity):
+        return self.duration - self.__lengths[activity]
+
+    def critical_activities(self):
+        """Finds the critical activities of the network.
+
+        Returns:
+            A list of tuples, in the order of graph.edges().
+        """
+        return sorted(self.__activities_by_length.get(self.duration, ()), key=self.__activity_index.get)
+
+    def update(self, activities):
+        """Updates the event times after the duration of some activities changed.
+
+        Args:
+            activities: a list of tuples, the activities whose duration changed
+
+        Returns:
+            A set with the nodes whose earliest event time or tail changed.
+        """
+        changed_nodes = set()
+        affected_activities = set(activities)
+        self.nodes_visited = 0
+
+        # The earliest event times change only after the changed activities, and
+        # the nodes are visited in topological order.
+        pending = dict((self.__index[node2], node2) for _, node2 in activities)
+        queue = list(pending)
+        heapq.heapify(queue)
+        while queue:
+            node = pending.pop(heapq.heappop(queue))
+            self.nodes_visited += 1
+            eet = self.__calculate_eet(node)
+            if eet != self.__eet[node]:
+                self.__eet[node] = eet
+                changed_nodes.add(node)
+                for successor in self.graph.successors(node):
+                    affected_activities.add((node, successor))
+                    if self.__index[successor] not in pending:
+                        pending[self.__index[successor]] = successor
+                        heapq.heappush(queue, self.__index[successor])
+
+        # The tails change only before the changed activities, and the nodes are
+        # visited in reverse topological order.
+        pending = dict((-self.__index[node1], node1) for node1, _ in activities)
+        queue = list(pending)
+        heapq.heapify(queue)
+        while queue:
+            node = pending.pop(heapq.heappop(queue))
+            self.nodes_visited += 1
+            tail = self.__calculate_tail(node)
+            if tail != self.__tail[node]:
+                self.__tail[node] = tail
+                changed_nodes.add(node)
+                for predecessor in self.graph.predecessors(node):
+                    affected_activities.add((predecessor, node))
+                    if -self.__index[predecessor] not in pending:
+                        pending[-self.__index[predecessor]] = predecessor
+                        heapq.heappush(queue, -self.__index[predecessor])
+
+        for activity in affected_activities:
+            self.__place_activity(activity)
+        return changed_nodes
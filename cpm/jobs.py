@@ -0,0 +1,267 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import os
+import Queue
+import shutil
+import threading
+import time
+import uuid
+
+import cache
+import cpm
+import curve
+import profiling
+
+# The file of the output directory of a job that its time-cost curve is saved in
+CURVE_FILE = 'curve.json'
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job(object):
+    """A run of the CPM algorithm on a project, in the background.
+
+    Attributes:
+        id: a string that identifies the job.
+        project: a dictionary, as returned by the validate() function.
+        options: a dictionary with the keyword arguments of run_cpm().
+        output_dir: a string, the directory that the images of the job are stored.
+        status: a string, one of 'queued', 'running', 'done' and 'failed'.
+        iteration: the index of the last complete iteration, or None.
+        project_duration: the project duration of the last complete iteration, or None.
+        rows: a list with the result of every complete iteration, as it is produced.
+        results, images, optimum_solution: the results of the job, as returned
+            by get_results(), once the job is done.
+        curve: a CostCurve object of the results, once the job is done. It is
+            also saved in the CURVE_FILE of the output directory.
+        error: a string that describes why the job failed, or None.
+        finished: the time that the job was done or failed, or None.
+        result_cache: a ResultCache object that the results are stored in, or None.
+        profiler: a Profiler object with the timings and the counters of the run,
+            or None if the job has not run.
+    """
+
+    def __init__(self, project, output_dir, options, result_cache=None):
+        self.id = uuid.uuid4().hex
+        self.project = project
+        self.options = options
+        self.output_dir = os.path.join(output_dir, self.id)
+        self.result_cache = result_cache
+        self.status = 'queued'
+        self.iteration = None
+        self.project_duration = None
+        self.results = None
+        self.images = None
+        self.optimum_solution = None
+        self.curve = None
+        self.error = None
+        self.finished = None
+        self.profiler = None
+        self.rows = []
+        self.__changed = threading.Condition()
+        self.key = cache.get_key(project, image_format='png', **options) if result_cache is not None else None
+
+    def _set_curve(self, cost_curve):
+        cost_curve.save(os.path.join(self.output_dir, CURVE_FILE))
+        self.curve = cost_curve
+
+    def _finish(self, results, images, optimum_solution):
+        self.results, self.images, self.optimum_solution = results, images, optimum_solution
+        self._set_curve(curve.CostCurve.from_results(results))
+        self.rows = list(results)
+        self.iteration = len(results) - 1
+        self.project_duration = results[-1]['project_duration']
+        self.status = 'done'
+        self.project = None
+        self.finished = time.time()
+
+    def _update(self, iteration, result):
+        with self.__changed:
+            self.rows.append(result)
+            self.iteration = iteration
+            self.project_duration = result['project_duration']
+            self.__changed.notify_all()
+
+    def run(self):
+        self.status = 'running'
+        try:
+            if not os.path.isdir(self.output_dir):
+                os.makedirs(self.output_dir)
+            self.profiler = profiling.Profiler()
+            cpmnet = cpm.CriticalPathMethod(self.project, profiler=self.profiler)
+            cpmnet.run_cpm(progress=self._update, **self.options)
+            self.results, self.images, self.optimum_solution = cpmnet.get_results(self.output_dir + '/')
+            self._set_curve(cpmnet.cost_curve())
+            if self.result_cache is not None:
+                self.result_cache.put(self.key, self.results, self.images, self.optimum_solution, self.output_dir)
+            self.status = 'done'
+        except Exception as exc:
+            self.error = '{}: {}'.format(type(exc).__name__, exc)
+            self.status = 'failed'
+        finally:
+            self.project = None
+            with self.__changed:
+                self.finished = time.time()
+                self.__changed.notify_all()
+
+    def events(self, timeout=None):
+        """Generates the results of the iterations of the job, as they are produced.
+
+        Args:
+            timeout: the seconds to wait for a new result, or None to wait until
+                there is one
+
+        Returns:
+            A generator that yields the result of every iteration, from the first
+            one, and None whenever the timeout expires without a new result. It
+            ends when the job is finished and every result has been yielded.
+        """
+        index = 0
+        while True:
+            with self.__changed:
+                if index == len(self.rows) and self.finished is None:
+                    self.__changed.wait(timeout)
+                rows = self.rows[index:]
+                finished = self.finished is not None
+            index += len(rows)
+            for row in rows:
+                yield row
+            if not rows:
+                if finished:
+                    return
+                yield None
+
+    def progress(self):
+        """Returns a dictionary with the status and the progress of the job."""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'iteration': self.iteration,
+            'project_duration': self.project_duration,
+            'error': self.error
+        }
+
+
+class JobQueue(object):
+    """A bounded pool of worker threads that run the CPM algorithm on projects.
+
+    Every job stores its images in its own directory, under the output directory
+    of the queue. Only the most recent finished jobs are kept, and the directories
+    of older ones are removed.
+
+    Attributes:
+        output_dir: a string, the directory that the directories of the jobs are created in.
+        max_jobs: the number of finished jobs that are kept.
+        result_cache: a ResultCache object, or None. A project whose results are
+            cached is done as soon as it is submitted.
+    """
+
+    def __init__(self, output_dir, workers=2, max_pending=32, max_jobs=100, result_cache=None):
+        self.output_dir = output_dir
+        self.max_jobs = max_jobs
+        self.result_cache = result_cache
+        self.__pending = Queue.Queue(max_pending)
+        self.__jobs = collections.OrderedDict()
+        self.__lock = threading.Lock()
+        self.__solved = 0
+        self.__cached = 0
+        self.__iterations = 0
+        self.__phases = {}
+        for _ in range(workers):
+            worker = threading.Thread(target=self.__work)
+            worker.daemon = True
+            worker.start()
+
+    def __work(self):
+        while True:
+            job = self.__pending.get()
+            job.run()
+            with self.__lock:
+                if job.status == 'done':
+                    self.__solved += 1
+                    self.__iterations += len(job.profiler.iterations)
+                if job.profiler is not None:
+                    profiling.add_phases(self.__phases, job.profiler.phases)
+            self.__remove_old_jobs()
+            self.__pending.task_done()
+
+    def __remove_old_jobs(self):
+        with self.__lock:
+            finished = [job for job in self.__jobs.values() if job.finished is not None]
+            for job in finished[:max(0, len(finished) - self.max_jobs)]:
+                del self.__jobs[job.id]
+                shutil.rmtree(job.output_dir, ignore_errors=True)
+
+    def submit(self, project, **options):
+        """Queues a project to be solved.
+
+        Args:
+            project: a dictionary, as returned by the validate() function
+            options: keyword arguments of run_cpm()
+
+        Returns:
+            A Job object.
+
+        Raises:
+            JobQueueFull: if too many jobs are already waiting.
+        """
+        job = Job(project, self.output_dir, options, self.result_cache)
+        if self.result_cache is not None:
+            os.makedirs(job.output_dir)
+            cached = self.result_cache.get(job.key, job.output_dir + '/')
+            if cached is not None:
+                job._finish(*cached)
+                with self.__lock:
+                    self.__jobs[job.id] = job
+                    self.__cached += 1
+                self.__remove_old_jobs()
+                return job
+        with self.__lock:
+            try:
+                self.__pending.put_nowait(job)
+            except Queue.Full:
+                # The directory was created for the images of a cached result
+                shutil.rmtree(job.output_dir, ignore_errors=True)
+                raise JobQueueFull('Too many projects are waiting to be solved, please try again later.')
+            self.__jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        """Returns the job with the given id, or None if there is no such job."""
+        with self.__lock:
+            return self.__jobs.get(job_id)
+
+    def metrics(self):
+        """Returns a dictionary with the counters of the queue.
+
+        It holds the number of the kept jobs in every status, the number of jobs
+        that were solved and that were served from the cache, the total number of
+        iterations of the solved jobs, and the total time of every phase of the
+        CPM algorithm, as measured by the profilers of the jobs.
+        """
+        with self.__lock:
+            statuses = dict((status, 0) for status in ('queued', 'running', 'done', 'failed'))
+            for job in self.__jobs.values():
+                statuses[job.status] += 1
+            return {
+                'jobs': statuses,
+                'solved': self.__solved,
+                'cached': self.__cached,
+                'iterations': self.__iterations,
+                'phases': dict((phase, dict(total)) for phase, total in self.__phases.items())
+            }
@@ -0,0 +1,258 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Portfolios of projects that share a crash budget.
+
+The time-cost curve of a project is the project duration, the direct cost and
+the total cost of every iteration of the CPM algorithm. The curves of the
+projects of a portfolio are solved across a pool of processes, and kept both in
+the Portfolio object and in a ResultCache, under the same keys as the results of
+the command-line interface without images, so every project is solved only once,
+even if the portfolio is optimized again with another budget.
+
+The CPM algorithm may skip durations between two breakpoints, as the mincut
+crashing does, but the costs of a project are linear between them, so a point
+is added to every curve for every whole time unit between its breakpoints. The
+crash cost of a point of a curve is its direct cost over the direct cost of the
+normal durations. The curves are merged one at a time into a Pareto front of
+the crash cost against the total cost of the projects merged so far, where a
+combination that costs more to crash than another but has no lower total cost
+is dropped, so the front stays small. The last combination of the front within
+the budget is the optimum.
+"""
+
+import multiprocessing
+
+import numpy
+
+import cache
+import cpm
+
+# The result cache of the worker processes, which is opened in every process only once
+_result_cache = None
+
+
+def _set_result_cache(cache_dir):
+    global _result_cache
+    _result_cache = cache.ResultCache(cache_dir) if cache_dir is not None else None
+
+
+def _solve_curve_job(job):
+    return solve_curve(*job, result_cache=_result_cache)
+
+
+def solve_curve(project_file, crashing='greedy', engine='networkx', result_cache=None):
+    """Solves the time-cost curve of a project file.
+
+    Args:
+        project_file: a filename, as accepted by the validate() function
+        crashing: a string, one of CRASHING_METHODS
+        engine: a string, one of ENGINES
+        result_cache: a ResultCache object that the results of the project are
+            looked up in and stored in, or None
+
+    Returns:
+        A tuple of the project file, its curve and an error. The curve is a list
+        of tuples (project duration, direct cost, total cost), from the normal to
+        the crash duration, or None if the project could not be solved, and the
+        error is a string, or None if the project was solved.
+    """
+    try:
+        project = cpm.validate(project_file)
+        key = cache.get_key(project, crashing=crashing, image_format=None)
+        cached = result_cache.get(key) if result_cache is not None else None
+        if cached:
+            results = cached[0]
+        else:
+            cpmnet = cpm.CriticalPathMethod(project, engine=engine)
+            cpmnet.run_cpm(crashing=crashing)
+            results, images, optimum_solution = cpmnet.get_results()
+            if result_cache is not None:
+                result_cache.put(key, results, images, optimum_solution)
+    except cpm.ProjectValidationException as exc:
+        return project_file, None, str(exc)
+    except Exception as exc:
+        # A failure in one project must not stop the rest of the portfolio
+        return project_file, None, '{}: {}'.format(type(exc).__name__, exc)
+    curve = [(result['project_duration'], result['direct_cost'], result['total_cost']) for result in results]
+    return project_file, curve, None
+
+
+def _as_number(value):
+    return int(value) if float(value).is_integer() else value
+
+
+def interpolate_curve(curve):
+    """Adds a point for every whole time unit between the breakpoints of a curve.
+
+    Args:
+        curve: a list of tuples (project duration, direct cost, total cost), from
+            the normal to the crash duration, as returned by solve_curve()
+
+    Returns:
+        A list of tuples like the curve, with the breakpoints and, between every
+        two of them, a point for every whole time unit, whose costs are on the
+        line between the two breakpoints.
+    """
+    points = curve[:1]
+    for (duration1, direct_cost1, total_cost1), point in zip(curve, curve[1:]):
+        duration2, direct_cost2, total_cost2 = point
+        span = float(duration1 - duration2)
+        step = 1
+        while duration1 - step > duration2:
+            fraction = step / span
+            points.append((duration1 - step, _as_number(direct_cost1 + (direct_cost2 - direct_cost1) * fraction),
+                           _as_number(total_cost1 + (total_cost2 - total_cost1) * fraction)))
+            step += 1
+        points.append(point)
+    return points
+
+
+def _pareto_front(crash_cost, total_cost):
+    """Finds the combinations that no other combination dominates.
+
+    Args:
+        crash_cost, total_cost: arrays, the crash cost and the total cost of every
+            combination
+
+    Returns:
+        An int array with the indices of the kept combinations, by increasing
+        crash cost and decreasing total cost.
+    """
+    order = numpy.lexsort((total_cost, crash_cost))
+    sorted_total_cost = total_cost[order]
+    lowest_before = numpy.minimum.accumulate(sorted_total_cost)[:-1]
+    return order[numpy.concatenate([[True], sorted_total_cost[1:] < lowest_before])]
+
+
+class Portfolio(object):
+    """Projects that are solved together and share a crash budget.
+
+    Attributes:
+        project_files: a list with the filenames of the projects.
+        crashing: a string, the crashing method of the projects.
+        engine: a string, the engine that solves the projects.
+        cache_dir: a string, the directory of the ResultCache of the curves, or
+            None to keep them only in this object.
+        curves: a dictionary that maps every solved project file to its curve, as
+            returned by the solve_curve() function.
+        errors: a dictionary that maps every project file that could not be
+            solved to its error.
+    """
+
+    def __init__(self, project_files, crashing='greedy', engine='networkx', cache_dir=None):
+        if crashing not in cpm.CRASHING_METHODS:
+            raise ValueError('Unknown crashing method: ' + str(crashing))
+        if engine not in cpm.ENGINES:
+            raise ValueError('Unknown engine: ' + str(engine))
+        self.project_files = list(project_files)
+        self.crashing = crashing
+        self.engine = engine
+        self.cache_dir = cache_dir
+        self.curves = {}
+        self.errors = {}
+
+    def solve(self, processes=None):
+        """Solves the curves of the projects that are not solved yet.
+
+        Args:
+            processes: the number of processes that solve the projects in parallel,
+                or None for solving them in the current process
+        """
+        jobs = [(project_file, self.crashing, self.engine) for project_file in self.project_files
+                if project_file not in self.curves and project_file not in self.errors]
+        if processes is not None and processes > 1 and len(jobs) > 1:
+            pool = multiprocessing.Pool(min(processes, len(jobs)), initializer=_set_result_cache,
+                                        initargs=(self.cache_dir,))
+            try:
+                solved = pool.map(_solve_curve_job, jobs)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            result_cache = cache.ResultCache(self.cache_dir) if self.cache_dir is not None else None
+            solved = [solve_curve(*job, result_cache=result_cache) for job in jobs]
+        for project_file, curve, error in solved:
+            if error is None:
+                self.curves[project_file] = curve
+            else:
+                self.errors[project_file] = error
+
+    def optimize(self, budget=None):
+        """Chooses the duration of every solved project, in whole time units.
+
+        Args:
+            budget: the maximum crash cost of all the projects together, or None
+                for no limit
+
+        Returns:
+            A dictionary with the total cost and the crash cost of the portfolio,
+            and a dictionary ('projects') that maps every solved project file to
+            a dictionary with its project duration, direct cost, crash cost and
+            total cost.
+
+        Raises:
+            ValueError: if the budget is negative.
+        """
+        if budget is not None and budget < 0:
+            raise ValueError('Negative budget: ' + str(budget))
+        project_files = [project_file for project_file in self.project_files if project_file in self.curves]
+        crash_cost = numpy.zeros(1)
+        total_cost = numpy.zeros(1)
+        # For every merged project, the combination of the previous front and the
+        # point of the curve that every combination of the front came from
+        merges = []
+        curves = dict((project_file, interpolate_curve(self.curves[project_file])) for project_file in project_files)
+        for project_file in project_files:
+            curve = numpy.array([(direct_cost, project_total_cost)
+                                 for _, direct_cost, project_total_cost in curves[project_file]],
+                                dtype=numpy.float64)
+            point_crash_cost = curve[:, 0] - curve[0, 0]
+            # The points past the optimum of the project cost more to crash and
+            # have no lower total cost, so they never improve a combination
+            points = _pareto_front(point_crash_cost, curve[:, 1])
+            if budget is None:
+                # Without a budget, every project is best at its own optimum
+                points = points[-1:]
+            candidate_crash_cost = (crash_cost[:, numpy.newaxis] + point_crash_cost[points]).ravel()
+            candidate_total_cost = (total_cost[:, numpy.newaxis] + curve[points, 1]).ravel()
+            candidates = numpy.arange(candidate_crash_cost.size)
+            if budget is not None:
+                candidates = candidates[candidate_crash_cost <= budget]
+            candidates = candidates[_pareto_front(candidate_crash_cost[candidates], candidate_total_cost[candidates])]
+            crash_cost, total_cost = candidate_crash_cost[candidates], candidate_total_cost[candidates]
+            merges.append((candidates // points.size, points[candidates % points.size]))
+
+        # The last combination of the front has the lowest total cost
+        combination = crash_cost.size - 1
+        choices = []
+        for previous_combinations, merged_points in reversed(merges):
+            choices.append(merged_points[combination])
+            combination = previous_combinations[combination]
+        choices.reverse()
+
+        projects = {}
+        for project_file, index in zip(project_files, choices):
+            project_duration, direct_cost, project_total_cost = curves[project_file][index]
+            projects[project_file] = {
+                'project_duration': project_duration,
+                'direct_cost': direct_cost,
+                'crash_cost': direct_cost - curves[project_file][0][1],
+                'total_cost': project_total_cost
+            }
+        return {
+            'total_cost': sum(project['total_cost'] for project in projects.values()),
+            'crash_cost': sum(project['crash_cost'] for project in projects.values()),
+            'projects': projects
+        }
@@ -0,0 +1,152 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Timings and counters of the phases of the CPM algorithm.
+
+A Profiler object that is given to a CriticalPathMethod object measures the
+time of every phase of the algorithm, in total and in every iteration, and
+collects counters of every iteration, such as the number of critical paths and
+the number of nodes that the incremental schedule visited. Without a profiler,
+the phases are not timed at all.
+"""
+
+import json
+import timeit
+
+
+def add_phases(totals, phases):
+    """Adds the phase totals of a profiler to other phase totals.
+
+    Args:
+        totals: a dictionary that maps a phase to a dictionary with its seconds
+            and calls, which is updated in place
+        phases: a dictionary of the same form, as in the phases of a Profiler
+    """
+    for phase, measurement in phases.items():
+        total = totals.setdefault(phase, {'seconds': 0.0, 'calls': 0})
+        total['seconds'] += measurement['seconds']
+        total['calls'] += measurement['calls']
+
+
+class _Phase(object):
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = timeit.default_timer()
+
+    def __exit__(self, *exc_info):
+        self.profiler._add_time(self.name, timeit.default_timer() - self.start)
+
+
+class _NullPhase(object):
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class NullProfiler(object):
+    """A profiler that measures nothing, used when profiling is not asked for."""
+
+    __phase = _NullPhase()
+
+    def phase(self, name):
+        return self.__phase
+
+    def count(self, **counters):
+        pass
+
+    def start_iteration(self):
+        pass
+
+    def end_iteration(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class Profiler(object):
+    """Collects the timings and the counters of a run of the CPM algorithm.
+
+    Attributes:
+        phases: a dictionary that maps every phase to a dictionary with the total
+            seconds spent in it and the number of times it ran.
+        iterations: a list with a dictionary for every complete iteration, with its
+            index, the seconds of every phase in it, and its counters.
+        callbacks: a list of functions that are called with the dictionary of
+            every iteration, as soon as the iteration is complete.
+    """
+
+    def __init__(self, callbacks=None):
+        self.phases = {}
+        self.iterations = []
+        self.callbacks = list(callbacks or [])
+        # The seconds and the counters of the current iteration, or None between iterations
+        self.__seconds = None
+        self.__counters = None
+
+    def phase(self, name):
+        """Returns a context manager that adds the time spent in it to a phase."""
+        return _Phase(self, name)
+
+    def _add_time(self, name, seconds):
+        total = self.phases.setdefault(name, {'seconds': 0.0, 'calls': 0})
+        total['seconds'] += seconds
+        total['calls'] += 1
+        if self.__seconds is not None:
+            self.__seconds[name] = self.__seconds.get(name, 0.0) + seconds
+
+    def count(self, **counters):
+        """Sets counters of the current iteration."""
+        self.__counters.update(counters)
+
+    def start_iteration(self):
+        """Starts a new iteration, which the following phases and counters belong to."""
+        self.__seconds = {}
+        self.__counters = {}
+
+    def end_iteration(self):
+        """Completes the current iteration and calls the callbacks with it."""
+        iteration = {'index': len(self.iterations), 'seconds': self.__seconds, 'counters': self.__counters}
+        self.iterations.append(iteration)
+        self.__seconds = None
+        self.__counters = None
+        for callback in self.callbacks:
+            callback(iteration)
+
+    def to_dict(self):
+        """Returns a dictionary with the phases and the iterations, that can be dumped in JSON."""
+        return {
+            'phases': self.phases,
+            'iterations': self.iterations
+        }
+
+    def dump(self, profile_file):
+        """Writes the phases and the iterations in a file, in JSON.
+
+        Args:
+            profile_file: a filename or File Object
+        """
+        if hasattr(profile_file, 'write'):
+            json.dump(self.to_dict(), profile_file, indent=2, sort_keys=True)
+            return
+        with open(profile_file, 'w') as output_file:
+            json.dump(self.to_dict(), output_file, indent=2, sort_keys=True)
@@ -0,0 +1,200 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import hashlib
+import multiprocessing
+import os
+import shutil
+import threading
+import warnings
+
+import networkx
+
+IMAGE_FORMATS = ('png', 'svg')
+LAYOUT_CACHE_SIZE = 32
+
+_layouts = collections.OrderedDict()
+# pyplot keeps a single current figure per process, and the layouts are shared,
+# so the threads of a process, like the workers of a job queue, take turns
+_layouts_lock = threading.Lock()
+_pyplot_lock = threading.Lock()
+
+
+def get_layout(graph):
+    """Positions the nodes of a network.
+
+    The positions are computed once for every topology, and they are reused for
+    every network with the same activities.
+
+    Args:
+        graph: a DiGraph object of the networkx library
+
+    Returns:
+        A dictionary that maps every node to a tuple of two floats.
+    """
+    topology = tuple(sorted(graph.edges()))
+    with _layouts_lock:
+        if topology in _layouts:
+            _layouts[topology] = _layouts.pop(topology)
+            return _layouts[topology]
+    pos = networkx.fruchterman_reingold_layout(graph)
+    pos = dict((node, tuple(float(axis) for axis in position)) for node, position in pos.items())
+    with _layouts_lock:
+        # Another thread may have positioned the same topology meanwhile
+        pos = _layouts.setdefault(topology, pos)
+        if len(_layouts) > LAYOUT_CACHE_SIZE:
+            _layouts.popitem(last=False)
+    return pos
+
+
+def describe_network(graph, pos):
+    """Describes what the image of a network depicts.
+
+    Args:
+        graph: a DiGraph object of the networkx library, with solved event times
+        pos: a dictionary with the positions of the nodes, as returned by get_layout()
+
+    Returns:
+        A dictionary, that can be pickled and sent to another process, with a list
+        of tuples (node, position, label) and a list of tuples (node1, node2, label).
+        The label of an activity is its duration, after its id if it has one.
+    """
+    return {
+        'nodes': [(node, pos[node], str(node) + '(' + str(data['eet']) + ',' + str(data['let']) + ')')
+                  for node, data in sorted(graph.nodes(data=True))],
+        'edges': [(node1, node2, _edge_label(data)) for node1, node2, data in sorted(graph.edges(data=True))]
+    }
+
+
+def _edge_label(activity):
+    # The activities of a project in the activity-on-node form have an id, and
+    # its dummy activities have none, and show only a lag
+    if 'id' not in activity:
+        return activity['normal_duration']
+    if activity['id'] is None:
+        return activity['normal_duration'] or ''
+    return str(activity['id']) + ': ' + str(activity['normal_duration'])
+
+
+def draw_network(description, path, image_format='png'):
+    """Draws the image of a network.
+
+    Args:
+        description: a dictionary, as returned by describe_network()
+        path: a string, the file that the image will be saved in
+        image_format: a string, one of IMAGE_FORMATS
+    """
+    # matplotlib takes long to import, so it is imported only when an image is drawn
+    import matplotlib.pyplot
+
+    warnings.filterwarnings('ignore')
+    graph = networkx.DiGraph()
+    graph.add_nodes_from(node for node, _, _ in description['nodes'])
+    graph.add_edges_from((node1, node2) for node1, node2, _ in description['edges'])
+    pos = dict((node, position) for node, position, _ in description['nodes'])
+    node_labels = dict((node, label) for node, _, label in description['nodes'])
+    edge_labels = dict(((node1, node2), label) for node1, node2, label in description['edges'])
+    # Save under a temporary name, so that a half-written image is never served
+    # from the cache.
+    temporary_path = path + '.' + str(os.getpid()) + '.tmp'
+    with _pyplot_lock:
+        try:
+            networkx.draw_networkx_labels(graph, pos, labels=node_labels)
+            networkx.draw_networkx_edge_labels(graph, pos, edge_labels=edge_labels)
+            networkx.draw_networkx(graph, pos=pos, with_labels=False, node_size=3000, node_color='c',
+                                   node_shape='o')
+            matplotlib.pyplot.axis('off')
+            matplotlib.pyplot.savefig(temporary_path, format=image_format)
+        finally:
+            matplotlib.pyplot.close()
+    os.rename(temporary_path, path)
+
+
+def _draw_network(job):
+    draw_network(*job)
+
+
+def _link_image(source, path):
+    # Link under a temporary name and rename, so that an image of a previous run
+    # is replaced, and an image that the result cache links to is left intact.
+    temporary_path = path + '.' + str(os.getpid()) + '.tmp'
+    try:
+        os.link(source, temporary_path)
+    except OSError:
+        shutil.copyfile(source, temporary_path)
+    os.rename(temporary_path, path)
+
+
+class NetworkRenderer(object):
+    """Renders the images of the network in every iteration of the CPM algorithm.
+
+    The image of every iteration is named after the iteration. The images are
+    addressed by what they depict, so the network of an iteration that is the
+    same as the network of an earlier one is not drawn again, and its image is
+    linked to the image of the earlier iteration.
+
+    Attributes:
+        images_dir: a string, that represents the path that the images will be stored
+        image_format: a string, one of IMAGE_FORMATS
+        processes: the number of processes that draw the images, or None to draw
+            them in the current process.
+    """
+
+    def __init__(self, images_dir, image_format='png', processes=None):
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError('Unknown image format: ' + str(image_format))
+        self.images_dir = images_dir
+        self.image_format = image_format
+        self.processes = processes
+
+    def render(self, descriptions):
+        """Renders the images of networks.
+
+        Args:
+            descriptions: an iterable of dictionaries, as returned by describe_network()
+
+        Returns:
+            A list of strings, the filename of the image of every network, that is,
+            network-<iteration>.<image format>.
+        """
+        images = []
+        jobs = []
+        links = []
+        # The digest of every network that is drawn -> the path of its image
+        drawn = {}
+        for iteration, description in enumerate(descriptions):
+            digest = hashlib.sha1(repr(sorted(description.items()))).hexdigest()
+            image = 'network-' + str(iteration) + '.' + self.image_format
+            path = self.images_dir + image
+            if digest in drawn:
+                links.append((drawn[digest], path))
+            else:
+                drawn[digest] = path
+                jobs.append((description, path, self.image_format))
+            images.append(image)
+
+        if self.processes and self.processes > 1 and len(jobs) > 1:
+            pool = multiprocessing.Pool(min(self.processes, len(jobs)))
+            try:
+                pool.map(_draw_network, jobs)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for job in jobs:
+                _draw_network(job)
+        for source, path in links:
+            _link_image(source, path)
+        return images
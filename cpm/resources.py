@@ -0,0 +1,295 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Resource-constrained scheduling of a project.
+
+Every resource of a project has a capacity, that is, the units of it that are
+available in every time unit, and an activity may demand some units of some
+resources for its whole duration. The schedule is found with the serial schedule
+generation scheme. The activities whose predecessors are all scheduled are kept
+in a heap, ordered by a priority rule, and the activity with the highest priority
+is scheduled next, at the earliest time that its predecessors are finished and
+its resources are available for its whole duration. The priorities come from the
+event times and the total floats of the network without resources, as solved by
+the compact network, and the usage of every resource in every time unit is kept
+in an array.
+
+With more than one start, the priorities of every start but the first are
+randomly perturbed, the starts run across a pool of processes, and the shortest
+schedule is kept.
+"""
+
+import heapq
+import multiprocessing
+
+import numpy
+
+import columnar
+import compact
+
+PRIORITY_RULES = ('lft', 'lst', 'total_float', 'est')
+# The random perturbation of the priorities of a start, as a fraction of their range
+PERTURBATION = 0.01
+MIN_WINDOW = 16
+
+# The scheduler of the worker processes, which is sent to every process only once
+_scheduler = None
+
+
+def _set_scheduler(scheduler):
+    global _scheduler
+    _scheduler = scheduler
+
+
+def _run_start(job):
+    rule, start, seed = job
+    return _scheduler.run_start(rule, start, seed)
+
+
+class ResourceScheduler(object):
+    """Schedules the activities of a project within the capacities of its resources.
+
+    Attributes:
+        network: a CompactNetwork object of the project.
+        activities: a list of tuples, the activities of the project in the order of
+            the arrays of the scheduler.
+        duration: an int64 array, the normal duration of every activity.
+        resource_names: a list with the names of the resources.
+        capacity: an int64 array, the capacity of every resource.
+        demand: an int64 array with a row for every activity and a column for every
+            resource, the units of the resource that the activity demands.
+    """
+
+    def __init__(self, project):
+        """Builds the network of a project.
+
+        Args:
+            project: a dictionary or a ProjectColumns object, as returned by the
+                validate() function
+
+        Raises:
+            ValueError: if an activity demands more units of a resource than its capacity.
+        """
+        if not isinstance(project, columnar.ProjectColumns):
+            project = columnar.ProjectColumns.from_project(project)
+        self.network = compact.CompactNetwork.from_columns(project)
+        self.activities = self.network.activities()
+        self.duration = project.normal_duration.copy()
+        if project.has_resources:
+            self.resource_names = list(project.resource_names)
+            self.capacity = project.resource_capacity.copy()
+            self.demand = project.resource_demand.copy()
+        else:
+            self.resource_names = []
+            self.capacity = numpy.zeros(0, dtype=numpy.int64)
+            self.demand = numpy.zeros((len(self.activities), 0), dtype=numpy.int64)
+        over = numpy.argwhere(self.demand > self.capacity)
+        if over.size:
+            index, resource = over[0].tolist()
+            raise ValueError('The activity {} demands {} units of the resource {}, more than its capacity {}'.format(
+                self.activities[index], self.demand[index, resource], self.resource_names[resource],
+                self.capacity[resource]))
+        self.__eet, self.__let, self.__total_float = self.network.solve()
+        # The resources that every activity demands, and the units that must be
+        # free of each one of them for the activity to start
+        self.__resources = []
+        self.__limits = []
+        for demand in self.demand:
+            resources = numpy.flatnonzero(demand)
+            self.__resources.append(resources)
+            self.__limits.append((self.capacity[resources] - demand[resources])[:, numpy.newaxis])
+
+    def priorities(self, rule='lft'):
+        """Computes the priority of every activity.
+
+        Args:
+            rule: a string, one of PRIORITY_RULES. The activity with the earliest
+                latest finish time ('lft') or latest start time ('lst'), the least
+                total float ('total_float') or the earliest start time ('est') is
+                scheduled first.
+
+        Returns:
+            A float64 array, where a lower value is a higher priority.
+        """
+        if rule == 'lft':
+            return self.__let[self.network.heads].copy()
+        if rule == 'lst':
+            return self.__let[self.network.heads] - self.duration
+        if rule == 'total_float':
+            return self.__total_float.copy()
+        if rule == 'est':
+            return self.__eet[self.network.tails].copy()
+        raise ValueError('Unknown priority rule: ' + str(rule))
+
+    def schedule(self, priority):
+        """Schedules the activities with the serial schedule generation scheme.
+
+        Args:
+            priority: an array with the priority of every activity, where a lower
+                value is a higher priority
+
+        Returns:
+            A tuple of two objects. An int64 array with the start time of every
+            activity, and an int64 array with the usage of every resource (rows) in
+            every time unit (columns) of the schedule.
+        """
+        network = self.network
+        tails, heads = network.tails.tolist(), network.heads.tolist()
+        successor_offsets = network.successor_offsets.tolist()
+        successor_activities = network.successor_activities.tolist()
+        remaining = numpy.diff(network.predecessor_offsets).tolist()
+        duration = self.duration.tolist()
+        priority = priority.tolist()
+
+        ready = [0] * network.nodes.size
+        start = [0] * len(duration)
+        finish = 0
+        usage = numpy.zeros((self.capacity.size, max(MIN_WINDOW, int(self.__eet.max()) * 2)), dtype=numpy.int64)
+        heap = []
+        for node in numpy.flatnonzero(numpy.diff(network.predecessor_offsets) == 0).tolist():
+            for position in range(successor_offsets[node], successor_offsets[node + 1]):
+                activity = successor_activities[position]
+                heap.append((priority[activity], activity))
+        heapq.heapify(heap)
+
+        while heap:
+            _, activity = heapq.heappop(heap)
+            time = ready[tails[activity]]
+            activity_duration = duration[activity]
+            resources = self.__resources[activity]
+            if activity_duration and resources.size:
+                time, usage = self.__earliest_start(usage, resources, self.__limits[activity], time,
+                                                    activity_duration, finish)
+                usage[resources, time:time + activity_duration] += self.demand[activity, resources][:, numpy.newaxis]
+            start[activity] = time
+            end = time + activity_duration
+            finish = max(finish, end)
+            head = heads[activity]
+            ready[head] = max(ready[head], end)
+            remaining[head] -= 1
+            if not remaining[head]:
+                for position in range(successor_offsets[head], successor_offsets[head + 1]):
+                    successor = successor_activities[position]
+                    heapq.heappush(heap, (priority[successor], successor))
+        return numpy.array(start, dtype=numpy.int64), usage[:, :finish]
+
+    def __earliest_start(self, usage, resources, limits, time, duration, finish):
+        """Finds the earliest time that some resources are available for a duration.
+
+        The usage is searched in windows that double in size, and nothing is used
+        after the finish of the activities that are already scheduled.
+
+        Returns:
+            A tuple of the start time and the usage, which is enlarged if the
+            activity ends after its last time unit.
+        """
+        window = max(MIN_WINDOW, 2 * duration)
+        while True:
+            if time >= finish:
+                end = time + duration
+            else:
+                end = min(time + window, finish + duration)
+            if end > usage.shape[1]:
+                usage = numpy.concatenate([usage, numpy.zeros((usage.shape[0], max(end, 2 * usage.shape[1]) -
+                                                               usage.shape[1]), dtype=usage.dtype)], axis=1)
+            if time >= finish:
+                return time, usage
+            busy = (usage[resources, time:end] > limits).any(axis=0)
+            busy_before = numpy.concatenate([[0], numpy.cumsum(busy)])
+            free = numpy.flatnonzero(busy_before[duration:] == busy_before[:-duration])
+            if free.size:
+                return time + int(free[0]), usage
+            # No start in the window fits, so the search goes on from the first
+            # start that has not been tried
+            time = end - duration + 1
+            window *= 2
+
+    def run_start(self, rule='lft', start=0, seed=None):
+        """Runs one start of the scheduler.
+
+        Args:
+            rule: a string, one of PRIORITY_RULES
+            start: the index of the start. The priorities of every start but the
+                first are randomly perturbed.
+            seed: the seed of the random number generator of the start
+
+        Returns:
+            A tuple of the project duration, the index of the start, the start time
+            of every activity and the usage of the resources, as returned by schedule().
+        """
+        priority = self.priorities(rule)
+        if start:
+            random_state = numpy.random.RandomState(None if seed is None else seed + start)
+            spread = (priority.max() - priority.min()) or 1.0
+            priority = priority + random_state.uniform(0, PERTURBATION * spread, priority.size)
+        starts, usage = self.schedule(priority)
+        return int((starts + self.duration).max()), start, starts, usage
+
+    def solve(self, rule='lft', starts=1, processes=None, seed=None):
+        """Finds a resource-constrained schedule of the project.
+
+        Args:
+            rule: a string, one of PRIORITY_RULES
+            starts: the number of schedules that are generated, of which the shortest
+                one is kept
+            processes: the number of processes that generate the schedules in
+                parallel, or None for generating them in the current process
+            seed: the seed of the random number generator, for repeatable schedules
+
+        Returns:
+            A dictionary with the project duration of the schedule, the project
+            duration without resources, the start ('starts') and finish time
+            ('finishes') of every activity, as dictionaries, the capacity of every
+            resource, and the usage of every resource in every time unit, as a
+            dictionary of arrays.
+        """
+        if rule not in PRIORITY_RULES:
+            raise ValueError('Unknown priority rule: ' + str(rule))
+        if starts < 1:
+            raise ValueError('The number of starts must be positive: ' + str(starts))
+        jobs = [(rule, start, seed) for start in range(starts)]
+        if processes is not None and processes > 1 and starts > 1:
+            pool = multiprocessing.Pool(min(processes, starts), initializer=_set_scheduler, initargs=(self,))
+            try:
+                candidates = pool.map(_run_start, jobs)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            candidates = [self.run_start(*job) for job in jobs]
+
+        project_duration, _, start_times, usage = min(candidates, key=lambda candidate: candidate[:2])
+        finish_times = start_times + self.duration
+        return {
+            'project_duration': project_duration,
+            'unconstrained_duration': int(self.__eet.max()),
+            'starts': dict(zip(self.activities, start_times.tolist())),
+            'finishes': dict(zip(self.activities, finish_times.tolist())),
+            'capacities': dict(zip(self.resource_names, self.capacity.tolist())),
+            'usage': dict(zip(self.resource_names, usage))
+        }
+
+
+def schedule(project, rule='lft', starts=1, processes=None, seed=None):
+    """Finds a resource-constrained schedule of a project.
+
+    Args:
+        project: a dictionary or a ProjectColumns object, as returned by the
+            validate() function
+        rule, starts, processes, seed: as in ResourceScheduler.solve()
+
+    Returns:
+        A dictionary, as returned by ResourceScheduler.solve().
+    """
+    return ResourceScheduler(project).solve(rule, starts=starts, processes=processes, seed=seed)
@@ -0,0 +1,191 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Batched what-if analysis of a project.
+
+A scenario changes the normal duration or the normal cost of some activities of
+a base project. The network of the project is built once, as a compact network,
+and the scenarios are solved together in chunks, one row of activity durations
+for every scenario, optionally across a pool of processes.
+"""
+
+import multiprocessing
+
+import numpy
+
+import aon
+import columnar
+import compact
+
+CHUNK_SIZE = 1000
+OVERRIDES = ('normal_duration', 'normal_cost')
+
+# The network of the worker processes, which is sent to every process only once
+_network = None
+
+
+def _as_number(value):
+    return int(value) if value.is_integer() else value
+
+
+def _set_network(network):
+    global _network
+    _network = network
+
+
+def _solve_chunk(duration_overrides):
+    """Solves a chunk of scenarios with the network of the worker process."""
+    return _solve(_network, duration_overrides)
+
+
+def _solve(network, duration_overrides):
+    """Solves a chunk of scenarios.
+
+    Args:
+        network: a CompactNetwork object
+        duration_overrides: a list with a tuple (activity indices, durations) of
+            arrays for every scenario
+
+    Returns:
+        A tuple of two arrays. The project duration of every scenario, and the
+        total float of every activity, with one row for every scenario.
+    """
+    durations = numpy.tile(network.normal_duration, (len(duration_overrides), 1))
+    for row, (indices, values) in enumerate(duration_overrides):
+        durations[row, indices] = values
+    eet, _, total_float = network.solve(durations)
+    return eet.max(axis=1), total_float
+
+
+class ScenarioEvaluator(object):
+    """Evaluates many what-if scenarios of the same project.
+
+    Attributes:
+        network: a CompactNetwork object of the base project.
+        activities: a list of tuples, the activities of the project in the order of
+            the total floats of the results.
+    """
+
+    def __init__(self, project):
+        """Builds the network of a project.
+
+        Args:
+            project: a dictionary or a ProjectColumns object, as returned by the
+                validate() function
+        """
+        if isinstance(project, columnar.ProjectColumns):
+            self.network = compact.CompactNetwork.from_columns(project)
+        elif aon.is_aon_project(project):
+            self.network = compact.CompactNetwork.from_project(aon.to_aoa(project)[0])
+        else:
+            self.network = compact.CompactNetwork.from_project(project)
+        self.activities = self.network.activities()
+        self.__index = dict((activity, index) for index, activity in enumerate(self.activities))
+        self.__direct_cost = self.network.normal_cost.sum()
+
+    def __parse(self, scenario):
+        """Converts a scenario to arrays of activity indices and values.
+
+        Returns:
+            A tuple (duration indices, durations, cost change).
+
+        Raises:
+            ValueError: if the scenario changes an unknown activity or property.
+        """
+        duration_indices, durations = [], []
+        cost_change = 0
+        for activity, overrides in scenario.items():
+            index = self.__index.get(tuple(activity))
+            if index is None:
+                raise ValueError('Unknown activity: ' + str(activity))
+            for key, value in overrides.items():
+                if key not in OVERRIDES:
+                    raise ValueError('Unknown property of activity {}: {}'.format(activity, key))
+                if value < 0:
+                    raise ValueError('Negative {} of activity {}: {}'.format(key, activity, value))
+            if 'normal_duration' in overrides:
+                duration_indices.append(index)
+                durations.append(overrides['normal_duration'])
+            if 'normal_cost' in overrides:
+                cost_change += overrides['normal_cost'] - self.network.normal_cost[index]
+        return (numpy.array(duration_indices, dtype=numpy.int64), numpy.array(durations, dtype=numpy.float64),
+                cost_change)
+
+    def evaluate(self, scenarios, processes=None, chunk_size=CHUNK_SIZE):
+        """Evaluates a batch of scenarios.
+
+        Args:
+            scenarios: a list of dictionaries. Every dictionary maps an activity to a
+                dictionary with its new normal_duration, normal_cost, or both.
+            processes: the number of processes that solve the chunks of scenarios in
+                parallel, or None for solving them in the current process
+            chunk_size: the number of scenarios that are solved at once, which bounds
+                the memory of the evaluation
+
+        Returns:
+            A list with a dictionary for every scenario, with its project duration,
+            direct, indirect and total cost, the total float of every activity (an
+            array in the order of the activities attribute) and its critical
+            activities (a list of tuples).
+
+        Raises:
+            ValueError: if a scenario changes an unknown activity or property.
+        """
+        parsed = [self.__parse(scenario) for scenario in scenarios]
+        chunks = [[(indices, durations) for indices, durations, _ in parsed[start:start + chunk_size]]
+                  for start in range(0, len(parsed), chunk_size)]
+        if processes is not None and processes > 1 and len(chunks) > 1:
+            pool = multiprocessing.Pool(min(processes, len(chunks)), initializer=_set_network,
+                                        initargs=(self.network,))
+            try:
+                solved = pool.map(_solve_chunk, chunks)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            solved = [_solve(self.network, chunk) for chunk in chunks]
+
+        results = []
+        for project_durations, total_float in solved:
+            # Allow for the rounding errors of the floating point sums
+            tolerance = 1e-9 * numpy.maximum(project_durations, 1)[:, numpy.newaxis]
+            critical = total_float <= tolerance
+            for row in range(project_durations.size):
+                _, _, cost_change = parsed[len(results)]
+                project_duration = _as_number(float(project_durations[row]))
+                direct_cost = _as_number(float(self.__direct_cost + cost_change))
+                indirect_cost = project_duration * self.network.indirect_cost
+                results.append({
+                    'project_duration': project_duration,
+                    'direct_cost': direct_cost,
+                    'indirect_cost': indirect_cost,
+                    'total_cost': direct_cost + indirect_cost,
+                    'total_float': total_float[row],
+                    'critical_activities': [self.activities[index] for index in numpy.flatnonzero(critical[row])]
+                })
+        return results
+
+
+def evaluate(project, scenarios, processes=None, chunk_size=CHUNK_SIZE):
+    """Evaluates a batch of what-if scenarios of a project.
+
+    Args:
+        project: a dictionary or a ProjectColumns object, as returned by the
+            validate() function
+        scenarios, processes, chunk_size: as in ScenarioEvaluator.evaluate()
+
+    Returns:
+        A list of dictionaries, as returned by ScenarioEvaluator.evaluate().
+    """
+    return ScenarioEvaluator(project).evaluate(scenarios, processes=processes, chunk_size=chunk_size)
@@ -0,0 +1,120 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Monte Carlo schedule risk analysis of a project (PERT).
+
+An activity may describe its duration with a three-point estimate, that is,
+an optimistic, a most likely and a pessimistic duration, and a distribution
+(beta-PERT by default, triangular or uniform). The activities without an
+estimate keep their normal duration. Many scenarios of the project are sampled
+at once as a matrix, and the compact network solves all of them together.
+"""
+
+import numpy
+
+import aon
+import columnar
+import compact
+
+DISTRIBUTIONS = columnar.DISTRIBUTIONS
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+CHUNK_SIZE = 10000
+
+
+def sample_durations(optimistic, most_likely, pessimistic, distribution, samples, random_state):
+    """Samples the duration of every activity.
+
+    Args:
+        optimistic, most_likely, pessimistic, distribution: arrays as returned by
+            the estimates() method of ProjectColumns
+        samples: the number of scenarios
+        random_state: a numpy RandomState object
+
+    Returns:
+        A float64 array with one row for every scenario and one column for every activity.
+    """
+    durations = numpy.tile(most_likely, (samples, 1))
+    spread = pessimistic - optimistic
+    for index, name in enumerate(DISTRIBUTIONS):
+        columns = numpy.flatnonzero((distribution == index) & (spread > 0))
+        if not columns.size:
+            continue
+        low, mode, width = optimistic[columns], most_likely[columns], spread[columns]
+        size = (samples, columns.size)
+        if name == 'pert':
+            alpha = 1 + 4 * (mode - low) / width
+            beta = 1 + 4 * (low + width - mode) / width
+            durations[:, columns] = low + width * random_state.beta(alpha, beta, size=size)
+        elif name == 'triangular':
+            durations[:, columns] = random_state.triangular(low, mode, low + width, size=size)
+        else:
+            durations[:, columns] = low + width * random_state.random_sample(size)
+    return durations
+
+
+def simulate(project, samples=10000, seed=None, chunk_size=CHUNK_SIZE):
+    """Runs a Monte Carlo simulation of the schedule of a project.
+
+    Args:
+        project: a dictionary or a ProjectColumns object, as returned by the
+            validate() function
+        samples: the number of scenarios
+        seed: the seed of the random number generator, for repeatable simulations
+        chunk_size: the number of scenarios that are solved at once, which bounds
+            the memory of the simulation
+
+    Returns:
+        A dictionary with the project duration of every scenario ('durations'), its
+        mean, standard deviation and percentiles, and the criticality index of every
+        activity, that is, the fraction of the scenarios in which it is critical, as
+        a list of tuples (activity, index) from the most to the least critical. The
+        activities of a project in the activity-on-node form are told by their ids,
+        without the dummy activities of its network.
+    """
+    if samples < 1:
+        raise ValueError('The number of samples must be positive: ' + str(samples))
+    activity_ids = None
+    if aon.is_aon_project(project):
+        project, activity_arcs = aon.to_aoa(project)
+        activity_ids = dict((arc, identifier) for identifier, arc in activity_arcs.items())
+    if not isinstance(project, columnar.ProjectColumns):
+        project = columnar.ProjectColumns.from_project(project)
+    network = compact.CompactNetwork.from_columns(project)
+    estimates = project.estimates()
+    random_state = numpy.random.RandomState(seed)
+
+    durations = numpy.empty(samples)
+    critical_counts = numpy.zeros(len(network), dtype=numpy.int64)
+    for start in range(0, samples, chunk_size):
+        count = min(chunk_size, samples - start)
+        activity_durations = sample_durations(*estimates, samples=count, random_state=random_state)
+        eet, _, total_float = network.solve(activity_durations)
+        project_durations = eet.max(axis=1)
+        durations[start:start + count] = project_durations
+        # Allow for the rounding errors of the floating point sums
+        tolerance = 1e-9 * numpy.maximum(project_durations, 1)[:, numpy.newaxis]
+        critical_counts += (total_float <= tolerance).sum(axis=0)
+
+    criticality = zip(network.activities(), (critical_counts / float(samples)).tolist())
+    if activity_ids is not None:
+        criticality = [(activity_ids[activity], index) for activity, index in criticality if activity in activity_ids]
+    criticality = sorted(criticality, key=lambda item: -item[1])
+    return {
+        'samples': samples,
+        'durations': durations,
+        'mean': float(durations.mean()),
+        'std': float(durations.std()),
+        'percentiles': dict(zip(PERCENTILES, numpy.percentile(durations, PERCENTILES).tolist())),
+        'criticality': criticality
+    }
@@ -0,0 +1,63 @@
+$(document).ready(function() {
+    var progress_url = $('#progress').data('url');
+    var events_url = $('#progress').data('events-url');
+
+    function show_progress(progress) {
+        $('#status').text(progress.status);
+        if (progress.iteration !== null) {
+            $('#iteration').text(progress.iteration);
+            $('#project_duration').text(progress.project_duration);
+        }
+    }
+
+    function format_paths(critical_paths) {
+        return '[' + $.map(critical_paths, function(path) {
+            return '[' + $.map(path, function(activity) {
+                return '(' + activity[0] + ', ' + activity[1] + ')';
+            }).join(', ') + ']';
+        }).join(', ') + ']';
+    }
+
+    function add_row(result) {
+        var row = $('<tr>');
+        $.each([result.project_duration, format_paths(result.critical_paths), result.direct_cost,
+                result.indirect_cost, result.total_cost], function(index, value) {
+            row.append($('<td>').text(value));
+        });
+        $('#rows').append(row);
+    }
+
+    function poll() {
+        $.getJSON(progress_url, function(progress) {
+            show_progress(progress);
+            if (progress.status == 'done' || progress.status == 'failed') {
+                window.location.reload();
+            } else {
+                setTimeout(poll, 1000);
+            }
+        });
+    }
+
+    if (window.EventSource) {
+        // Every iteration is shown as soon as it is complete
+        var source = new EventSource(events_url);
+        var iteration = 0;
+        source.onopen = function() {
+            // A stream that reconnects starts again from the first iteration
+            $('#rows tr:gt(0)').remove();
+            iteration = 0;
+        };
+        source.onmessage = function(event) {
+            var result = JSON.parse(event.data);
+            add_row(result);
+            show_progress({status: 'running', iteration: iteration++, project_duration: result.project_duration});
+        };
+        source.addEventListener('done', function(event) {
+            source.close();
+            show_progress(JSON.parse(event.data));
+            window.location.reload();
+        });
+    } else {
+        setTimeout(poll, 1000);
+    }
+});
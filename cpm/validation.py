@@ -0,0 +1,667 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Streaming validation of project files.
+
+The activities of a project file are decoded one at a time from a buffer that
+holds only a part of the file, and every activity is checked against the schema
+as soon as it is decoded, so a very large project file is never held in memory
+both as text and as objects. The schema is compiled once into a validator, with
+a fast path for the plain properties of the activities, which falls back to the
+full JSON schema validator only for an activity that the fast path cannot accept.
+After the activities are read, the network that they form is checked for cycles,
+for more than one start or end node, and for duplicate activities. Every problem
+is reported, along with the index of the activity that causes it.
+
+A project in the activity-on-node form, whose activities are objects with an id
+and a list of predecessors instead of arrays of two nodes and their properties,
+is validated against its own schema, and its network is checked for duplicate
+ids, unknown predecessors and cycles.
+"""
+
+import array
+import copy
+import json
+import re
+import sys
+
+import jsonschema
+import numpy
+
+import columnar
+import compact
+
+CHUNK_SIZE = 1024 * 1024
+MAX_LISTED_NODES = 10
+# The nodes are kept in arrays of C longs
+MAX_NODE = sys.maxint
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DELIMITERS = ' \t\n\r,]}'
+_TYPES = {
+    'integer': (int, long),
+    'number': (int, long, float)
+}
+
+
+class _StreamReader(object):
+    """Decodes the JSON values of a file one at a time, reading it in chunks."""
+
+    def __init__(self, project_file, chunk_size=CHUNK_SIZE):
+        self.__file = project_file
+        self.__chunk_size = chunk_size
+        self.__decoder = json.JSONDecoder()
+        self.__buffer = ''
+        self.__position = 0
+        self.__eof = False
+
+    def __fill(self, size):
+        if self.__eof:
+            return False
+        chunk = self.__file.read(size)
+        if not chunk:
+            self.__eof = True
+            return False
+        self.__buffer = self.__buffer[self.__position:] + chunk
+        self.__position = 0
+        return True
+
+    def peek(self):
+        """Skips the whitespace and returns the next character, or '' at the end of the file."""
+        while True:
+            self.__position = _WHITESPACE.match(self.__buffer, self.__position).end()
+            if self.__position < len(self.__buffer):
+                return self.__buffer[self.__position]
+            if not self.__fill(self.__chunk_size):
+                return ''
+
+    def expect(self, characters):
+        """Consumes the next character, which must be one of the given characters."""
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError('Expected one of {!r} at position {}'.format(characters, self.__position))
+        self.__position += 1
+        return character
+
+    def decode(self):
+        """Decodes the next JSON value."""
+        self.peek()
+        size = self.__chunk_size
+        while True:
+            try:
+                value, end = self.__decoder.raw_decode(self.__buffer, self.__position)
+                # A number that is followed by anything but a delimiter, or by the end
+                # of the buffer, may continue in the file
+                if self.__eof or end < len(self.__buffer) and (
+                        self.__buffer[end] in _DELIMITERS or not isinstance(value, (int, long, float))):
+                    self.__position = end
+                    return value
+            except ValueError:
+                if self.__eof:
+                    raise
+            # Read twice as much every time, so a value much larger than a chunk
+            # is not decoded over and over
+            self.__fill(size)
+            size *= 2
+
+
+def _compile_property(schema):
+    """Compiles the schema of a plain property.
+
+    Returns:
+        A tuple (types, minimum, enum), where each item is None if the schema does
+        not restrict it, or None if the schema uses keywords other than type,
+        minimum and enum.
+    """
+    if not set(schema) <= set(['type', 'minimum', 'enum']):
+        return None
+    types = _TYPES.get(schema.get('type'))
+    if 'type' in schema and types is None or 'minimum' in schema and types is None:
+        return None
+    return types, schema.get('minimum'), schema.get('enum')
+
+
+def _compile_mapping(schema):
+    """Compiles the schema of an object property, whose values are plain.
+
+    Returns:
+        A tuple (types, minimum, enum) for the values of the object, as returned by
+        _compile_property(), or None if the schema is not of such a property.
+    """
+    if set(schema) != set(['type', 'additionalProperties']) or schema['type'] != 'object' or \
+            not isinstance(schema['additionalProperties'], dict):
+        return None
+    return _compile_property(schema['additionalProperties'])
+
+
+def _compile_sequence(schema):
+    """Compiles the schema of an array property, whose items are plain.
+
+    If the items may be one of several schemas (anyOf), only the first plain one
+    of them is compiled, so an item that complies with it is surely valid.
+
+    Returns:
+        A tuple (types, minimum, enum) for the items of the array, as returned by
+        _compile_property(), or None if the schema is not of such a property.
+    """
+    if set(schema) != set(['type', 'items']) or schema['type'] != 'array' or not isinstance(schema['items'], dict):
+        return None
+    item_schemas = [schema['items']]
+    if set(schema['items']) == set(['anyOf']):
+        item_schemas = schema['items']['anyOf']
+    for item_schema in item_schemas:
+        rule = _compile_property(item_schema)
+        if rule is not None:
+            return rule
+    return None
+
+
+def _complies(value, rule):
+    types, minimum, enum = rule
+    # type() excludes booleans, which are not numbers in JSON
+    if types is not None and type(value) not in types:
+        return False
+    if minimum is not None and value < minimum:
+        return False
+    return enum is None or value in enum
+
+
+def _format_path(index, path):
+    return 'activities[{}]'.format(index) + ''.join(
+        '[{}]'.format(item) if isinstance(item, int) else '.' + item for item in path)
+
+
+class ProjectValidator(object):
+    """A project schema, compiled once and reused for every project file.
+
+    Attributes:
+        schema: a dictionary, the JSON schema of the project files.
+        alternative: a ProjectValidator object for the project files whose
+            activities are objects instead of arrays, or None.
+    """
+
+    def __init__(self, schema, checker=None, alternative=None):
+        """Compiles a project schema.
+
+        Args:
+            schema: a dictionary, the JSON schema of the project files. Its
+                activities are either arrays of two nodes and an object of
+                properties, or objects of properties.
+            checker: the class of the objects that check the network of the
+                activities, NetworkChecker by default
+            alternative: a ProjectValidator object, that validates instead the
+                project files whose first activity is an object
+        """
+        self.schema = schema
+        self.alternative = alternative
+        self.__checker_class = checker or NetworkChecker
+        activity_schema = schema['properties']['activities']['items']
+        # The activities are validated one at a time, as they are read
+        project_schema = copy.deepcopy(schema)
+        del project_schema['properties']['activities']['items']
+        self.__project_validator = jsonschema.Draft4Validator(project_schema)
+        self.__activity_validator = jsonschema.Draft4Validator(activity_schema)
+
+        if activity_schema.get('type') == 'array':
+            node_schemas = activity_schema['items'][:2]
+            data_schema = activity_schema['items'][2]
+            self.__node_rules = [_compile_property(node_schema) for node_schema in node_schemas]
+        else:
+            data_schema = activity_schema
+            self.__node_rules = None
+        self.__property_rules = {}
+        self.__mapping_rules = {}
+        self.__sequence_rules = {}
+        for name, property_schema in data_schema.get('properties', {}).items():
+            rule = _compile_property(property_schema)
+            mapping_rule = _compile_mapping(property_schema) if rule is None else None
+            sequence_rule = _compile_sequence(property_schema) if rule is None and mapping_rule is None else None
+            if mapping_rule is not None:
+                self.__mapping_rules[name] = mapping_rule
+            elif sequence_rule is not None:
+                self.__sequence_rules[name] = sequence_rule
+            else:
+                self.__property_rules[name] = rule
+        self.__required = frozenset(data_schema.get('required', []))
+        self.__dependencies = data_schema.get('dependencies', {})
+        self.__dependent_names = frozenset(self.__dependencies)
+        self.__fast_path = (None not in (self.__node_rules or []) and set(data_schema) <= set(
+            ['type', 'properties', 'required', 'dependencies']) and all(
+            isinstance(dependency, list) for dependency in self.__dependencies.values()))
+
+    def __is_plain_activity(self, activity):
+        """Checks an activity without the JSON schema validator.
+
+        Returns:
+            True if the activity complies with the schema, and False if it may not.
+        """
+        if not self.__fast_path:
+            return False
+        if self.__node_rules is None:
+            data = activity
+        else:
+            if type(activity) is not list or len(activity) != 3:
+                return False
+            node1, node2, data = activity
+            if not (_complies(node1, self.__node_rules[0]) and _complies(node2, self.__node_rules[1])):
+                return False
+        if type(data) is not dict or not self.__required <= data.viewkeys():
+            return False
+        for name, value in data.iteritems():
+            rule = self.__property_rules.get(name, False)
+            if rule is False:
+                continue
+            if rule is None:
+                return False
+            types, minimum, enum = rule
+            if (types is not None and type(value) not in types or minimum is not None and value < minimum or
+                    enum is not None and value not in enum):
+                return False
+        for name, rule in self.__mapping_rules.iteritems():
+            if name in data:
+                value = data[name]
+                if type(value) is not dict or not all(_complies(item, rule) for item in value.itervalues()):
+                    return False
+        for name, rule in self.__sequence_rules.iteritems():
+            if name in data:
+                value = data[name]
+                if type(value) is not list or not all(_complies(item, rule) for item in value):
+                    return False
+        if not self.__dependent_names.isdisjoint(data):
+            for name, dependency in self.__dependencies.iteritems():
+                if name in data and not data.viewkeys() >= set(dependency):
+                    return False
+        return True
+
+    def activity_errors(self, index, activity):
+        """Returns a list of strings, the schema errors of an activity."""
+        if self.__is_plain_activity(activity):
+            return []
+        return ['{}: {}'.format(_format_path(index, error.path), error.message)
+                for error in sorted(self.__activity_validator.iter_errors(activity), key=lambda error: error.path)]
+
+    def validate(self, project_file, chunk_size=CHUNK_SIZE):
+        """Reads and validates a project file.
+
+        Args:
+            project_file: a File Object that describes the project in JSON
+            chunk_size: the number of bytes that are read from the file at once
+
+        Returns:
+            A tuple of two objects. The first object is a dictionary, as converted
+            from the project file, and the second object is a list of strings,
+            which is empty if the project is valid.
+
+        Raises:
+            ValueError: if the file is not a valid JSON file.
+        """
+        reader = _StreamReader(project_file, chunk_size)
+        # The form of the activities, and so the validator, is decided by the first one
+        validator = self
+        checker = None
+        errors = []
+        project = {}
+        reader.expect('{')
+        if reader.peek() == '}':
+            reader.expect('}')
+        else:
+            while True:
+                key = reader.decode()
+                if not isinstance(key, basestring):
+                    raise ValueError('The keys of an object must be strings')
+                reader.expect(':')
+                if key == 'activities' and reader.peek() == '[':
+                    reader.expect('[')
+                    if self.alternative is not None and reader.peek() == '{':
+                        validator = self.alternative
+                    checker = validator.__checker_class()
+                    project[key] = validator.__read_activities(reader, checker, errors)
+                else:
+                    project[key] = reader.decode()
+                if reader.expect(',}') == '}':
+                    break
+        if reader.peek():
+            raise ValueError('Extra data after the project')
+        if checker is None:
+            checker = self.__checker_class()
+
+        skeleton = project
+        if isinstance(project.get('activities'), list):
+            # One activity is enough to check the length of the array
+            skeleton = dict(project, activities=project['activities'][:1])
+        project_errors = [('.'.join(str(item) for item in error.path) or 'project') + ': ' + error.message
+                          for error in validator.__project_validator.iter_errors(skeleton)]
+        errors[:0] = project_errors
+        if not project_errors:
+            errors.extend(resource_errors(project['info'].get('resources', {}), checker.demands))
+        errors.extend(checker.errors())
+        return project, errors
+
+    def __read_activities(self, reader, checker, errors):
+        """Reads the activities of a project, after the opening bracket of their array."""
+        activities = []
+        if reader.peek() == ']':
+            reader.expect(']')
+            return activities
+        while True:
+            activity = reader.decode()
+            index = len(activities)
+            activity_errors = self.activity_errors(index, activity)
+            if activity_errors:
+                errors.extend(activity_errors)
+            else:
+                errors.extend(checker.add(index, activity))
+            activities.append(activity)
+            if reader.expect(',]') == ']':
+                return activities
+
+
+def _property_errors(index, data):
+    """Checks the properties of an activity, that comply with the schema, against each other."""
+    errors = []
+    if data['crash_duration'] > data['normal_duration']:
+        errors.append('activities[{}]: the crash duration {} is greater than the normal duration {}'.format(
+            index, data['crash_duration'], data['normal_duration']))
+    if 'optimistic_duration' in data and not (data['optimistic_duration'] <= data['most_likely_duration'] <=
+                                              data['pessimistic_duration']):
+        errors.append('activities[{}]: the most likely duration must lie between the optimistic and the '
+                      'pessimistic duration'.format(index))
+    return errors
+
+
+class NetworkChecker(object):
+    """Checks the structure of the network that the activities of a project form.
+
+    The activities are added one at a time. The checks of a single activity are
+    made as it is added, and the checks of the whole network at the end.
+
+    Attributes:
+        demands: a list of tuples (index, resources), the resource demands of the
+            activities, as passed to resource_errors().
+    """
+
+    def __init__(self):
+        # Arrays of C longs, which take far less memory than lists of integers
+        self.__indices = array.array('l')
+        self.__node1 = array.array('l')
+        self.__node2 = array.array('l')
+        self.demands = []
+
+    def add(self, index, activity):
+        """Adds an activity, that complies with the schema, to the network.
+
+        Returns:
+            A list of strings, the errors of the activity.
+        """
+        node1, node2, data = activity
+        if -MAX_NODE <= node1 <= MAX_NODE and -MAX_NODE <= node2 <= MAX_NODE:
+            self.__indices.append(index)
+            self.__node1.append(node1)
+            self.__node2.append(node2)
+            errors = []
+        else:
+            errors = ['activities[{}]: the node {} is out of range'.format(index, node)
+                      for node in (node1, node2) if abs(node) > MAX_NODE]
+        if node1 == node2:
+            errors.append('activities[{}]: the activity starts and ends at the node {}'.format(index, node1))
+        errors.extend(_property_errors(index, data))
+        if 'resources' in data:
+            self.demands.append((index, data['resources']))
+        return errors
+
+    def errors(self):
+        """Checks the whole network.
+
+        Returns:
+            A list of strings, the errors of the network.
+        """
+        return network_errors(*[numpy.frombuffer(column, dtype=numpy.int_).astype(numpy.int64)
+                                for column in (self.__indices, self.__node1, self.__node2)])
+
+
+class TaskChecker(object):
+    """Checks the structure of the network of a project in the activity-on-node form.
+
+    The activities are added one at a time, as in NetworkChecker, and the network
+    is checked for duplicate ids, unknown predecessors and cycles at the end.
+
+    Attributes:
+        demands: a list of tuples (index, resources), the resource demands of the
+            activities, as passed to resource_errors().
+    """
+
+    def __init__(self):
+        self.__indices = array.array('l')
+        self.__ids = array.array('l')
+        # Every dependency, as the id of the predecessor, and the id and the index
+        # of the activity that depends on it
+        self.__predecessors = array.array('l')
+        self.__dependents = array.array('l')
+        self.__dependent_indices = array.array('l')
+        self.demands = []
+
+    def add(self, index, activity):
+        """Adds an activity, that complies with the schema, to the network.
+
+        Returns:
+            A list of strings, the errors of the activity.
+        """
+        identifier = activity['id']
+        if abs(identifier) > MAX_NODE:
+            return ['activities[{}]: the id {} is out of range'.format(index, identifier)]
+        self.__indices.append(index)
+        self.__ids.append(identifier)
+        errors = []
+        listed = set()
+        for entry in activity.get('predecessors', ()):
+            predecessor = entry['id'] if isinstance(entry, dict) else entry
+            if predecessor == identifier:
+                errors.append('activities[{}]: the activity {} is a predecessor of itself'.format(index, identifier))
+            elif predecessor in listed:
+                errors.append('activities[{}]: the predecessor {} is listed more than once'.format(index, predecessor))
+            elif abs(predecessor) > MAX_NODE:
+                errors.append('activities[{}]: the id {} is out of range'.format(index, predecessor))
+            else:
+                self.__predecessors.append(predecessor)
+                self.__dependents.append(identifier)
+                self.__dependent_indices.append(index)
+            listed.add(predecessor)
+        errors.extend(_property_errors(index, activity))
+        if 'resources' in activity:
+            self.demands.append((index, activity['resources']))
+        return errors
+
+    def errors(self):
+        """Checks the whole network.
+
+        Returns:
+            A list of strings, the errors of the network.
+        """
+        indices, ids, predecessors, dependents, dependent_indices = [
+            numpy.frombuffer(column, dtype=numpy.int_).astype(numpy.int64) for column in (
+                self.__indices, self.__ids, self.__predecessors, self.__dependents, self.__dependent_indices)]
+        if not ids.size:
+            return []
+        errors = []
+
+        order = numpy.lexsort((indices, ids))
+        sorted_ids = ids[order]
+        same = numpy.concatenate([[False], sorted_ids[1:] == sorted_ids[:-1]])
+        firsts = numpy.maximum.accumulate(numpy.where(same, 0, numpy.arange(order.size)))
+        for position in numpy.flatnonzero(same).tolist():
+            errors.append('activities[{}]: duplicates the id {} of activities[{}]'.format(
+                indices[order[position]], sorted_ids[position], indices[order[firsts[position]]]))
+
+        identifiers = sorted_ids[~same]
+        known = numpy.in1d(predecessors, identifiers)
+        for position in numpy.flatnonzero(~known).tolist():
+            errors.append('activities[{}]: the predecessor {} is not an activity of the project'.format(
+                dependent_indices[position], predecessors[position]))
+
+        predecessors, dependents = predecessors[known], dependents[known]
+        try:
+            compact.topological_levels(identifiers.size, numpy.searchsorted(identifiers, predecessors),
+                                       numpy.searchsorted(identifiers, dependents))
+        except ValueError:
+            cycle = _find_cycle(predecessors.tolist(), dependents.tolist())
+            errors.append('network: it contains a cycle, ' + ' -> '.join(str(node) for node in cycle))
+        return errors
+
+
+def resource_errors(capacities, demands):
+    """Checks the resource demands of some activities against the capacities of the resources.
+
+    Args:
+        capacities: a dictionary that maps every resource of the project to its capacity
+        demands: a list of tuples (index, resources), with the index of an activity in
+            the project and a dictionary that maps a resource to the demand of the activity
+
+    Returns:
+        A list of strings, the errors of the demands.
+    """
+    errors = []
+    for index, resources in demands:
+        for name, demand in sorted(resources.items()):
+            if name not in capacities:
+                errors.append('activities[{}]: the resource {} is not one of the resources of the project'.format(
+                    index, name))
+            elif demand > capacities[name]:
+                errors.append('activities[{}]: it demands {} units of the resource {}, more than its capacity {}'
+                              .format(index, demand, name, capacities[name]))
+    return errors
+
+
+def network_errors(indices, node1, node2):
+    """Checks the network that some activities form.
+
+    Args:
+        indices: an int array, the index of every activity in the project
+        node1, node2: int arrays, the first and the last node of every activity
+
+    Returns:
+        A list of strings, the errors of the network.
+    """
+    if not node1.size:
+        return []
+    errors = []
+
+    # Sorting by activity brings the duplicates next to each other, after the
+    # first one of them
+    order = numpy.lexsort((indices, node2, node1))
+    sorted_node1, sorted_node2 = node1[order], node2[order]
+    same = numpy.concatenate([[False], (sorted_node1[1:] == sorted_node1[:-1]) &
+                              (sorted_node2[1:] == sorted_node2[:-1])])
+    firsts = numpy.maximum.accumulate(numpy.where(same, 0, numpy.arange(order.size)))
+    for position in numpy.flatnonzero(same).tolist():
+        errors.append('activities[{}]: duplicates activities[{}], the activity ({}, {})'.format(
+            indices[order[position]], indices[order[firsts[position]]], sorted_node1[position],
+            sorted_node2[position]))
+
+    for nodes, description in ((numpy.setdiff1d(node1, node2), 'start'), (numpy.setdiff1d(node2, node1), 'end')):
+        if nodes.size != 1:
+            listed = ', '.join(str(node) for node in nodes[:MAX_LISTED_NODES].tolist())
+            if nodes.size > MAX_LISTED_NODES:
+                listed += ', ...'
+            errors.append('network: it has {} {} nodes ({}), but it must have exactly one'.format(
+                nodes.size, description, listed))
+
+    identifiers, numbered = numpy.unique(numpy.concatenate([node1, node2]), return_inverse=True)
+    try:
+        compact.topological_levels(identifiers.size, numbered[:node1.size], numbered[node1.size:])
+    except ValueError:
+        cycle = _find_cycle(node1.tolist(), node2.tolist())
+        errors.append('network: it contains a cycle, ' + ' -> '.join(str(node) for node in cycle))
+    return errors
+
+
+def _find_cycle(node1, node2):
+    successors = {}
+    for tail, head in zip(node1, node2):
+        successors.setdefault(tail, []).append(head)
+    # Iterative depth first search, that marks the nodes on the current path
+    state = {}
+    for root in successors:
+        if root in state:
+            continue
+        path = [root]
+        stack = [iter(successors.get(root, ()))]
+        state[root] = 'open'
+        while stack:
+            for successor in stack[-1]:
+                if state.get(successor) == 'open':
+                    return path[path.index(successor):] + [successor]
+                if successor not in state:
+                    state[successor] = 'open'
+                    path.append(successor)
+                    stack.append(iter(successors.get(successor, ())))
+                    break
+            else:
+                state[path.pop()] = 'closed'
+                stack.pop()
+    return []
+
+
+def check_columns(columns):
+    """Checks a project in the columnar format.
+
+    The same checks are made as for a project in JSON, on whole columns at once.
+
+    Args:
+        columns: a ProjectColumns object
+
+    Returns:
+        A list of strings, the errors of the project.
+    """
+    lengths = set(getattr(columns, key).size for key in columnar.COLUMNS)
+    if columns.has_estimates:
+        lengths.update(getattr(columns, key).size for key in columnar.ESTIMATE_COLUMNS + ('distribution',))
+    if len(lengths) != 1:
+        return ['project: the columns of the activities differ in length']
+    if columns.has_resources and columns.resource_capacity.shape != (len(columns.resource_names),):
+        return ['project: the capacities do not match the resources']
+    if not len(columns):
+        return ['activities: the project has no activities']
+
+    errors = []
+    for index in numpy.flatnonzero(columns.node1 == columns.node2).tolist():
+        errors.append('activities[{}]: the activity starts and ends at the node {}'.format(
+            index, columns.node1[index]))
+    for index in numpy.flatnonzero(columns.crash_duration > columns.normal_duration).tolist():
+        errors.append('activities[{}]: the crash duration {} is greater than the normal duration {}'.format(
+            index, columns.crash_duration[index], columns.normal_duration[index]))
+    if columns.has_estimates:
+        estimated = columns.distribution >= 0
+        for index in numpy.flatnonzero(columns.distribution >= len(columnar.DISTRIBUTIONS)).tolist():
+            errors.append('activities[{}]: the distribution {} is unknown'.format(index, columns.distribution[index]))
+        with numpy.errstate(invalid='ignore'):
+            invalid = estimated & ~((columns.optimistic_duration >= 0) &
+                                    (columns.optimistic_duration <= columns.most_likely_duration) &
+                                    (columns.most_likely_duration <= columns.pessimistic_duration))
+        for index in numpy.flatnonzero(invalid).tolist():
+            errors.append('activities[{}]: the most likely duration must lie between the optimistic and the '
+                          'pessimistic duration'.format(index))
+    capacity_errors = []
+    if columns.has_resources:
+        for resource in numpy.flatnonzero(columns.resource_capacity < 0).tolist():
+            capacity_errors.append('info.resources.{}: the capacity {} is negative'.format(
+                columns.resource_names[resource], columns.resource_capacity[resource]))
+        for index, resource in zip(*numpy.nonzero(columns.resource_demand < 0)):
+            errors.append('activities[{}]: the demand {} of the resource {} is negative'.format(
+                index, columns.resource_demand[index, resource], columns.resource_names[resource]))
+        for index, resource in zip(*numpy.nonzero(columns.resource_demand > columns.resource_capacity)):
+            errors.append('activities[{}]: it demands {} units of the resource {}, more than its capacity {}'.format(
+                index, columns.resource_demand[index, resource], columns.resource_names[resource],
+                columns.resource_capacity[resource]))
+    errors.sort(key=lambda error: int(error[len('activities['):error.index(']')]))
+    return capacity_errors + errors + network_errors(numpy.arange(len(columns)), columns.node1, columns.node2)
@@ -12,18 +12,37 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import time
+import json
+import os.path
 
+from flask import abort
 from flask import Flask
+from flask import jsonify
 from flask import Markup
+from flask import redirect
 from flask import render_template
 from flask import request
+from flask import Response
+from flask import stream_with_context
+from flask import url_for
 import prettytable
 
+import cache
 import cpm
+import curve
+import jobs
 
 
 app = Flask(__name__)
+# The results are cached in the instance folder of the application, outside the
+# package, unless a file named by the CPM_SETTINGS environment variable sets the
+# RESULT_CACHE_DIR option
+app.config['RESULT_CACHE_DIR'] = os.path.join(app.instance_path, 'result-cache')
+app.config.from_envvar('CPM_SETTINGS', silent=True)
+result_cache = cache.ResultCache(app.config['RESULT_CACHE_DIR'])
+job_queue = jobs.JobQueue(os.path.join(app.static_folder, 'results'), result_cache=result_cache)
+# A comment is sent to idle event streams this often, so that proxies keep them open
+EVENTS_KEEPALIVE = 15
 
 
 def _get_html_results_table(results):
@@ -32,7 +51,7 @@ def _get_html_results_table(results):
     ])
     for result in results:
         results_table.add_row([
-            result['project_duration'], result['critical_paths'],
+            result['project_duration'], list(cpm.critical_paths(result)),
             result['direct_cost'], result['indirect_cost'], result['total_cost']
         ])
     return results_table.get_html_string()
@@ -45,21 +64,91 @@ def index():
         if project_file:
             try:
                 project = cpm.validate(project_file)
-            except cpm.ProjectValidationException as exc:
+                options = {}
+                if request.form.get('stop_on_cost_increase'):
+                    options['stop_on_cost_increase'] = True
+                job = job_queue.submit(project, **options)
+            except (cpm.ProjectValidationException, jobs.JobQueueFull) as exc:
                 return render_template('index.html', error=exc)
-            cpmnet = cpm.CriticalPathMethod(project)
-            cpmnet.run_cpm()
-            results, images, optimum_solution = cpmnet.get_results('static/results/')
-            return render_template('results.html',
-                                   results_table=Markup(_get_html_results_table(results)),
-                                   images=zip(images, range(0, len(images))),
-                                   force_reload=str(time.time()),
-                                   optimum_total_cost=optimum_solution[0],
-                                   optimum_project_duration=optimum_solution[1])
+            return redirect(url_for('job', job_id=job.id))
         else:
             return render_template('index.html', error='No project file has been uploaded.')
 
     return render_template('index.html')
 
+
+@app.route('/jobs/<job_id>')
+def job(job_id):
+    current_job = job_queue.get(job_id)
+    if current_job is None:
+        abort(404)
+    if current_job.status == 'failed':
+        return render_template('index.html', error=current_job.error)
+    if current_job.status != 'done':
+        return render_template('job.html', job=current_job)
+    images = [current_job.id + '/' + image for image in current_job.images]
+    return render_template('results.html',
+                           results_table=Markup(_get_html_results_table(current_job.results)),
+                           images=zip(images, range(0, len(images))),
+                           optimum_total_cost=current_job.optimum_solution[0],
+                           optimum_project_duration=current_job.optimum_solution[1])
+
+
+@app.route('/jobs/<job_id>/progress')
+def job_progress(job_id):
+    current_job = job_queue.get(job_id)
+    if current_job is None:
+        abort(404)
+    return jsonify(current_job.progress())
+
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    # Every result is sent as a message, in JSON, as soon as its iteration is
+    # complete, and a done event with the progress follows once the job is finished
+    current_job = job_queue.get(job_id)
+    if current_job is None:
+        abort(404)
+
+    def generate():
+        for result in current_job.events(timeout=EVENTS_KEEPALIVE):
+            if result is None:
+                yield ': keepalive\n\n'
+            else:
+                # The rows keep only the critical activities, and the page shows the paths
+                row = dict(result, critical_paths=list(cpm.critical_paths(result)))
+                yield 'data: {}\n\n'.format(json.dumps(row))
+        yield 'event: done\ndata: {}\n\n'.format(json.dumps(current_job.progress()))
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+
+@app.route('/jobs/<job_id>/curve')
+def job_curve(job_id):
+    # The cheapest breakpoint within a duration, the shortest breakpoint within a
+    # budget, or every breakpoint, from the index of the time-cost curve of the job
+    current_job = job_queue.get(job_id)
+    if current_job is None or current_job.curve is None:
+        abort(404)
+    cost = request.args.get('cost', 'total_cost')
+    if cost not in curve.COSTS:
+        abort(400)
+    try:
+        if 'duration' in request.args:
+            return jsonify(breakpoint=current_job.curve.cost_for_duration(float(request.args['duration']), cost))
+        if 'budget' in request.args:
+            return jsonify(breakpoint=current_job.curve.duration_for_budget(float(request.args['budget']), cost))
+    except ValueError:
+        abort(400)
+    return jsonify(current_job.curve.to_dict())
+
+
+@app.route('/metrics')
+def metrics():
+    queue_metrics = job_queue.metrics()
+    queue_metrics['cache'] = result_cache.stats()
+    return jsonify(queue_metrics)
+
 if __name__ == '__main__':
     app.run(debug=True)
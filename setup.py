@@ -38,6 +38,7 @@ setup(
         'jsonschema',
         'matplotlib',
         'networkx',
+        'numpy',
         'PrettyTable'
     ],
     entry_points={
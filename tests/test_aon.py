@@ -0,0 +1,167 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import random
+import StringIO
+import unittest
+
+from cpm import aon
+from cpm import cpm
+from cpm import render
+from tests import test_cpm
+
+
+def random_project(random_state, activities):
+    """Generates a random project in the activity-on-node form, with some lags."""
+    ids = random_state.sample(range(1, 10 * activities), activities)
+    tasks = []
+    for position, identifier in enumerate(ids):
+        normal_duration = random_state.randint(0, 9)
+        task = {'id': identifier, 'normal_duration': normal_duration, 'normal_cost': 100 * normal_duration,
+                'crash_duration': random_state.randint(0, normal_duration),
+                'crash_cost': 100 * normal_duration + random_state.randint(0, 50)}
+        predecessors = random_state.sample(ids[:position], min(position, random_state.randint(0, 3)))
+        if predecessors:
+            task['predecessors'] = [{'id': predecessor, 'lag': random_state.randint(1, 3)}
+                                    if random_state.random() < 0.2 else predecessor for predecessor in predecessors]
+        tasks.append(task)
+    random_state.shuffle(tasks)
+    return {'info': {'indirect_cost': 50}, 'activities': tasks}
+
+
+def reference_schedule(project):
+    """Solves a project in the activity-on-node form with plain loops."""
+    tasks = dict((task['id'], task) for task in project['activities'])
+    predecessors = dict((identifier, [aon._predecessor(entry) for entry in task.get('predecessors', ())])
+                        for identifier, task in tasks.items())
+    early_start = {}
+
+    def start(identifier):
+        if identifier not in early_start:
+            early_start[identifier] = max([start(predecessor) + tasks[predecessor]['normal_duration'] + lag
+                                           for predecessor, lag in predecessors[identifier]] or [0])
+        return early_start[identifier]
+
+    project_duration = max(start(identifier) + task['normal_duration'] for identifier, task in tasks.items())
+    successors = dict((identifier, []) for identifier in tasks)
+    for identifier, entries in predecessors.items():
+        for predecessor, lag in entries:
+            successors[predecessor].append((identifier, lag))
+    late_finish = {}
+
+    def finish(identifier):
+        if identifier not in late_finish:
+            late_finish[identifier] = min([finish(successor) - tasks[successor]['normal_duration'] - lag
+                                           for successor, lag in successors[identifier]] or [project_duration])
+        return late_finish[identifier]
+
+    for identifier in tasks:
+        finish(identifier)
+    return project_duration, early_start, late_finish
+
+
+class AONNetworkTest(unittest.TestCase):
+
+    def test_schedule(self):
+        random_state = random.Random(1)
+        for _ in range(200):
+            project = random_project(random_state, random_state.randint(1, 30))
+            project_duration, early_start, late_finish = reference_schedule(project)
+            schedule = aon.AONNetwork(project).schedule()
+            self.assertEqual(schedule['project_duration'], project_duration)
+            for task, activity in zip(project['activities'], schedule['activities']):
+                self.assertEqual(activity['id'], task['id'])
+                self.assertEqual(activity['early_start'], early_start[task['id']])
+                self.assertEqual(activity['late_finish'], late_finish[task['id']])
+                self.assertEqual(activity['total_float'],
+                                 late_finish[task['id']] - early_start[task['id']] - task['normal_duration'])
+                self.assertEqual(activity['critical'], activity['total_float'] == 0)
+
+    def test_aoa_has_the_same_schedule(self):
+        random_state = random.Random(2)
+        for _ in range(300):
+            project = random_project(random_state, random_state.randint(1, 30))
+            converted, arcs = aon.to_aoa(project)
+            self.assertEqual(cpm.validate(StringIO.StringIO(json.dumps(converted))), converted, project)
+
+            schedule = aon.AONNetwork(project).schedule()
+            cpmnet = cpm.CriticalPathMethod(converted)
+            cpmnet._solve_network()
+            graph = cpmnet.graph
+            self.assertEqual(graph.node[cpmnet.sink]['eet'], schedule['project_duration'], project)
+            for activity in schedule['activities']:
+                node1, node2 = arcs[activity['id']]
+                self.assertEqual(graph.node[node1]['eet'], activity['early_start'], project)
+                self.assertEqual(graph.edge[node1][node2]['total_float'], activity['total_float'], project)
+
+    def test_aoa_is_crashed_like_the_project(self):
+        project = dict(test_cpm.load_samples())['five-activities-aon-project.json']
+        converted, arcs = aon.to_aoa(project)
+        from_aon = cpm.CriticalPathMethod(project)
+        from_aon.run_cpm(crashing='mincut')
+        from_aoa = cpm.CriticalPathMethod(converted)
+        from_aoa.run_cpm(crashing='mincut')
+        results, images, optimum_solution = from_aon.get_results()
+        self.assertEqual((images, optimum_solution), from_aoa.get_results()[1:])
+        for result, aoa_result in zip(results, from_aoa.get_results()[0]):
+            critical_arcs = [(node1, node2) for node1, node2, _ in result.pop('critical_arcs')]
+            self.assertEqual(critical_arcs, aoa_result.pop('critical_activities'))
+            self.assertEqual(result.pop('critical_activities'),
+                             [activity['id'] for activity in project['activities']
+                              if arcs[activity['id']] in critical_arcs])
+            self.assertEqual(result, aoa_result)
+        self.assertEqual(len(results), len(from_aoa.get_results()[0]))
+        self.assertEqual(from_aon.activity_arcs, arcs)
+        self.assertEqual(len(arcs), len(project['activities']))
+
+    def test_critical_paths_are_told_by_activity_ids(self):
+        # Activity c waits for both a and b, so the network needs a dummy activity
+        project = {'info': {'indirect_cost': 1}, 'activities': [
+            {'id': 'a', 'normal_duration': 4, 'normal_cost': 1, 'crash_duration': 4, 'crash_cost': 1},
+            {'id': 'b', 'normal_duration': 4, 'normal_cost': 1, 'crash_duration': 4, 'crash_cost': 1},
+            {'id': 'c', 'predecessors': ['a', 'b'], 'normal_duration': 1, 'normal_cost': 1, 'crash_duration': 1,
+             'crash_cost': 1},
+            {'id': 'd', 'predecessors': ['a'], 'normal_duration': 1, 'normal_cost': 1, 'crash_duration': 1,
+             'crash_cost': 1}]}
+        converted, _ = aon.to_aoa(project)
+        self.assertGreater(len(converted['activities']), len(project['activities']))
+        cpmnet = cpm.CriticalPathMethod(project)
+        result, = cpmnet.iterate_cpm()
+        self.assertEqual(result['critical_activities'], ['a', 'b', 'c', 'd'])
+        self.assertEqual(sorted(cpm.critical_paths(result)), [['a', 'c'], ['a', 'd'], ['b', 'c']])
+        self.assertEqual(sorted(cpmnet.get_critical_paths()), [['a', 'c'], ['a', 'd'], ['b', 'c']])
+        self.assertEqual(result['critical_path_count'], 3)
+        labels = [label for _, _, label in render.describe_network(cpmnet.graph, render.get_layout(cpmnet.graph))[
+            'edges']]
+        self.assertEqual(sorted(label for label in labels if label != ''), ['a: 4', 'b: 4', 'c: 1', 'd: 1'])
+
+    def test_dummy_activities_only_where_needed(self):
+        # Two activities in series, and two in parallel after them, need no dummy
+        project = {'info': {'indirect_cost': 1}, 'activities': [
+            {'id': 1, 'normal_duration': 2, 'normal_cost': 1, 'crash_duration': 1, 'crash_cost': 2},
+            {'id': 2, 'predecessors': [1], 'normal_duration': 2, 'normal_cost': 1, 'crash_duration': 1,
+             'crash_cost': 2},
+            {'id': 3, 'predecessors': [2], 'normal_duration': 2, 'normal_cost': 1, 'crash_duration': 1,
+             'crash_cost': 2},
+            {'id': 4, 'predecessors': [2], 'normal_duration': 3, 'normal_cost': 1, 'crash_duration': 1,
+             'crash_cost': 2}]}
+        converted, _ = aon.to_aoa(project)
+        self.assertEqual(len(converted['activities']), 5)
+        converted, _ = aon.to_aoa(dict(project, activities=project['activities'][:3]))
+        self.assertEqual(len(converted['activities']), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
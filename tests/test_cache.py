@@ -0,0 +1,155 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from cpm import cache
+from cpm import columnar
+from cpm import cpm
+from tests import test_cpm
+
+SAMPLE_FILE = os.path.join(test_cpm.SAMPLES_DIR, 'five-activities-project.json')
+
+
+class GetKeyTest(unittest.TestCase):
+
+    def test_same_project_same_key(self):
+        project = cpm.validate(SAMPLE_FILE)
+        reloaded = json.loads(json.dumps(project, indent=2))
+        self.assertEqual(cache.get_key(project, crashing='greedy'), cache.get_key(reloaded, crashing='greedy'))
+        columns = columnar.ProjectColumns.from_project(project)
+        self.assertEqual(cache.get_key(columns), cache.get_key(columnar.ProjectColumns.from_project(reloaded)))
+
+    def test_options_change_the_key(self):
+        project = cpm.validate(SAMPLE_FILE)
+        keys = set([cache.get_key(project), cache.get_key(project, crashing='greedy'),
+                    cache.get_key(project, crashing='mincut'), cache.get_key(project, crashing='mincut',
+                                                                               image_format='svg')])
+        self.assertEqual(len(keys), 4)
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.directory, 'cache')
+        self.images_dir = os.path.join(self.directory, 'images') + '/'
+        os.mkdir(self.images_dir)
+        cpmnet = cpm.CriticalPathMethod(cpm.validate(SAMPLE_FILE))
+        cpmnet.run_cpm()
+        self.results, _, self.optimum_solution = cpmnet.get_results()
+        self.images = ['network-{}.png'.format(iteration) for iteration in range(len(self.results))]
+        for image in self.images:
+            with open(self.images_dir + image, 'w') as image_file:
+                image_file.write(image)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def cached_value(self):
+        return self.results, self.images, self.optimum_solution
+
+    def test_memory_tier(self):
+        result_cache = cache.ResultCache()
+        self.assertIsNone(result_cache.get('key'))
+        result_cache.put('key', *self.cached_value())
+        self.assertEqual(result_cache.get('key'), self.cached_value())
+        stats = result_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['memory_entries'], stats['disk_entries']),
+                         (1, 1, 1, 0))
+
+    def test_memory_tier_is_bounded(self):
+        result_cache = cache.ResultCache()
+        result_cache.put('first', *self.cached_value())
+        result_cache.memory_bytes = result_cache.stats()['memory_bytes'] * 2
+        result_cache.put('second', *self.cached_value())
+        result_cache.get('first')
+        result_cache.put('third', *self.cached_value())
+        self.assertIsNone(result_cache.get('second'))
+        self.assertIsNotNone(result_cache.get('first'))
+        self.assertIsNotNone(result_cache.get('third'))
+
+    def test_disk_tier_outlives_the_cache(self):
+        result_cache = cache.ResultCache(self.cache_dir)
+        result_cache.put('key', self.results, self.images, self.optimum_solution, self.images_dir)
+        shutil.rmtree(self.images_dir)
+        os.mkdir(self.images_dir)
+
+        reopened = cache.ResultCache(self.cache_dir)
+        self.assertEqual(reopened.stats()['disk_entries'], 1)
+        self.assertEqual(reopened.get('key', self.images_dir), self.cached_value())
+        self.assertEqual(sorted(os.listdir(self.images_dir)), sorted(self.images))
+        with open(self.images_dir + self.images[1]) as image_file:
+            self.assertEqual(image_file.read(), self.images[1])
+
+    def test_images_of_another_project_are_replaced(self):
+        result_cache = cache.ResultCache(self.cache_dir)
+        result_cache.put('key', self.results, self.images, self.optimum_solution, self.images_dir)
+        other_dir = os.path.join(self.directory, 'other') + '/'
+        os.mkdir(other_dir)
+        with open(other_dir + self.images[0], 'w') as image_file:
+            image_file.write('another project')
+        self.assertIsNotNone(result_cache.get('key', other_dir))
+        with open(other_dir + self.images[0]) as image_file:
+            self.assertEqual(image_file.read(), self.images[0])
+
+    def test_images_are_linked_again(self):
+        result_cache = cache.ResultCache(self.cache_dir)
+        result_cache.put('key', self.results, self.images, self.optimum_solution, self.images_dir)
+        reopened = cache.ResultCache(self.cache_dir)
+        for _ in range(2):
+            self.assertIsNotNone(reopened.get('key', self.images_dir))
+        self.assertEqual(sorted(os.listdir(self.images_dir)), sorted(self.images))
+
+    def test_oversized_entry_without_images(self):
+        # The entry is too large for the memory tier, so it is read from disk
+        result_cache = cache.ResultCache(self.cache_dir, memory_bytes=1)
+        result_cache.put('key', self.results, self.images, self.optimum_solution, self.images_dir)
+        os.remove(os.path.join(self.cache_dir, 'key', self.images[0]))
+        self.assertIsNone(result_cache.get('key', self.images_dir))
+        self.assertEqual(result_cache.stats()['disk_entries'], 0)
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, 'key')))
+        self.assertIsNone(result_cache.get('key'))
+
+    def test_stale_disk_entry(self):
+        result_cache = cache.ResultCache(self.cache_dir, memory_bytes=1)
+        result_cache.put('key', self.results, self.images, self.optimum_solution, self.images_dir)
+        os.remove(os.path.join(self.cache_dir, 'key', cache.RESULTS_FILE))
+        self.assertIsNone(result_cache.get('key'))
+        self.assertEqual(result_cache.stats()['disk_entries'], 0)
+
+    def test_disk_tier_is_bounded(self):
+        result_cache = cache.ResultCache(self.cache_dir)
+        result_cache.put('first', self.results, self.images, self.optimum_solution, self.images_dir)
+        result_cache.disk_bytes = result_cache.disk_size * 2
+        result_cache.put('second', self.results, self.images, self.optimum_solution, self.images_dir)
+        result_cache.get('first')
+        result_cache.put('third', self.results, self.images, self.optimum_solution, self.images_dir)
+        self.assertEqual(sorted(os.listdir(self.cache_dir)), ['first', 'third'])
+        self.assertLessEqual(result_cache.disk_size, result_cache.disk_bytes)
+
+    def test_clear(self):
+        result_cache = cache.ResultCache(self.cache_dir)
+        result_cache.put('key', self.results, self.images, self.optimum_solution, self.images_dir)
+        result_cache.clear()
+        self.assertIsNone(result_cache.get('key'))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from cpm import cli
+from cpm import cpm
+from tests import test_cpm
+
+CLI = os.path.join(os.path.dirname(os.path.abspath(cli.__file__)), 'cli.py')
+SAMPLE_FILE = os.path.join(test_cpm.SAMPLES_DIR, 'five-activities-project.json')
+
+
+def run_cli(*args):
+    """Runs the command-line interface in a new process.
+
+    Returns:
+        A tuple of the exit status, the standard output and the standard error.
+    """
+    process = subprocess.Popen([sys.executable, CLI] + list(args), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    output, error = process.communicate()
+    return process.returncode, output, error
+
+
+class ProcessArgumentsTest(unittest.TestCase):
+
+    def test_run_is_the_default_command(self):
+        arguments = cli.process_arguments([SAMPLE_FILE, '--crashing', 'mincut'])
+        self.assertEqual(arguments.command, 'run')
+        self.assertEqual(arguments.project_file, SAMPLE_FILE)
+        self.assertEqual(arguments.crashing, 'mincut')
+        self.assertEqual(arguments.engine, 'networkx')
+        self.assertIs(arguments.main, cli.run_main)
+
+    def test_explicit_run_command(self):
+        arguments = cli.process_arguments(['run', SAMPLE_FILE, '--no-images'])
+        self.assertEqual(arguments.command, 'run')
+        self.assertTrue(arguments.no_images)
+
+    def test_batch_command(self):
+        arguments = cli.process_arguments(['batch', test_cpm.SAMPLES_DIR, '--processes', '2', '--format', 'csv'])
+        self.assertEqual(arguments.command, 'batch')
+        self.assertEqual(arguments.processes, 2)
+        self.assertEqual(arguments.project_files, sorted(glob.glob(os.path.join(test_cpm.SAMPLES_DIR, '*.json'))))
+        self.assertIs(arguments.main, cli.batch_main)
+
+    def test_missing_project_file(self):
+        with self.assertRaises(SystemExit):
+            cli.process_arguments([os.path.join(test_cpm.SAMPLES_DIR, 'missing.json')])
+
+    def test_simulate_needs_a_positive_number_of_samples(self):
+        self.assertEqual(cli.process_arguments([SAMPLE_FILE, '--simulate', '1']).simulate, 1)
+        for samples in ('0', '-5', 'many'):
+            with self.assertRaises(SystemExit):
+                cli.process_arguments([SAMPLE_FILE, '--simulate', samples])
+
+    def test_starts_need_a_positive_number(self):
+        self.assertEqual(cli.process_arguments([SAMPLE_FILE, '--resources', '--starts', '3']).starts, 3)
+        for starts in ('0', '-1'):
+            with self.assertRaises(SystemExit):
+                cli.process_arguments([SAMPLE_FILE, '--resources', '--starts', starts])
+
+
+class CommandsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_run(self):
+        status, output, _ = run_cli(SAMPLE_FILE, '--no-images', '--no-cache', '--stream')
+        self.assertEqual(status, 0)
+        cpmnet = cpm.CriticalPathMethod(cpm.validate(SAMPLE_FILE))
+        cpmnet.run_cpm()
+        results, _, optimum_solution = cpmnet.get_results()
+        lines = output.splitlines()
+        self.assertEqual(lines[0], ' | '.join(cli.RESULT_HEADERS))
+        self.assertEqual(len(lines), len(results) + 2)
+        self.assertIn('{} for total cost and {} for project duration'.format(*optimum_solution), lines[-1])
+
+    def test_batch(self):
+        shutil.copy(SAMPLE_FILE, self.directory)
+        with open(os.path.join(self.directory, 'invalid.json'), 'w') as invalid_file:
+            invalid_file.write('{"info": {}}')
+        status, output, error = run_cli('batch', self.directory, '--processes', '2')
+        self.assertEqual(status, 1)
+        self.assertIn('1 of 2 projects could not be solved', error)
+        summaries = dict((os.path.basename(summary['project_file']), summary)
+                         for summary in map(json.loads, output.splitlines()))
+        self.assertEqual(sorted(summaries), ['five-activities-project.json', 'invalid.json'])
+        self.assertIsNone(summaries['five-activities-project.json']['error'])
+        self.assertEqual(summaries['five-activities-project.json'],
+                         cli.solve_project_file((os.path.join(self.directory, 'five-activities-project.json'),
+                                                 'greedy', 'networkx')))
+        self.assertIn('not valid', summaries['invalid.json']['error'])
+
+    def test_batch_csv(self):
+        status, output, _ = run_cli('batch', test_cpm.SAMPLES_DIR, '--format', 'csv', '--crashing', 'mincut',
+                                    '--engine', 'compact')
+        self.assertEqual(status, 0)
+        rows = list(csv.DictReader(output.splitlines()))
+        self.assertEqual(len(rows), len(test_cpm.load_samples()))
+        self.assertEqual(set(rows[0]), set(cli.BATCH_FIELDS))
+
+    def test_convert(self):
+        columnar_file = os.path.join(self.directory, 'project.npz')
+        json_file = os.path.join(self.directory, 'project.json')
+        self.assertEqual(run_cli('convert', SAMPLE_FILE, columnar_file)[0], 0)
+        self.assertEqual(run_cli('convert', columnar_file, json_file)[0], 0)
+        self.assertEqual(cpm.validate(json_file), cpm.validate(SAMPLE_FILE))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from cpm import aon
+from cpm import columnar
+from cpm import cpm
+from cpm import generators
+from tests import test_cpm
+from tests import test_simulation
+
+
+def projects():
+    projects = test_cpm.load_samples()
+    for name, generator in sorted(generators.GENERATORS.items()):
+        projects.append((name, generator(100, seed=1)))
+    projects.append(('estimates', test_simulation.with_estimates(generators.layered(50, seed=2), 'triangular')))
+    projects.append(('resources', generators.add_resources(generators.series_parallel(50, seed=3), 3, seed=3)))
+    return projects
+
+
+class ProjectColumnsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        for name, project in projects():
+            if aon.is_aon_project(project):
+                # The activities on nodes are converted to activities on arrows
+                continue
+            columns = columnar.ProjectColumns.from_project(project)
+            self.assertEqual(columns.to_project(), project, name)
+            project_file = os.path.join(self.directory, name + cpm.COLUMNAR_EXTENSION)
+            columns.save(project_file)
+            loaded = cpm.validate(project_file)
+            self.assertEqual(loaded.to_project(), project, name)
+            self.assertEqual(loaded.digest(), columns.digest(), name)
+
+    def test_same_results_as_json(self):
+        for name, project in projects():
+            columns = columnar.ProjectColumns.from_project(project)
+            if aon.is_aon_project(project):
+                # The columns keep the activity-on-arrow form of the project
+                project, _ = aon.to_aoa(project)
+            for crashing in cpm.CRASHING_METHODS:
+                from_json = cpm.CriticalPathMethod(project)
+                from_json.run_cpm(crashing=crashing)
+                from_columns = cpm.CriticalPathMethod(columns)
+                from_columns.run_cpm(crashing=crashing)
+                self.assertEqual(from_columns.get_results(), from_json.get_results(), name)
+
+    def test_digest_depends_on_the_project(self):
+        project = generators.layered(30, seed=4)
+        digest = columnar.ProjectColumns.from_project(project).digest()
+        project['activities'][-1][2]['normal_cost'] += 1
+        self.assertNotEqual(columnar.ProjectColumns.from_project(project).digest(), digest)
+
+    def test_same_errors_as_json(self):
+        project = generators.layered(30, seed=5)
+        project['activities'][3][2]['crash_duration'] = project['activities'][3][2]['normal_duration'] + 1
+        project['activities'][7][0] = project['activities'][7][1]
+        project['activities'].append(list(project['activities'][10]))
+        project['activities'].append([project['activities'][-1][1], project['activities'][0][0],
+                                      dict(project['activities'][0][2])])
+        project_file = os.path.join(self.directory, 'invalid' + cpm.COLUMNAR_EXTENSION)
+        columnar.ProjectColumns.from_project(project).save(project_file)
+        json_file = os.path.join(self.directory, 'invalid.json')
+        with open(json_file, 'w') as output_file:
+            json.dump(project, output_file)
+        errors = []
+        for invalid_file in (project_file, json_file):
+            with self.assertRaises(cpm.ProjectValidationException) as context:
+                cpm.validate(invalid_file)
+            errors.append(context.exception.errors)
+        self.assertEqual(errors[0], errors[1])
+        self.assertEqual(len(errors[0]), 5)
+
+    def test_invalid_files(self):
+        not_npz = os.path.join(self.directory, 'project' + cpm.COLUMNAR_EXTENSION)
+        with open(not_npz, 'w') as output_file:
+            output_file.write('{}')
+        missing_columns = os.path.join(self.directory, 'missing' + cpm.COLUMNAR_EXTENSION)
+        numpy.savez(missing_columns, version=columnar.FORMAT_VERSION, indirect_cost=1, node1=[1])
+        unknown_version = os.path.join(self.directory, 'version' + cpm.COLUMNAR_EXTENSION)
+        columns = columnar.ProjectColumns.from_project(generators.fan(5, seed=1))
+        numpy.savez(unknown_version, version=columnar.FORMAT_VERSION + 1, indirect_cost=1,
+                    **dict((key, getattr(columns, key)) for key in columnar.COLUMNS))
+        for project_file in (not_npz, missing_columns, unknown_version):
+            with self.assertRaises(ValueError):
+                columnar.ProjectColumns.load(project_file)
+            with self.assertRaises(cpm.ProjectValidationException):
+                cpm.validate(project_file)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import numpy
+
+from cpm import aon
+from cpm import columnar
+from cpm import compact
+from cpm import cpm
+from cpm import generators
+from tests import test_cpm
+
+
+def projects():
+    projects = [(name, project) for name, project in test_cpm.load_samples() if not aon.is_aon_project(project)]
+    for name, generator in sorted(generators.GENERATORS.items()):
+        for seed in range(3):
+            projects.append(('{}-{}'.format(name, seed), generator(200, seed=seed)))
+    return projects
+
+
+class CompactNetworkTest(unittest.TestCase):
+
+    def assertSameSchedule(self, network, solution, cpmnet, name):
+        eet, let, total_float = solution
+        graph = cpmnet.graph
+        self.assertEqual(eet.tolist(), [graph.node[node]['eet'] for node in network.nodes.tolist()], name)
+        self.assertEqual(let.tolist(), [graph.node[node]['let'] for node in network.nodes.tolist()], name)
+        self.assertEqual(total_float.tolist(),
+                         [graph.edge[node1][node2]['total_float'] for node1, node2 in network.activities()], name)
+
+    def test_same_schedule_as_the_graph(self):
+        for name, project in projects():
+            network = compact.CompactNetwork.from_project(project)
+            cpmnet = cpm.CriticalPathMethod(project)
+            cpmnet._solve_network()
+            self.assertSameSchedule(network, network.solve(), cpmnet, name)
+            cpmnet._solve_network(kw_duration='crash_duration')
+            self.assertSameSchedule(network, network.solve(network.crash_duration), cpmnet, name)
+
+    def test_scenarios_are_solved_together(self):
+        random_state = numpy.random.RandomState(1)
+        for name, project in projects():
+            network = compact.CompactNetwork.from_project(project)
+            compression = network.normal_duration - network.crash_duration
+            durations = network.crash_duration + numpy.floor(random_state.rand(5, len(network)) * (compression + 1))
+            together = network.solve(durations)
+            for row, duration in enumerate(durations):
+                for array, single in zip(together, network.solve(duration)):
+                    self.assertEqual(array[row].tolist(), single.tolist(), name)
+
+    def test_from_columns(self):
+        for name, project in projects():
+            network = compact.CompactNetwork.from_project(project)
+            from_columns = compact.CompactNetwork.from_columns(columnar.ProjectColumns.from_project(project))
+            self.assertEqual(from_columns.activities(), network.activities(), name)
+            for array, expected in zip(from_columns.solve(), network.solve()):
+                self.assertEqual(array.tolist(), expected.tolist(), name)
+
+    def test_cost_slope_of_imaginary_activities(self):
+        network = compact.CompactNetwork([1, 1, 2], [2, 3, 3], [2, 0, 3], [100, 0, 60], [1, 0, 3], [150, 0, 60])
+        self.assertEqual(network.cost_slope[0], 50)
+        self.assertTrue(numpy.isnan(network.cost_slope[1:]).all())
+
+    def test_cycle(self):
+        with self.assertRaises(ValueError):
+            compact.topological_levels(3, numpy.array([0, 1, 2]), numpy.array([1, 2, 1]))
+
+
+
+class CompactEngineTest(unittest.TestCase):
+
+    def projects(self):
+        projects = test_cpm.load_samples()
+        for name, generator in sorted(generators.GENERATORS.items()):
+            projects.append((name, generator(80, seed=1)))
+        projects.append(('columns', columnar.ProjectColumns.from_project(generators.layered(80, seed=2))))
+        return projects
+
+    def test_same_results_as_the_networkx_engine(self):
+        for name, project in self.projects():
+            for crashing in cpm.CRASHING_METHODS:
+                solved = {}
+                for engine in cpm.ENGINES:
+                    cpmnet = cpm.CriticalPathMethod(project, engine=engine)
+                    cpmnet.run_cpm(crashing=crashing)
+                    solved[engine] = (cpmnet.get_results(), cpmnet.graph.nodes(data=True),
+                                      sorted(cpmnet.graph.edges(data=True)))
+                self.assertEqual(solved['compact'], solved['networkx'], (name, crashing))
+
+    def test_what_if(self):
+        project = generators.series_parallel(80, seed=3)
+        durations = dict(((node1, node2), 0) for node1, node2, _ in project['activities'][:10])
+        expected = cpm.CriticalPathMethod(project).what_if(durations)
+        self.assertEqual(cpm.CriticalPathMethod(project, engine='compact').what_if(durations), expected)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            cpm.CriticalPathMethod(generators.fan(10, seed=1), engine='unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,255 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import glob
+import json
+import os
+import random
+import subprocess
+import sys
+import unittest
+
+import networkx
+
+from cpm import aon
+from cpm import cpm
+from cpm import generators
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'samples')
+
+
+def load_samples():
+    """Returns a list of tuples with the name and the project of every sample project file."""
+    return [(os.path.basename(project_file), cpm.validate(project_file))
+            for project_file in sorted(glob.glob(os.path.join(SAMPLES_DIR, '*.json')))]
+
+
+def diamonds(count):
+    """Returns a project of diamonds in series, every one with two equally long branches.
+
+    The project has 2 ** count critical paths.
+    """
+    activities = []
+    for index in range(count):
+        node, middle, next_node = 2 * index, 2 * index + 1, 2 * index + 2
+        activities.append([node, next_node, {'normal_duration': 2, 'normal_cost': 100,
+                                             'crash_duration': 1, 'crash_cost': 150}])
+        activities.append([node, middle, {'normal_duration': 1, 'normal_cost': 100,
+                                          'crash_duration': 1, 'crash_cost': 100}])
+        activities.append([middle, next_node, {'normal_duration': 1, 'normal_cost': 100,
+                                               'crash_duration': 1, 'crash_cost': 100}])
+    return {'info': {'indirect_cost': 10}, 'activities': activities}
+
+
+def all_critical_paths(result):
+    """Enumerates the critical paths of a result with networkx, for comparison."""
+    if 'critical_arcs' in result:
+        identifiers = dict(((node1, node2), identifier) for node1, node2, identifier in result['critical_arcs'])
+        return sorted([identifiers[activity] for activity in path if identifiers[activity] is not None]
+                      for path in all_critical_paths({'critical_activities': list(identifiers)}))
+    graph = networkx.DiGraph(result['critical_activities'])
+    source = next(node for node in graph.nodes() if not graph.predecessors(node))
+    sink = next(node for node in graph.nodes() if not graph.successors(node))
+    return sorted(zip(path, path[1:]) for path in networkx.all_simple_paths(graph, source, sink))
+
+
+class CriticalPathsTest(unittest.TestCase):
+
+    def projects(self):
+        projects = load_samples()
+        for name, generator in sorted(generators.GENERATORS.items()):
+            for seed in range(3):
+                projects.append(('{}-{}'.format(name, seed), generator(60, seed=seed)))
+        return projects
+
+    def test_paths_of_every_iteration(self):
+        for name, project in self.projects():
+            cpmnet = cpm.CriticalPathMethod(project)
+            for result in cpmnet.iterate_cpm():
+                expected = all_critical_paths(result)
+                self.assertEqual(sorted(cpm.critical_paths(result)), expected, name)
+                self.assertEqual(result['critical_path_count'], len(expected), name)
+
+    def test_paths_of_the_current_network(self):
+        for name, project in self.projects():
+            cpmnet = cpm.CriticalPathMethod(project)
+            cpmnet.run_cpm()
+            result = cpmnet.get_results()[0][-1]
+            self.assertEqual(sorted(cpmnet.get_critical_paths()), all_critical_paths(result), name)
+            self.assertEqual(cpmnet.count_critical_paths(), result['critical_path_count'], name)
+
+    def test_critical_paths_are_counted_without_enumerating_them(self):
+        cpmnet = cpm.CriticalPathMethod(diamonds(40))
+        result = next(cpmnet.iterate_cpm())
+        self.assertEqual(result['critical_path_count'], 2 ** 40)
+        self.assertEqual(len(result['critical_activities']), 120)
+        first_path = next(cpm.critical_paths(result))
+        self.assertEqual(first_path[0][0], 0)
+        self.assertEqual(first_path[-1][1], 80)
+
+    def test_no_critical_activities(self):
+        self.assertEqual(list(cpm.critical_paths({'critical_activities': []})), [])
+
+
+def crashable_diamonds(count, seed=None):
+    """Returns a project of diamonds in series, whose branches can all be crashed.
+
+    The project has 2 ** count critical paths.
+    """
+    random_state = random.Random(seed)
+    activities = []
+    for index in range(count):
+        node, middle, next_node = 2 * index, 2 * index + 1, 2 * index + 2
+        for node1, node2, normal_duration in ((node, next_node, 4), (node, middle, 2), (middle, next_node, 2)):
+            activities.append([node1, node2, {
+                'normal_duration': normal_duration, 'normal_cost': 100, 'crash_duration': 1,
+                'crash_cost': 100 + random_state.randint(1, 9) * 10 * (normal_duration - 1)}])
+    return {'info': {'indirect_cost': 100}, 'activities': activities}
+
+
+class GreedyCrashingTest(unittest.TestCase):
+
+    def test_cheapest_activity_of_every_critical_path(self):
+        projects = [(name, project) for name, project in load_samples() if not aon.is_aon_project(project)]
+        for name, generator in sorted(generators.GENERATORS.items()):
+            for seed in range(3):
+                projects.append(('{}-{}'.format(name, seed), generator(25, seed=seed)))
+        projects.append(('diamonds', crashable_diamonds(6, seed=1)))
+        for name, project in projects:
+            cpmnet = cpm.CriticalPathMethod(project)
+            cheapest = []
+            for result in cpmnet.iterate_cpm():
+                # The first activity with the lowest cost slope of every critical path,
+                # among the activities that are not crashed yet
+                activities = set()
+                for path in cpm.critical_paths(result):
+                    crashable = [(node1, node2) for node1, node2 in path
+                                 if cpmnet.graph.edge[node1][node2]['normal_duration'] >
+                                 cpmnet.graph.edge[node1][node2]['crash_duration']]
+                    if crashable:
+                        activities.add(min(crashable, key=lambda activity: cpmnet.graph.edge[activity[0]][
+                            activity[1]]['cost_slope']))
+                cheapest.append(activities)
+            for iteration in range(1, len(cpmnet.history)):
+                changed = set((node1, node2) for node1, node2, _, _ in cpmnet.history.changes(iteration))
+                self.assertEqual(changed, cheapest[iteration - 1], (name, iteration))
+
+    def test_critical_paths_are_not_enumerated(self):
+        # The network has 2 ** 40 critical paths in every iteration
+        project = crashable_diamonds(40, seed=2)
+        durations = {}
+        for crashing in cpm.CRASHING_METHODS:
+            cpmnet = cpm.CriticalPathMethod(project)
+            cpmnet.run_cpm(crashing=crashing)
+            durations[crashing] = [result['project_duration'] for result in cpmnet.get_results()[0]]
+        self.assertEqual(durations['greedy'][-1], 2 * 40)
+        self.assertEqual(durations['greedy'], durations['mincut'])
+
+
+class IterateCpmTest(unittest.TestCase):
+
+    def projects(self):
+        projects = load_samples()
+        for name, generator in sorted(generators.GENERATORS.items()):
+            for seed in range(3):
+                projects.append(('{}-{}'.format(name, seed), generator(60, seed=seed)))
+        return projects
+
+    def test_same_results_as_run_cpm(self):
+        for name, project in self.projects():
+            cpmnet = cpm.CriticalPathMethod(project)
+            progress = []
+            cpmnet.run_cpm(progress=lambda index, result: progress.append((index, result)))
+            results = cpmnet.get_results()[0]
+            self.assertEqual(progress, list(enumerate(results)), name)
+            self.assertEqual(list(cpm.CriticalPathMethod(project).iterate_cpm()), results, name)
+
+    def test_closed_early(self):
+        cpmnet = cpm.CriticalPathMethod(generators.layered(100, seed=1))
+        iterations = cpmnet.iterate_cpm(crashing='mincut')
+        consumed = [next(iterations), next(iterations)]
+        iterations.close()
+        self.assertEqual(cpmnet.get_results()[0], consumed)
+
+    def test_stop_on_cost_increase(self):
+        for crashing in cpm.CRASHING_METHODS:
+            for name, project in self.projects():
+                full = cpm.CriticalPathMethod(project)
+                full.run_cpm(crashing=crashing)
+                results, _, optimum_solution = full.get_results()
+                stopped = cpm.CriticalPathMethod(project)
+                stopped.run_cpm(crashing=crashing, stop_on_cost_increase=True)
+                stopped_results, _, stopped_optimum = stopped.get_results()
+
+                self.assertEqual(stopped_results, results[:len(stopped_results)], name)
+                total_costs = [result['total_cost'] for result in stopped_results]
+                self.assertTrue(all(cost2 <= cost1 for cost1, cost2 in zip(total_costs[:-2], total_costs[1:-1])),
+                                name)
+                if len(stopped_results) < len(results):
+                    self.assertGreater(total_costs[-1], total_costs[-2], name)
+                if crashing == 'mincut':
+                    # The total cost is convex with the exact time-cost tradeoff
+                    self.assertEqual(stopped_optimum[0], optimum_solution[0], name)
+                else:
+                    self.assertGreaterEqual(stopped_optimum[0], optimum_solution[0], name)
+
+    def test_greedy_stop_may_miss_the_optimum(self):
+        project = generators.layered(10, seed=3)
+        optima = {}
+        for stop_on_cost_increase in (False, True):
+            for crashing in cpm.CRASHING_METHODS:
+                cpmnet = cpm.CriticalPathMethod(project)
+                cpmnet.run_cpm(crashing=crashing, stop_on_cost_increase=stop_on_cost_increase)
+                optima[(crashing, stop_on_cost_increase)] = cpmnet.get_results()[2][0]
+        self.assertGreater(optima[('greedy', True)], optima[('greedy', False)])
+        self.assertEqual(optima[('mincut', True)], optima[('mincut', False)])
+
+    def test_unknown_crashing_method(self):
+        cpmnet = cpm.CriticalPathMethod(load_samples()[0][1])
+        with self.assertRaises(ValueError):
+            cpmnet.iterate_cpm(crashing='unknown')
+
+
+class LazyImportsTest(unittest.TestCase):
+
+    def imported_modules(self, code):
+        """Runs some code in a new process and returns the modules that it imported."""
+        code = 'import sys\n' + code + '\nprint json.dumps(sorted(sys.modules))'
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=os.path.dirname(SAMPLES_DIR))
+        return set(json.loads(output.splitlines()[-1]))
+
+    def test_solving_without_images(self):
+        modules = self.imported_modules('\n'.join([
+            'import json',
+            'from cpm import cpm',
+            'project = json.load(open({!r}))'.format(os.path.join(SAMPLES_DIR, 'five-activities-project.json')),
+            'cpmnet = cpm.CriticalPathMethod(project)',
+            'cpmnet.run_cpm()',
+            'cpmnet.get_results()'
+        ]))
+        self.assertIn('networkx', modules)
+        self.assertNotIn('matplotlib', modules)
+        self.assertNotIn('jsonschema', modules)
+
+    def test_validating_without_images(self):
+        modules = self.imported_modules('\n'.join([
+            'import json',
+            'from cpm import cpm',
+            'cpm.validate({!r})'.format(os.path.join(SAMPLES_DIR, 'five-activities-project.json'))
+        ]))
+        self.assertNotIn('matplotlib', modules)
+
+
+if __name__ == '__main__':
+    unittest.main()
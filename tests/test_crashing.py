@@ -0,0 +1,152 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import random
+import unittest
+
+from cpm import cpm
+from cpm import crashing
+from cpm import generators
+from tests import test_cpm
+
+
+def random_network(random_state, nodes):
+    """Generates the arcs of a random network whose lower capacities can be satisfied.
+
+    The lower and upper capacities of every arc enclose the flow of a few random
+    paths from the first to the last node.
+    """
+    arcs = set((node, node + 1) for node in range(nodes - 1))
+    for _ in range(nodes):
+        node1, node2 = sorted(random_state.sample(range(nodes), 2))
+        arcs.add((node1, node2))
+    successors = {}
+    for node1, node2 in arcs:
+        successors.setdefault(node1, []).append(node2)
+    flow = dict((arc, 0) for arc in arcs)
+    for _ in range(3):
+        node = 0
+        while node != nodes - 1:
+            successor = random_state.choice(successors[node])
+            flow[(node, successor)] += 1
+            node = successor
+    network = []
+    for node1, node2 in sorted(arcs):
+        upper = flow[(node1, node2)] + random_state.randint(0, 4)
+        if random_state.random() < 0.2:
+            upper = crashing.INFINITY
+        lower = random_state.randint(0, flow[(node1, node2)])
+        network.append((node1, node2, upper, lower))
+    return network
+
+
+def cut_cost(arcs, forward, backward):
+    capacities = dict(((node1, node2), (upper, lower)) for node1, node2, upper, lower in arcs)
+    return sum(capacities[arc][0] for arc in forward) - sum(capacities[arc][1] for arc in backward)
+
+
+def brute_force_cut_cost(arcs, source, sink):
+    """Returns the cost of the cheapest cut of a network by trying every cut."""
+    nodes = set(node for node1, node2, _, _ in arcs for node in (node1, node2)) - set([source, sink])
+    cheapest = crashing.INFINITY
+    for size in range(len(nodes) + 1):
+        for subset in itertools.combinations(sorted(nodes), size):
+            side = set(subset) | set([source])
+            forward = [(node1, node2) for node1, node2, _, _ in arcs if node1 in side and node2 not in side]
+            backward = [(node1, node2) for node1, node2, _, _ in arcs if node1 not in side and node2 in side]
+            cheapest = min(cheapest, cut_cost(arcs, forward, backward))
+    return cheapest
+
+
+def interpolate(results, duration):
+    """Returns the direct cost of a piecewise linear time-cost curve at a duration."""
+    points = sorted((result['project_duration'], result['direct_cost']) for result in results)
+    for (duration1, cost1), (duration2, cost2) in zip(points, points[1:]):
+        if duration1 <= duration <= duration2:
+            return cost1 + float(cost2 - cost1) * (duration - duration1) / (duration2 - duration1)
+    raise ValueError('The duration is outside the curve: ' + str(duration))
+
+
+class MinimumCostCutTest(unittest.TestCase):
+
+    def test_cheapest_cut(self):
+        random_state = random.Random(1)
+        for _ in range(200):
+            arcs = random_network(random_state, random_state.randint(2, 8))
+            sink = arcs[-1][1]
+            cheapest = brute_force_cut_cost(arcs, 0, sink)
+            cut = crashing.minimum_cost_cut(arcs, 0, sink)
+            if cheapest == crashing.INFINITY:
+                self.assertIsNone(cut, arcs)
+            else:
+                self.assertEqual(cut_cost(arcs, *cut), cheapest, arcs)
+
+    def test_warm_start_finds_the_same_cut(self):
+        random_state = random.Random(2)
+        for _ in range(200):
+            arcs = random_network(random_state, random_state.randint(2, 8))
+            sink = arcs[-1][1]
+            flows = {}
+            crashing.minimum_cost_cut(arcs, 0, sink, flows)
+            # A similar network, as in the next step of the time-cost tradeoff
+            changed = [(node1, node2, upper if random_state.random() < 0.7 else crashing.INFINITY, lower)
+                       for node1, node2, upper, lower in arcs]
+            self.assertEqual(crashing.minimum_cost_cut(changed, 0, sink, flows),
+                             crashing.minimum_cost_cut(changed, 0, sink), arcs)
+
+    def test_unsatisfiable_lower_capacities(self):
+        arcs = [(0, 1, 1, 0), (1, 2, 5, 3)]
+        self.assertIsNone(crashing.minimum_cost_cut(arcs, 0, 2))
+
+
+class MinimumCostCrashingTest(unittest.TestCase):
+
+    def projects(self):
+        projects = test_cpm.load_samples()
+        for name, generator in sorted(generators.GENERATORS.items()):
+            for seed in range(5):
+                projects.append(('{}-{}'.format(name, seed), generator(40, seed=seed)))
+        return projects
+
+    def test_never_costlier_than_greedy(self):
+        for name, project in self.projects():
+            greedy = cpm.CriticalPathMethod(project)
+            greedy.run_cpm(crashing='greedy')
+            greedy_results = greedy.get_results()[0]
+            mincut = cpm.CriticalPathMethod(project)
+            mincut.run_cpm(crashing='mincut')
+            mincut_results, _, mincut_optimum = mincut.get_results()
+
+            self.assertEqual(mincut_results[0], greedy_results[0], name)
+            self.assertEqual(mincut_results[-1]['project_duration'], greedy_results[-1]['project_duration'], name)
+            for result in greedy_results:
+                self.assertLessEqual(interpolate(mincut_results, result['project_duration']),
+                                     result['direct_cost'] + 1e-6, name)
+            self.assertLessEqual(mincut_optimum, greedy.get_results()[2], name)
+
+    def test_breakpoints_are_convex(self):
+        for name, project in self.projects():
+            cpmnet = cpm.CriticalPathMethod(project)
+            cpmnet.run_cpm(crashing='mincut')
+            results = cpmnet.get_results()[0]
+            slopes = [float(result2['direct_cost'] - result1['direct_cost']) /
+                      (result1['project_duration'] - result2['project_duration'])
+                      for result1, result2 in zip(results, results[1:])]
+            for slope1, slope2 in zip(slopes, slopes[1:]):
+                self.assertLessEqual(slope1, slope2 + 1e-6, name)
+
+
+if __name__ == '__main__':
+    unittest.main()
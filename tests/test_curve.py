@@ -0,0 +1,99 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import StringIO
+import unittest
+
+from cpm import cpm
+from cpm import curve
+from cpm import generators
+
+
+def random_breakpoints(random_state, count):
+    """Returns breakpoints with repeated durations and costs that are not monotonic."""
+    breakpoints = []
+    for _ in range(count):
+        direct_cost = random_state.randint(0, 50) * 10
+        indirect_cost = random_state.randint(0, 50) * 10
+        breakpoints.append({
+            'project_duration': random_state.randint(1, 20),
+            'direct_cost': direct_cost,
+            'indirect_cost': indirect_cost,
+            'total_cost': direct_cost + indirect_cost
+        })
+    return breakpoints
+
+
+class CostCurveTest(unittest.TestCase):
+
+    def test_queries_match_a_linear_scan(self):
+        random_state = random.Random(1)
+        for count in (1, 2, 5, 30):
+            for _ in range(20):
+                breakpoints = random_breakpoints(random_state, count)
+                cost_curve = curve.CostCurve.from_results(breakpoints)
+                for cost in curve.COSTS:
+                    for duration in range(0, 22):
+                        found = cost_curve.cost_for_duration(duration, cost)
+                        within = [point for point in breakpoints if point['project_duration'] <= duration]
+                        if not within:
+                            self.assertIsNone(found)
+                            continue
+                        self.assertIn(found, breakpoints)
+                        self.assertLessEqual(found['project_duration'], duration)
+                        self.assertEqual(found[cost], min(point[cost] for point in within))
+                    for budget in range(-10, 1010, 10):
+                        found = cost_curve.duration_for_budget(budget, cost)
+                        within = [point for point in breakpoints if point[cost] <= budget]
+                        if not within:
+                            self.assertIsNone(found)
+                            continue
+                        self.assertIn(found, breakpoints)
+                        self.assertLessEqual(found[cost], budget)
+                        self.assertEqual(found['project_duration'],
+                                         min(point['project_duration'] for point in within))
+
+    def test_results_of_the_cpm_algorithm(self):
+        cpmnet = cpm.CriticalPathMethod(generators.layered(30, seed=1))
+        cpmnet.run_cpm()
+        results = cpmnet.get_results()[0]
+        cost_curve = cpmnet.cost_curve()
+        self.assertEqual(len(cost_curve), len(results))
+        breakpoints = cost_curve.to_dict()['breakpoints']
+        self.assertEqual(sorted(breakpoints), sorted(dict((field, result[field]) for field in curve.FIELDS)
+                                                     for result in results))
+        optimum = cost_curve.cost_for_duration(results[0]['project_duration'])
+        self.assertEqual(optimum['total_cost'], min(result['total_cost'] for result in results))
+
+    def test_save_and_load(self):
+        cost_curve = curve.CostCurve.from_results(random_breakpoints(random.Random(2), 10))
+        curve_file = StringIO.StringIO()
+        cost_curve.save(curve_file)
+        curve_file.seek(0)
+        loaded = curve.CostCurve.load(curve_file)
+        self.assertEqual(loaded.to_dict(), cost_curve.to_dict())
+        for field in curve.FIELDS:
+            self.assertEqual(getattr(loaded, field).tolist(), getattr(cost_curve, field).tolist())
+
+    def test_unknown_cost(self):
+        cost_curve = curve.CostCurve.from_results(random_breakpoints(random.Random(3), 3))
+        with self.assertRaises(ValueError):
+            cost_curve.cost_for_duration(10, 'indirect_cost')
+        with self.assertRaises(ValueError):
+            cost_curve.duration_for_budget(100, 'indirect_cost')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import StringIO
+import unittest
+
+from cpm import cpm
+from cpm import generators
+
+SIZES = (0, 1, 2, 3, 10, 57, 500)
+
+
+class GeneratorsTest(unittest.TestCase):
+
+    def test_number_of_activities(self):
+        for name, generator in sorted(generators.GENERATORS.items()):
+            for activities in SIZES:
+                self.assertEqual(len(generator(activities, seed=1)['activities']), activities, name)
+
+    def test_valid_projects(self):
+        for name, generator in sorted(generators.GENERATORS.items()):
+            for activities in SIZES[1:]:
+                for seed in range(3):
+                    project = generator(activities, seed=seed)
+                    self.assertEqual(cpm.validate(StringIO.StringIO(json.dumps(project))), project, name)
+
+    def test_nodes_in_topological_order(self):
+        for name, generator in sorted(generators.GENERATORS.items()):
+            project = generator(200, seed=2)
+            nodes = set(node for node1, node2, _ in project['activities'] for node in (node1, node2))
+            self.assertEqual(nodes, set(range(1, len(nodes) + 1)), name)
+            for node1, node2, _ in project['activities']:
+                self.assertLess(node1, node2, name)
+
+    def test_integer_cost_slopes(self):
+        for name, generator in sorted(generators.GENERATORS.items()):
+            for _, _, activity in generator(200, seed=3)['activities']:
+                compression = activity['normal_duration'] - activity['crash_duration']
+                self.assertEqual((activity['crash_cost'] - activity['normal_cost']) % max(compression, 1), 0, name)
+                self.assertGreater(activity['crash_duration'], 0, name)
+
+    def test_same_seed_same_project(self):
+        for name, generator in sorted(generators.GENERATORS.items()):
+            self.assertEqual(generator(100, seed=4), generator(100, seed=4), name)
+            self.assertNotEqual(generator(100, seed=4), generator(100, seed=5), name)
+
+    def test_resources_within_capacities(self):
+        project = generators.add_resources(generators.layered(100, seed=6), 4, seed=6)
+        capacities = project['info']['resources']
+        self.assertEqual(len(capacities), 4)
+        for _, _, activity in project['activities']:
+            self.assertTrue(1 <= len(activity['resources']) <= 3)
+            for name, demand in activity['resources'].items():
+                self.assertLessEqual(demand, capacities[name])
+        self.assertEqual(cpm.validate(StringIO.StringIO(json.dumps(project))), project)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import shutil
+import tempfile
+import unittest
+
+from cpm import cpm
+from cpm import generators
+from cpm import history
+from tests import test_cpm
+
+
+class IterationHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_disk_history_equals_memory_history(self):
+        projects = test_cpm.load_samples() + [('layered', generators.layered(100, seed=1)),
+                                              ('series_parallel', generators.series_parallel(100, seed=1))]
+        for crashing in cpm.CRASHING_METHODS:
+            for name, project in projects:
+                in_memory = cpm.CriticalPathMethod(project)
+                in_memory.run_cpm(crashing=crashing)
+                on_disk = cpm.CriticalPathMethod(project, history_dir=self.directory)
+                on_disk.run_cpm(crashing=crashing)
+                self.assertEqual(len(on_disk.history), len(in_memory.history), name)
+                self.assertEqual(on_disk.history.nbytes, in_memory.history.nbytes, name)
+                self.assertEqual(list(on_disk.history.results()), list(in_memory.history.results()), name)
+                for iteration in range(len(in_memory.history)):
+                    self.assertEqual(on_disk.history.changes(iteration), in_memory.history.changes(iteration), name)
+                    self.assertEqual(on_disk.history.state(iteration), in_memory.history.state(iteration), name)
+                self.assertEqual(on_disk.get_results(), in_memory.get_results(), name)
+                on_disk.history.close()
+
+    def test_last_state_is_the_solved_network(self):
+        for name, project in test_cpm.load_samples():
+            cpmnet = cpm.CriticalPathMethod(project)
+            cpmnet.run_cpm()
+            state = dict(((node1, node2), (activity['normal_duration'], activity['normal_cost']))
+                         for node1, node2, activity in cpmnet.graph.edges(data=True))
+            self.assertEqual(cpmnet.history.state(len(cpmnet.history) - 1), state, name)
+
+    def test_reads_between_records(self):
+        for directory in (None, self.directory):
+            iterations = history.IterationHistory(directory)
+            self.assertEqual(len(iterations), 0)
+            self.assertEqual(list(iterations.results()), [])
+            iterations.record({'project_duration': 10}, {(1, 2): (4, 100), (2, 3): (6, 200.5)})
+            self.assertEqual(sorted(iterations.changes(0)), [(1, 2, 4, 100), (2, 3, 6, 200.5)])
+            iterations.record({'project_duration': 9}, {(2, 3): (5, 250.5)})
+            self.assertEqual(iterations.changes(1), [(2, 3, 5, 250.5)])
+            self.assertEqual(iterations.state(1), {(1, 2): (4, 100), (2, 3): (5, 250.5)})
+            self.assertEqual(iterations.result(0), {'project_duration': 10})
+            iterations.record({'project_duration': 9}, {})
+            self.assertEqual(iterations.changes(2), [])
+            self.assertEqual(list(iterations.results()),
+                             [{'project_duration': 10}, {'project_duration': 9}, {'project_duration': 9}])
+            self.assertEqual(iterations.nbytes, 3 * history.CHANGE_DTYPE.itemsize)
+            iterations.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import unittest
+
+from cpm import cpm
+from cpm import generators
+from cpm import incremental
+from tests import test_cpm
+
+
+def projects():
+    projects = test_cpm.load_samples()
+    for name, generator in sorted(generators.GENERATORS.items()):
+        for seed in range(3):
+            projects.append(('{}-{}'.format(name, seed), generator(150, seed=seed)))
+    return projects
+
+
+class IncrementalScheduleTest(unittest.TestCase):
+
+    def assertSameSchedule(self, schedule, cpmnet, name):
+        # The full solution of the network is the reference
+        cpmnet._solve_network()
+        graph = cpmnet.graph
+        self.assertEqual(schedule.duration, graph.node[cpmnet.sink]['let'], name)
+        for node in graph.nodes():
+            self.assertEqual(schedule.earliest_event_time(node), graph.node[node]['eet'], name)
+            self.assertEqual(schedule.latest_event_time(node), graph.node[node]['let'], name)
+        for node1, node2, activity in graph.edges(data=True):
+            self.assertEqual(schedule.total_float((node1, node2)), activity['total_float'], name)
+        self.assertEqual(schedule.critical_activities(),
+                         [(node1, node2) for node1, node2, activity in graph.edges(data=True)
+                          if activity['total_float'] == 0], name)
+
+    def test_updates_equal_full_solutions(self):
+        random_state = random.Random(1)
+        for name, project in projects():
+            cpmnet = cpm.CriticalPathMethod(project)
+            schedule = incremental.IncrementalSchedule(cpmnet.graph, cpmnet.topological_order, cpmnet.sink)
+            self.assertSameSchedule(schedule, cpmnet, name)
+            activities = cpmnet.graph.edges()
+            for _ in range(20):
+                changed = random_state.sample(activities, random_state.randint(1, min(5, len(activities))))
+                previous = dict((node, schedule.earliest_event_time(node)) for node in cpmnet.graph.nodes())
+                for node1, node2 in changed:
+                    cpmnet.graph.edge[node1][node2]['normal_duration'] = random_state.randint(0, 40)
+                changed_nodes = schedule.update(changed)
+                self.assertSameSchedule(schedule, cpmnet, name)
+                for node, eet in previous.items():
+                    if schedule.earliest_event_time(node) != eet:
+                        self.assertIn(node, changed_nodes, name)
+
+    def test_crashing_equals_full_solutions(self):
+        for name, project in projects():
+            cpmnet = cpm.CriticalPathMethod(project)
+            for result in cpmnet.iterate_cpm(crashing='mincut'):
+                self.assertSameSchedule(cpmnet.schedule, cpmnet, name)
+                # The rows of a project in the activity-on-node form keep the arcs apart
+                critical_activities = [(node1, node2) for node1, node2, _ in result.get('critical_arcs', ())]
+                self.assertEqual(critical_activities or result['critical_activities'],
+                                 cpmnet.schedule.critical_activities(), name)
+
+    def test_what_if_leaves_the_network_unchanged(self):
+        for name, project in projects():
+            cpmnet = cpm.CriticalPathMethod(project)
+            node1, node2 = cpmnet.graph.edges()[0]
+            normal_duration = cpmnet.graph.edge[node1][node2]['normal_duration']
+            changed = cpmnet.what_if({(node1, node2): normal_duration + 10})
+            self.assertEqual(cpmnet.graph.edge[node1][node2]['normal_duration'], normal_duration, name)
+            self.assertSameSchedule(cpmnet.schedule, cpmnet, name)
+
+            cpmnet.graph.edge[node1][node2]['normal_duration'] = normal_duration + 10
+            cpmnet._solve_network()
+            self.assertEqual(changed['project_duration'], cpmnet.graph.node[cpmnet.sink]['let'], name)
+            self.assertEqual(changed['critical_activities'],
+                             [(tail, head) for tail, head, activity in cpmnet.graph.edges(data=True)
+                              if activity['total_float'] == 0], name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import matplotlib
+matplotlib.use('Agg')
+
+from cpm import cache  # noqa: E402
+from cpm import cpm  # noqa: E402
+from cpm import jobs  # noqa: E402
+from tests import test_cpm  # noqa: E402
+
+
+class JobQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.project = cpm.validate(os.path.join(test_cpm.SAMPLES_DIR, 'five-activities-project.json'))
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_job_results(self):
+        job_queue = jobs.JobQueue(self.output_dir)
+        job = job_queue.submit(self.project, crashing='mincut')
+        self.assertIs(job_queue.get(job.id), job)
+        rows = list(job.events())
+        self.assertEqual(job.status, 'done')
+
+        cpmnet = cpm.CriticalPathMethod(self.project)
+        cpmnet.run_cpm(crashing='mincut')
+        results, images, optimum_solution = cpmnet.get_results()
+        self.assertEqual(rows, results)
+        self.assertEqual((job.results, job.optimum_solution), (results, optimum_solution))
+        self.assertEqual(sorted(os.listdir(job.output_dir)), sorted(job.images + [jobs.CURVE_FILE]))
+        self.assertEqual(job.progress(), {'id': job.id, 'status': 'done', 'iteration': len(results) - 1,
+                                          'project_duration': results[-1]['project_duration'], 'error': None})
+        self.assertEqual(job.curve.to_dict(), cpmnet.cost_curve().to_dict())
+
+    def test_concurrent_jobs(self):
+        job_queue = jobs.JobQueue(self.output_dir, workers=4)
+        projects = [project for _, project in test_cpm.load_samples()] * 3
+        submitted = [job_queue.submit(project) for project in projects]
+        for job in submitted:
+            list(job.events())
+        for project, job in zip(projects, submitted):
+            self.assertEqual((job.status, job.error), ('done', None))
+            cpmnet = cpm.CriticalPathMethod(project)
+            cpmnet.run_cpm()
+            results, _, optimum_solution = cpmnet.get_results()
+            self.assertEqual((job.results, job.optimum_solution), (results, optimum_solution))
+            self.assertEqual(len(job.images), len(results))
+            self.assertEqual(sorted(os.listdir(job.output_dir)), sorted(job.images + [jobs.CURVE_FILE]))
+
+    def test_failed_job(self):
+        job_queue = jobs.JobQueue(self.output_dir)
+        job = job_queue.submit(self.project, crashing='unknown')
+        self.assertEqual(list(job.events()), [])
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.error, 'ValueError: Unknown crashing method: unknown')
+
+    def test_full_queue(self):
+        job_queue = jobs.JobQueue(self.output_dir, workers=0, max_pending=1)
+        job = job_queue.submit(self.project)
+        with self.assertRaises(jobs.JobQueueFull):
+            job_queue.submit(self.project)
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job_queue.metrics()['jobs']['queued'], 1)
+
+    def test_rejected_job_leaves_no_directory(self):
+        result_cache = cache.ResultCache()
+        job_queue = jobs.JobQueue(self.output_dir, workers=0, max_pending=1, result_cache=result_cache)
+        job = job_queue.submit(self.project)
+        with self.assertRaises(jobs.JobQueueFull):
+            job_queue.submit(self.project, crashing='mincut')
+        self.assertEqual(os.listdir(self.output_dir), [job.id])
+
+    def test_cached_job(self):
+        result_cache = cache.ResultCache(os.path.join(self.output_dir, 'cache'))
+        job_queue = jobs.JobQueue(os.path.join(self.output_dir, 'jobs'), result_cache=result_cache)
+        solved = job_queue.submit(self.project)
+        list(solved.events())
+        cached = job_queue.submit(self.project)
+        self.assertEqual(cached.status, 'done')
+        self.assertEqual(list(cached.events()), solved.results)
+        self.assertEqual((cached.results, cached.images, cached.optimum_solution),
+                         (solved.results, solved.images, solved.optimum_solution))
+        self.assertEqual(sorted(os.listdir(cached.output_dir)), sorted(solved.images + [jobs.CURVE_FILE]))
+        self.assertEqual(job_queue.metrics()['cached'], 1)
+
+    def test_old_jobs_are_removed(self):
+        job_queue = jobs.JobQueue(self.output_dir, workers=1, max_jobs=1)
+        finished = []
+        for _ in range(3):
+            job = job_queue.submit(self.project, stop_on_cost_increase=True)
+            list(job.events())
+            finished.append(job)
+        # The worker removes the old jobs right after it finishes a job
+        job_queue._JobQueue__pending.join()
+        self.assertEqual([job_queue.get(job.id) for job in finished], [None, None, finished[-1]])
+        self.assertEqual(os.listdir(self.output_dir), [finished[-1].id])
+        metrics = job_queue.metrics()
+        self.assertEqual(metrics['solved'], 3)
+        self.assertEqual(metrics['jobs']['done'], 1)
+        self.assertEqual(metrics['iterations'], 3 * len(finished[-1].results))
+
+
+if __name__ == '__main__':
+    unittest.main()
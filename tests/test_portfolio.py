@@ -0,0 +1,121 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from cpm import generators
+from cpm import portfolio
+
+
+def brute_force(curves, budget):
+    """Returns the lowest total cost of any combination of points within the budget."""
+    best = None
+    for points in itertools.product(*curves):
+        crash_cost = sum(direct_cost - curve[0][1] for (_, direct_cost, _), curve in zip(points, curves))
+        total_cost = sum(point_total_cost for _, _, point_total_cost in points)
+        if (budget is None or crash_cost <= budget) and (best is None or total_cost < best):
+            best = total_cost
+    return best
+
+
+class PortfolioTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.project_files = []
+        for seed, (name, generator) in enumerate(sorted(generators.GENERATORS.items())):
+            project_file = os.path.join(self.temp_dir, name + '.json')
+            with open(project_file, 'w') as output_file:
+                json.dump(generator(12, seed=seed), output_file)
+            self.project_files.append(project_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_interpolate_curve(self):
+        curve = [(10, 100, 300), (7, 130, 300), (6, 150, 310), (4, 165, 335)]
+        self.assertEqual(portfolio.interpolate_curve(curve), [
+            (10, 100, 300), (9, 110, 300), (8, 120, 300), (7, 130, 300), (6, 150, 310),
+            (5, 157.5, 322.5), (4, 165, 335)])
+        self.assertEqual(portfolio.interpolate_curve(curve[:1]), curve[:1])
+
+    def test_optimum_matches_brute_force(self):
+        for crashing in ('greedy', 'mincut'):
+            projects = portfolio.Portfolio(self.project_files, crashing=crashing)
+            projects.solve()
+            curves = [portfolio.interpolate_curve(projects.curves[project_file])
+                      for project_file in self.project_files]
+            largest_budget = sum(curve[-1][1] - curve[0][1] for curve in curves)
+            budgets = [None, 0] + [largest_budget * step // 10 for step in range(1, 11)]
+            # Budgets halfway between the first two breakpoints of every project
+            budgets.extend((breakpoints[1][1] - breakpoints[0][1]) / 2.0
+                           for breakpoints in projects.curves.values() if len(breakpoints) > 1)
+            for budget in budgets:
+                optimum = projects.optimize(budget)
+                self.assertAlmostEqual(optimum['total_cost'], brute_force(curves, budget), msg=(crashing, budget))
+                if budget is not None:
+                    self.assertLessEqual(optimum['crash_cost'], budget)
+                for project_file, project in optimum['projects'].items():
+                    point = (project['project_duration'], project['direct_cost'], project['total_cost'])
+                    self.assertIn(point, curves[self.project_files.index(project_file)])
+
+    def test_durations_between_breakpoints(self):
+        durations = []
+        for project_file in self.project_files:
+            project = portfolio.Portfolio([project_file], crashing='mincut')
+            project.solve()
+            breakpoints = project.curves[project_file]
+            (duration1, direct_cost1, _), (duration2, direct_cost2, _) = breakpoints[:2]
+            if duration1 - duration2 < 2:
+                continue
+            # One time unit off the normal duration costs a share of the first breakpoint
+            budget = (direct_cost2 - direct_cost1) / float(duration1 - duration2)
+            durations.append(project.optimize(budget)['projects'][project_file]['project_duration'])
+            self.assertNotIn(durations[-1], [duration for duration, _, _ in breakpoints])
+        self.assertTrue(durations)
+
+    def test_processes_and_cache(self):
+        expected = portfolio.Portfolio(self.project_files)
+        expected.solve()
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        for _ in range(2):
+            projects = portfolio.Portfolio(self.project_files, engine='compact', cache_dir=cache_dir)
+            projects.solve(processes=3)
+            self.assertEqual(projects.curves, expected.curves)
+            self.assertEqual(projects.optimize(1000), expected.optimize(1000))
+
+    def test_invalid_projects(self):
+        invalid_file = os.path.join(self.temp_dir, 'invalid.json')
+        with open(invalid_file, 'w') as output_file:
+            output_file.write('{"info": {}}')
+        projects = portfolio.Portfolio(self.project_files + [invalid_file])
+        projects.solve()
+        self.assertEqual(sorted(projects.curves), sorted(self.project_files))
+        self.assertEqual(list(projects.errors), [invalid_file])
+        self.assertEqual(sorted(projects.optimize()['projects']), sorted(self.project_files))
+        with self.assertRaises(ValueError):
+            projects.optimize(-1)
+        with self.assertRaises(ValueError):
+            portfolio.Portfolio(self.project_files, crashing='unknown')
+        with self.assertRaises(ValueError):
+            portfolio.Portfolio(self.project_files, engine='unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import StringIO
+import unittest
+
+from cpm import cpm
+from cpm import generators
+from cpm import profiling
+from tests import test_cpm
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def test_iterations_match_the_results(self):
+        projects = test_cpm.load_samples() + [('layered', generators.layered(200, seed=1))]
+        for crashing in cpm.CRASHING_METHODS:
+            for name, project in projects:
+                reported = []
+                profiler = profiling.Profiler(callbacks=[reported.append])
+                cpmnet = cpm.CriticalPathMethod(project, profiler=profiler)
+                cpmnet.run_cpm(crashing=crashing)
+                results = cpmnet.get_results()[0]
+
+                unprofiled = cpm.CriticalPathMethod(project)
+                unprofiled.run_cpm(crashing=crashing)
+                self.assertEqual(unprofiled.get_results()[0], results, name)
+
+                self.assertEqual(reported, profiler.iterations, name)
+                self.assertEqual([iteration['index'] for iteration in profiler.iterations], range(len(results)), name)
+                for iteration, result in zip(profiler.iterations, results):
+                    counters = iteration['counters']
+                    self.assertEqual(counters['project_duration'], result['project_duration'], name)
+                    self.assertEqual(counters['critical_paths'], result['critical_path_count'], name)
+                    self.assertEqual(counters['critical_activities'], len(result['critical_activities']), name)
+                    self.assertIn('critical_paths', iteration['seconds'], name)
+                for phase in ('build', 'cost_slope', 'solve', 'critical_paths', 'record', 'results'):
+                    self.assertIn(phase, profiler.phases, name)
+                self.assertEqual(profiler.phases['record']['calls'], len(results), name)
+
+    def test_stopped_iterations(self):
+        profiler = profiling.Profiler()
+        cpmnet = cpm.CriticalPathMethod(generators.series_parallel(100, seed=2), profiler=profiler)
+        iterations = cpmnet.iterate_cpm()
+        next(iterations)
+        next(iterations)
+        iterations.close()
+        self.assertEqual(len(profiler.iterations), 2)
+        self.assertEqual(len(cpmnet.get_results()[0]), 2)
+
+    def test_dump(self):
+        profiler = profiling.Profiler()
+        cpmnet = cpm.CriticalPathMethod(test_cpm.load_samples()[0][1], profiler=profiler)
+        cpmnet.run_cpm()
+        profile_file = StringIO.StringIO()
+        profiler.dump(profile_file)
+        self.assertEqual(json.loads(profile_file.getvalue()), json.loads(json.dumps(profiler.to_dict())))
+
+    def test_add_phases(self):
+        totals = {}
+        profiling.add_phases(totals, {'solve': {'seconds': 1.5, 'calls': 2}})
+        profiling.add_phases(totals, {'solve': {'seconds': 0.5, 'calls': 1}, 'reduce': {'seconds': 1.0, 'calls': 1}})
+        self.assertEqual(totals, {'solve': {'seconds': 2.0, 'calls': 3}, 'reduce': {'seconds': 1.0, 'calls': 1}})
+
+    def test_null_profiler(self):
+        with profiling.NULL_PROFILER.phase('solve'):
+            profiling.NULL_PROFILER.count(nodes_visited=1)
+        profiling.NULL_PROFILER.end_iteration()
+
+
+if __name__ == '__main__':
+    unittest.main()
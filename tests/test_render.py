@@ -0,0 +1,96 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import matplotlib
+matplotlib.use('Agg')
+
+from cpm import cpm  # noqa: E402
+from cpm import render  # noqa: E402
+from tests import test_cpm  # noqa: E402
+
+
+def describe(durations):
+    """Describes a network of two activities in series with the given durations."""
+    return {
+        'nodes': [(1, (0.0, 0.0), '1'), (2, (0.5, 0.5), '2'), (3, (1.0, 1.0), '3')],
+        'edges': [(1, 2, durations[0]), (2, 3, durations[1])]
+    }
+
+
+class NetworkRendererTest(unittest.TestCase):
+
+    def setUp(self):
+        self.images_dir = tempfile.mkdtemp() + '/'
+
+    def tearDown(self):
+        shutil.rmtree(self.images_dir)
+
+    def test_images_are_named_after_their_iteration(self):
+        renderer = render.NetworkRenderer(self.images_dir)
+        images = renderer.render([describe((3, 2)), describe((2, 2)), describe((3, 2)), describe((2, 2))])
+        self.assertEqual(images, ['network-0.png', 'network-1.png', 'network-2.png', 'network-3.png'])
+        self.assertEqual(sorted(os.listdir(self.images_dir)), images)
+
+    def test_the_same_network_is_drawn_once(self):
+        renderer = render.NetworkRenderer(self.images_dir, image_format='svg')
+        images = renderer.render([describe((3, 2)), describe((2, 2)), describe((3, 2))])
+        inodes = [os.stat(self.images_dir + image).st_ino for image in images]
+        self.assertEqual(inodes[0], inodes[2])
+        self.assertNotEqual(inodes[0], inodes[1])
+
+    def test_images_of_a_previous_run_are_replaced(self):
+        renderer = render.NetworkRenderer(self.images_dir)
+        renderer.render([describe((3, 2)), describe((3, 2))])
+        images = renderer.render([describe((2, 2)), describe((2, 2))])
+        self.assertEqual(sorted(os.listdir(self.images_dir)), images)
+        with open(self.images_dir + images[0], 'rb') as image, open(self.images_dir + images[1], 'rb') as link:
+            self.assertEqual(image.read(), link.read())
+
+    def test_parallel_drawing(self):
+        descriptions = [describe((duration, 2)) for duration in range(4)]
+        sequential = render.NetworkRenderer(self.images_dir, image_format='svg').render(descriptions)
+        parallel_dir = tempfile.mkdtemp() + '/'
+        try:
+            parallel = render.NetworkRenderer(parallel_dir, image_format='svg', processes=2).render(descriptions)
+            self.assertEqual(parallel, sequential)
+            self.assertEqual(sorted(os.listdir(parallel_dir)), sorted(sequential))
+        finally:
+            shutil.rmtree(parallel_dir)
+
+    def test_unknown_image_format(self):
+        with self.assertRaises(ValueError):
+            render.NetworkRenderer(self.images_dir, image_format='gif')
+
+    def test_images_of_a_project(self):
+        for name, project in test_cpm.load_samples():
+            cpmnet = cpm.CriticalPathMethod(project)
+            cpmnet.run_cpm()
+            results, images, _ = cpmnet.get_results(self.images_dir, image_format='svg')
+            self.assertEqual(images, ['network-{}.svg'.format(iteration) for iteration in range(len(results))],
+                             name)
+            for image in images:
+                self.assertTrue(os.path.isfile(self.images_dir + image), name)
+
+    def test_layout_is_reused(self):
+        cpmnet = cpm.CriticalPathMethod(test_cpm.load_samples()[0][1])
+        self.assertIs(render.get_layout(cpmnet.graph), render.get_layout(cpmnet.graph.copy()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import numpy
+
+from cpm import cpm
+from cpm import generators
+from cpm import resources
+
+
+def projects():
+    projects = []
+    for name, generator in sorted(generators.GENERATORS.items()):
+        for seed in range(3):
+            projects.append(('{}-{}'.format(name, seed),
+                             generators.add_resources(generator(80, seed=seed), 3, seed=seed)))
+    return projects
+
+
+class ResourceSchedulerTest(unittest.TestCase):
+
+    def assertFeasible(self, project, schedule, name):
+        starts, finishes = schedule['starts'], schedule['finishes']
+        capacities = project['info']['resources']
+        usage = dict((resource, numpy.zeros(schedule['project_duration'], dtype=numpy.int64))
+                     for resource in capacities)
+        finished = {}
+        for node1, node2, activity in project['activities']:
+            self.assertEqual(finishes[(node1, node2)] - starts[(node1, node2)], activity['normal_duration'], name)
+            finished[node2] = max(finished.get(node2, 0), finishes[(node1, node2)])
+            for resource, demand in activity.get('resources', {}).items():
+                usage[resource][starts[(node1, node2)]:finishes[(node1, node2)]] += demand
+        for node1, node2, _ in project['activities']:
+            self.assertGreaterEqual(starts[(node1, node2)], finished.get(node1, 0), name)
+        self.assertEqual(schedule['project_duration'], max(finishes.values()), name)
+        for resource, capacity in capacities.items():
+            self.assertEqual(schedule['usage'][resource].tolist(), usage[resource].tolist(), name)
+            self.assertLessEqual(usage[resource].max(), capacity, name)
+
+    def test_feasible_schedules(self):
+        for name, project in projects():
+            for rule in resources.PRIORITY_RULES:
+                schedule = resources.schedule(project, rule=rule)
+                self.assertFeasible(project, schedule, name)
+                self.assertGreaterEqual(schedule['project_duration'], schedule['unconstrained_duration'], name)
+
+    def test_without_resources(self):
+        for name, generator in sorted(generators.GENERATORS.items()):
+            project = generator(80, seed=4)
+            schedule = resources.schedule(project)
+            cpmnet = cpm.CriticalPathMethod(project)
+            project_duration = next(cpmnet.iterate_cpm())['project_duration']
+            self.assertEqual(schedule['project_duration'], project_duration, name)
+            self.assertEqual(schedule['unconstrained_duration'], project_duration, name)
+            self.assertEqual(schedule['usage'], {}, name)
+
+    def test_ample_capacities(self):
+        for name, project in projects():
+            for resource in project['info']['resources']:
+                project['info']['resources'][resource] = 10 ** 6
+            schedule = resources.schedule(project)
+            self.assertEqual(schedule['project_duration'], schedule['unconstrained_duration'], name)
+
+    def test_starts(self):
+        for name, project in projects():
+            single = resources.schedule(project)
+            several = resources.schedule(project, starts=6, seed=1)
+            self.assertLessEqual(several['project_duration'], single['project_duration'], name)
+            self.assertFeasible(project, several, name)
+            parallel = resources.schedule(project, starts=6, processes=3, seed=1)
+            self.assertEqual(parallel['starts'], several['starts'], name)
+
+    def test_demand_over_capacity(self):
+        project = generators.add_resources(generators.fan(10, seed=5), 1, seed=5)
+        project['activities'][0][2]['resources'] = {'resource0': project['info']['resources']['resource0'] + 1}
+        with self.assertRaises(ValueError):
+            resources.ResourceScheduler(project)
+
+    def test_unknown_priority_rule(self):
+        with self.assertRaises(ValueError):
+            resources.schedule(projects()[0][1], rule='unknown')
+
+    def test_no_starts(self):
+        for starts in (0, -1):
+            with self.assertRaises(ValueError):
+                resources.schedule(projects()[0][1], starts=starts)
+
+
+if __name__ == '__main__':
+    unittest.main()
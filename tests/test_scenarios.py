@@ -0,0 +1,97 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import unittest
+
+from cpm import aon
+from cpm import cpm
+from cpm import generators
+from cpm import scenarios
+from tests import test_cpm
+
+
+def random_scenarios(project, count, random_state):
+    activities = [(node1, node2) for node1, node2, _ in project['activities']]
+    generated = []
+    for _ in range(count):
+        scenario = {}
+        for activity in random_state.sample(activities, random_state.randint(0, min(4, len(activities)))):
+            overrides = {}
+            if random_state.random() < 0.8:
+                overrides['normal_duration'] = random_state.randint(0, 40)
+            if random_state.random() < 0.5:
+                overrides['normal_cost'] = random_state.randint(0, 10000)
+            scenario[activity] = overrides
+        generated.append(scenario)
+    return generated
+
+
+class ScenarioEvaluatorTest(unittest.TestCase):
+
+    def projects(self):
+        projects = [(name, project) for name, project in test_cpm.load_samples() if not aon.is_aon_project(project)]
+        for name, generator in sorted(generators.GENERATORS.items()):
+            projects.append((name, generator(100, seed=1)))
+        return projects
+
+    def test_same_results_as_the_cpm_algorithm(self):
+        random_state = random.Random(1)
+        for name, project in self.projects():
+            cpmnet = cpm.CriticalPathMethod(project)
+            normal_costs = dict(((node1, node2), activity['normal_cost'])
+                                for node1, node2, activity in project['activities'])
+            batch = random_scenarios(project, 30, random_state)
+            for scenario, result in zip(batch, scenarios.evaluate(project, batch)):
+                expected = cpmnet.what_if(dict((activity, overrides['normal_duration'])
+                                               for activity, overrides in scenario.items()
+                                               if 'normal_duration' in overrides))
+                self.assertEqual(result['project_duration'], expected['project_duration'], name)
+                self.assertEqual(sorted(result['critical_activities']), sorted(expected['critical_activities']),
+                                 name)
+                direct_cost = sum(scenario.get(activity, {}).get('normal_cost', cost)
+                                  for activity, cost in normal_costs.items())
+                self.assertEqual(result['direct_cost'], direct_cost, name)
+                self.assertEqual(result['total_cost'],
+                                 direct_cost + expected['project_duration'] * project['info']['indirect_cost'], name)
+
+    def test_chunks_and_processes(self):
+        project = generators.layered(200, seed=2)
+        batch = random_scenarios(project, 50, random.Random(2))
+        evaluator = scenarios.ScenarioEvaluator(project)
+        expected = evaluator.evaluate(batch)
+        for options in ({'chunk_size': 7}, {'chunk_size': 7, 'processes': 3}):
+            results = evaluator.evaluate(batch, **options)
+            for result, expected_result in zip(results, expected):
+                self.assertEqual(result['total_float'].tolist(), expected_result['total_float'].tolist(), options)
+                self.assertEqual(dict(result, total_float=None), dict(expected_result, total_float=None), options)
+
+    def test_activity_on_node_project(self):
+        project = dict(test_cpm.load_samples())['five-activities-aon-project.json']
+        result, = scenarios.evaluate(project, [{}])
+        cpmnet = cpm.CriticalPathMethod(project)
+        self.assertEqual(result['project_duration'], next(cpmnet.iterate_cpm())['project_duration'])
+
+    def test_invalid_scenarios(self):
+        project = generators.fan(10, seed=3)
+        node1, node2, _ = project['activities'][0]
+        evaluator = scenarios.ScenarioEvaluator(project)
+        for scenario in ({(0, 0): {'normal_duration': 1}}, {(node1, node2): {'crash_duration': 1}},
+                         {(node1, node2): {'normal_duration': -1}}):
+            with self.assertRaises(ValueError):
+                evaluator.evaluate([scenario])
+
+
+if __name__ == '__main__':
+    unittest.main()
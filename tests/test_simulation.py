@@ -0,0 +1,106 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import random
+import unittest
+
+import numpy
+
+from cpm import columnar
+from cpm import cpm
+from cpm import generators
+from cpm import simulation
+from tests import test_cpm
+
+
+def with_estimates(project, distribution, seed=None):
+    """Adds a three-point estimate around the normal duration to every other activity."""
+    project = copy.deepcopy(project)
+    random_state = random.Random(seed)
+    for index, (_, _, activity) in enumerate(project['activities']):
+        if index % 2:
+            continue
+        optimistic = random_state.randint(max(0, activity['normal_duration'] - 3), activity['normal_duration'])
+        activity.update(optimistic_duration=optimistic,
+                        most_likely_duration=activity['normal_duration'],
+                        pessimistic_duration=activity['normal_duration'] + random_state.randint(0, 5),
+                        distribution=distribution)
+    return project
+
+
+class SimulationTest(unittest.TestCase):
+
+    def test_without_estimates(self):
+        for name, project in test_cpm.load_samples():
+            cpmnet = cpm.CriticalPathMethod(project)
+            first = next(cpmnet.iterate_cpm())
+            simulated = simulation.simulate(project, samples=10, seed=1)
+            self.assertEqual(simulated['durations'].tolist(), [first['project_duration']] * 10, name)
+            self.assertEqual(simulated['std'], 0, name)
+            criticality = dict(simulated['criticality'])
+            for activity, index in criticality.items():
+                self.assertEqual(index, 1.0 if activity in first['critical_activities'] else 0.0, name)
+
+    def test_scenarios_match_the_cpm_algorithm(self):
+        project = with_estimates(generators.layered(80, seed=1), 'triangular', seed=1)
+        columns = columnar.ProjectColumns.from_project(project)
+        durations = simulation.sample_durations(*columns.estimates(), samples=20,
+                                                random_state=numpy.random.RandomState(1))
+        simulated = simulation.simulate(project, samples=20, seed=1)
+        activities = list(zip(columns.node1.tolist(), columns.node2.tolist()))
+        for row, project_duration in zip(durations.tolist(), simulated['durations'].tolist()):
+            cpmnet = cpm.CriticalPathMethod(project)
+            for (node1, node2), duration in zip(activities, row):
+                cpmnet.graph.edge[node1][node2]['normal_duration'] = duration
+            cpmnet._solve_network()
+            self.assertAlmostEqual(cpmnet.graph.node[cpmnet.sink]['let'], project_duration)
+
+    def test_durations_within_the_estimates(self):
+        for distribution in simulation.DISTRIBUTIONS:
+            project = with_estimates(generators.series_parallel(50, seed=2), distribution, seed=2)
+            estimates = columnar.ProjectColumns.from_project(project).estimates()
+            optimistic, _, pessimistic, _ = estimates
+            durations = simulation.sample_durations(*estimates, samples=1000, random_state=numpy.random.RandomState(2))
+            self.assertTrue((durations >= optimistic).all(), distribution)
+            self.assertTrue((durations <= pessimistic).all(), distribution)
+
+    def test_mean_of_a_single_activity(self):
+        project = {'info': {'indirect_cost': 0}, 'activities': [[1, 2, {
+            'normal_duration': 5, 'normal_cost': 100, 'crash_duration': 5, 'crash_cost': 100,
+            'optimistic_duration': 2, 'most_likely_duration': 5, 'pessimistic_duration': 14}]]}
+        expected = {'pert': (2 + 4 * 5 + 14) / 6.0, 'triangular': (2 + 5 + 14) / 3.0, 'uniform': (2 + 14) / 2.0}
+        for distribution, mean in expected.items():
+            project['activities'][0][2]['distribution'] = distribution
+            simulated = simulation.simulate(project, samples=100000, seed=3)
+            self.assertAlmostEqual(simulated['mean'], mean, delta=0.05, msg=distribution)
+            self.assertEqual(simulated['criticality'], [((1, 2), 1.0)], distribution)
+
+    def test_repeatable_in_chunks(self):
+        project = with_estimates(generators.fan(60, seed=3), 'uniform', seed=3)
+        simulated = simulation.simulate(project, samples=1000, seed=4)
+        chunked = simulation.simulate(project, samples=1000, seed=4, chunk_size=300)
+        self.assertEqual(chunked['durations'].tolist(), simulated['durations'].tolist())
+        self.assertEqual(chunked['criticality'], simulated['criticality'])
+        self.assertEqual(chunked['percentiles'], simulated['percentiles'])
+
+    def test_no_samples(self):
+        project = with_estimates(generators.fan(10, seed=1), 'pert', seed=1)
+        for samples in (0, -5):
+            with self.assertRaises(ValueError):
+                simulation.simulate(project, samples=samples)
+
+
+if __name__ == '__main__':
+    unittest.main()
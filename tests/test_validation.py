@@ -0,0 +1,213 @@
+# Copyright 2015 Tzanetos Balitsaris
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import json
+import random
+import StringIO
+import unittest
+
+import jsonschema
+
+from cpm import cpm
+from cpm import generators
+from cpm import validation
+
+VALUES = [0, 5, -3, 2.5, -0.0, 10 ** 20, True, False, None, 'pert', 'normal', u'\u03c0', [], [1], {}, {'a': 1}]
+CHUNK_SIZES = (1, 2, 3, 7, 64, validation.CHUNK_SIZE)
+
+
+def random_value(random_state, depth=0):
+    """Generates a random JSON value."""
+    kind = random_state.randint(0, 7 if depth < 3 else 4)
+    if kind == 0:
+        return random_state.choice([None, True, False])
+    if kind == 1:
+        return random_state.randint(-10 ** 20, 10 ** 20)
+    if kind == 2:
+        return random_state.choice([0.5, -1.25e-7, 3e100, 1.0, random_state.random()])
+    if kind in (3, 4):
+        return u''.join(random_state.choice(u'ab"\\/\n\t\u00e9\u03c0\U0001f600 ') for _ in range(
+            random_state.randint(0, 8)))
+    if kind == 5:
+        return [random_value(random_state, depth + 1) for _ in range(random_state.randint(0, 4))]
+    return dict((random_value(random_state, 3) if random_state.random() < 0.5 else 'key{}'.format(index),
+                 random_value(random_state, depth + 1)) for index in range(random_state.randint(0, 4)))
+
+
+def to_json(value, random_state):
+    """Serializes a value to JSON with random whitespace."""
+    indent = random_state.choice([None, 0, 1, 4])
+    separators = random_state.choice([(',', ':'), (', ', ': '), (' ,\n', ' :\t')])
+    return json.dumps(value, indent=indent, separators=separators, ensure_ascii=random_state.random() < 0.5)
+
+
+def mutate_properties(properties, random_state):
+    names = ['normal_duration', 'normal_cost', 'crash_duration', 'crash_cost', 'optimistic_duration',
+             'most_likely_duration', 'pessimistic_duration', 'distribution', 'resources', 'extra']
+    for _ in range(random_state.randint(1, 3)):
+        name = random_state.choice(names)
+        choice = random_state.random()
+        if choice < 0.2:
+            properties.pop(name, None)
+        elif choice < 0.4 and name == 'resources':
+            properties[name] = dict(('resource{}'.format(index), random_state.choice(VALUES))
+                                    for index in range(random_state.randint(0, 3)))
+        elif choice < 0.6:
+            properties.update(optimistic_duration=random_state.choice([1, 2.5, -1]), most_likely_duration=3,
+                              pessimistic_duration=random_state.choice([4, 'x']))
+        else:
+            properties[name] = random_state.choice(VALUES)
+
+
+def mutate_activity(activity, random_state):
+    """Changes an activity at random, in ways that may or may not break the schema."""
+    activity = copy.deepcopy(activity)
+    choice = random_state.random()
+    if choice < 0.1:
+        return random_state.choice(VALUES)
+    if choice < 0.2:
+        activity[random_state.randint(0, 1)] = random_state.choice(VALUES)
+    elif choice < 0.25:
+        activity.append(random_state.choice(VALUES))
+    elif choice < 0.3:
+        activity.pop()
+    elif choice < 0.35:
+        activity[2] = random_state.choice(VALUES)
+    else:
+        mutate_properties(activity[2], random_state)
+    return activity
+
+
+def mutate_task(task, random_state):
+    """Changes an activity in the activity-on-node form at random."""
+    task = copy.deepcopy(task)
+    choice = random_state.random()
+    if choice < 0.1:
+        return random_state.choice(VALUES)
+    if choice < 0.2:
+        task['id'] = random_state.choice(VALUES)
+    elif choice < 0.4:
+        task['predecessors'] = random_state.choice([
+            [1, 2], [1, random_state.choice(VALUES)], {'id': 1}, [{'id': 1, 'lag': random_state.choice(VALUES)}],
+            [{'id': 1}], [{'id': 1, 'lag': 0, 'extra': 1}]])
+    else:
+        mutate_properties(task, random_state)
+    return task
+
+
+def schema_errors(schema, index, activity):
+    validator = jsonschema.Draft4Validator(schema)
+    return ['{}: {}'.format(validation._format_path(index, error.path), error.message)
+            for error in sorted(validator.iter_errors(activity), key=lambda error: error.path)]
+
+
+class StreamReaderTest(unittest.TestCase):
+
+    def test_same_values_as_json_loads(self):
+        random_state = random.Random(1)
+        validator = validation.ProjectValidator(cpm.PROJECT_SCHEMA)
+        for _ in range(150):
+            project = generators.layered(random_state.randint(1, 10), seed=random_state.randint(0, 100))
+            project['info']['extra'] = random_value(random_state)
+            text = to_json(project, random_state)
+            for chunk_size in CHUNK_SIZES:
+                decoded, _ = validator.validate(StringIO.StringIO(text), chunk_size=chunk_size)
+                self.assertEqual(decoded, json.loads(text), text)
+
+    def test_invalid_json(self):
+        random_state = random.Random(2)
+        validator = validation.ProjectValidator(cpm.PROJECT_SCHEMA)
+        for _ in range(300):
+            text = to_json(generators.fan(random_state.randint(1, 5), seed=1), random_state)
+            if random_state.random() < 0.5:
+                text = text[:random_state.randint(0, len(text) - 1)]
+            else:
+                position = random_state.randint(0, len(text))
+                text = text[:position] + random_state.choice(['x', '}', ',', '"', '[1', '01']) + text[position:]
+            try:
+                json.loads(text)
+            except ValueError:
+                for chunk_size in CHUNK_SIZES:
+                    with self.assertRaises(ValueError):
+                        validator.validate(StringIO.StringIO(text), chunk_size=chunk_size)
+            else:
+                for chunk_size in CHUNK_SIZES:
+                    self.assertEqual(validator.validate(StringIO.StringIO(text), chunk_size=chunk_size)[0],
+                                     json.loads(text), text)
+
+
+class ProjectValidatorTest(unittest.TestCase):
+
+    def test_activities_agree_with_jsonschema(self):
+        random_state = random.Random(3)
+        validator = validation.ProjectValidator(cpm.PROJECT_SCHEMA)
+        schema = cpm.PROJECT_SCHEMA['properties']['activities']['items']
+        activities = generators.layered(50, seed=3)['activities']
+        accepted = 0
+        for index in range(2000):
+            activity = mutate_activity(random_state.choice(activities), random_state)
+            errors = validator.activity_errors(index, activity)
+            self.assertEqual(errors, schema_errors(schema, index, activity), activity)
+            accepted += not errors
+        # Both valid and invalid activities are generated
+        self.assertTrue(200 < accepted < 1800, accepted)
+
+    def test_tasks_agree_with_jsonschema(self):
+        random_state = random.Random(4)
+        validator = validation.ProjectValidator(cpm.AON_PROJECT_SCHEMA, checker=validation.TaskChecker)
+        schema = cpm.AON_PROJECT_SCHEMA['properties']['activities']['items']
+        task = {'id': 3, 'predecessors': [1, {'id': 2, 'lag': 1}], 'normal_duration': 4, 'normal_cost': 100,
+                'crash_duration': 2, 'crash_cost': 180}
+        accepted = 0
+        for index in range(2000):
+            mutated = mutate_task(task, random_state)
+            errors = validator.activity_errors(index, mutated)
+            self.assertEqual(errors, schema_errors(schema, index, mutated), mutated)
+            accepted += not errors
+        self.assertTrue(200 < accepted < 1800, accepted)
+
+    def test_projects_agree_with_jsonschema(self):
+        random_state = random.Random(5)
+        for _ in range(200):
+            project = generators.series_parallel(random_state.randint(1, 20), seed=random_state.randint(0, 100))
+            if random_state.random() < 0.5:
+                index = random_state.randrange(len(project['activities']))
+                properties = project['activities'][index][2]
+                mutate_properties(properties, random_state)
+            if random_state.random() < 0.2:
+                project[random_state.choice(['info', 'extra'])] = random_state.choice(VALUES)
+            if random_state.random() < 0.1:
+                project['activities'] = random_state.choice([[], {}, None])
+            try:
+                jsonschema.validate(project, cpm.PROJECT_SCHEMA)
+                valid = True
+            except jsonschema.ValidationError:
+                valid = False
+            text = to_json(project, random_state)
+            try:
+                cpm.validate(StringIO.StringIO(text))
+            except cpm.ProjectValidationException as exc:
+                # Errors besides those of the schema are about the network or
+                # about properties that contradict each other
+                schema_errors_found = [error for error in exc.errors if not any(phrase in error for phrase in (
+                    'greater than the normal duration', 'most likely duration must lie',
+                    'not one of the resources of the project', 'more than its capacity'))]
+                self.assertEqual(bool(schema_errors_found), not valid, (text, exc.errors))
+            else:
+                self.assertTrue(valid, text)
+
+
+if __name__ == '__main__':
+    unittest.main()